@@ -0,0 +1,102 @@
+"""
+Benchmark of the semantic answer cache (src/rag/answer_cache.py).
+
+A fixture document is ingested into the fakes of benchmarks/fakes.py, then first-turn
+questions are asked in fresh sessions through generate_response_stream, in rounds:
+
+- cold: every question once (misses, answers are cached)
+- repeat: the same questions again
+- rephrased: reworded questions (same words, other case, order and punctuation; the fake
+  embeddings are bag-of-words, so these are near-duplicates)
+- after re-ingestion: a changed document bumps the corpus version, every question misses
+
+Per round: hit rate and median / p95 of the turn total and first token (ms). The persistent
+embedding cache is off, so a hit still pays the query embedding round trip.
+
+    python benchmarks/answer_cache.py --chat-first-token-ms 600
+"""
+
+# Standard library imports
+import argparse
+import os
+import sys
+import tempfile
+import uuid
+from typing import Any, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Local imports
+from benchmarks.fakes import Latency, install
+from benchmarks.fixtures import write_regulation_pdf
+from benchmarks.pipeline import QUERIES, ingest, percentile
+from src.configs import openai_config, rag_config
+from src.rag.answer_cache import get_answer_cache
+from src.rag.generate_response import generate_response_stream
+from src.utils.timing import StageTimer
+
+
+def rephrase(query: str) -> str:
+    words = query.rstrip("?").split()
+    return " ".join(words[1:] + words[:1]).lower()
+
+
+def ask(queries: List[str]) -> Dict[str, Any]:
+    cache = get_answer_cache()
+    hits_before = cache.hits
+    totals, first_tokens = [], []
+    for query in queries:
+        timer = StageTimer()
+        first_token = None
+        for _ in generate_response_stream(str(uuid.uuid4()), query, None, timer=timer):
+            if first_token is None:
+                first_token = timer.elapsed_ms()
+        totals.append(timer.elapsed_ms())
+        first_tokens.append(first_token or 0.0)
+    return {
+        "hit_rate": (cache.hits - hits_before) / len(queries),
+        "total_median": percentile(totals, 0.5),
+        "total_p95": percentile(totals, 0.95),
+        "first_token_median": percentile(first_tokens, 0.5),
+    }
+
+
+def print_round(name: str, results: Dict[str, Any]) -> None:
+    print(
+        f"{name:<19} hit rate {results['hit_rate']:4.0%}  total median {results['total_median']:7.1f} ms"
+        f"  p95 {results['total_p95']:7.1f} ms  first token median {results['first_token_median']:7.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20, help="pages of the generated fixture PDF")
+    defaults = Latency()
+    for field, value in defaults.to_dict().items():
+        parser.add_argument(f"--{field.replace('_', '-')}-ms", dest=field, type=float, default=value)
+    args = parser.parse_args()
+
+    openai_config.EMBEDDING_CACHE_ENABLED = False
+    rag_config.ANSWER_CACHE_ENABLED = True
+    install(Latency(**{field: getattr(args, field) for field in defaults.to_dict()}))
+    get_answer_cache.reset()
+
+    directory = tempfile.mkdtemp()
+    fixture = os.path.join(directory, "fixture.pdf")
+    write_regulation_pdf(fixture, pages=args.pages)
+    ingest(fixture, rag_config.DEFAULT_NAMESPACE)
+
+    rounds = [("cold", QUERIES), ("repeat", QUERIES), ("rephrased", [rephrase(query) for query in QUERIES])]
+    for name, queries in rounds:
+        print_round(name, ask(queries))
+
+    # Same file name, one page more: replaces the document's chunks and bumps the corpus version
+    write_regulation_pdf(fixture, pages=args.pages + 1)
+    ingest(fixture, rag_config.DEFAULT_NAMESPACE)
+    print_round("after re-ingestion", ask(QUERIES))
+    print(f"\nanswer cache {get_answer_cache().stats()}")
+
+
+if __name__ == "__main__":
+    main()
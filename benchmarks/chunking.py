@@ -0,0 +1,93 @@
+"""
+Chunking benchmark: structure-aware token chunker vs. the former fixed-offset splitter.
+
+Reports chunk count, chunk size in tokens, total tokens sent to the embedding API
+(overlap included) and chunking throughput. Uses the generated regulation fixture by
+default, or the .txt/.md/.pdf/.docx files given on the command line. Token figures are only
+representative with the real tokenizer: when tiktoken can't load its BPE file, counts fall
+back to a length-based estimate, and the tokenizer line of the output says so.
+
+    python benchmarks/chunking.py
+    python benchmarks/chunking.py docs/noi_quy.pdf docs/quy_che.docx
+"""
+
+# Standard library imports
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local imports
+from benchmarks.fixtures import regulation_text
+from src.ingestion.chunking import count_tokens, split_text, tokenizer_name
+from src.ingestion.extraction import extract_text
+
+
+def legacy_split_text_into_chunks(text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
+    """The splitter previously used by the upload page (fixed character offsets)"""
+    if not text or not text.strip():
+        return []
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + chunk_size
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        start += (chunk_size - overlap)
+
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+
+def load_text(path: str) -> str:
+    return extract_text(path, os.path.splitext(path)[1])[0]
+
+
+def run(name: str, splitter: Callable[[str], List[str]], text: str, repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = splitter(text)
+        timings.append(time.perf_counter() - start)
+    tokens = [count_tokens(chunk) for chunk in chunks]
+    seconds = statistics.median(timings)
+    return {
+        "name": name,
+        "chunks": len(chunks),
+        "mean_tokens": statistics.mean(tokens) if tokens else 0,
+        "max_tokens": max(tokens) if tokens else 0,
+        "embedded_tokens": sum(tokens),
+        "seconds": seconds,
+        "mb_per_s": len(text.encode("utf-8")) / 1e6 / seconds if seconds else float("inf"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    documents = {path: load_text(path) for path in args.files} or {"fixture (300 pages)": regulation_text()}
+    print(f"tokenizer: {tokenizer_name()}")
+    for label, text in documents.items():
+        print(f"\n{label}: {len(text):,} chars, {count_tokens(text):,} tokens")
+        for result in (
+            run("legacy 1000 chars / 100 overlap", legacy_split_text_into_chunks, text, args.repeat),
+            run("token chunker (RAG_CHUNK_SIZE)", split_text, text, args.repeat),
+        ):
+            print(
+                f"  {result['name']:<34} {result['chunks']:>5} chunks  "
+                f"mean {result['mean_tokens']:6.0f} / max {result['max_tokens']:5} tokens  "
+                f"embedded {result['embedded_tokens']:>8,} tokens  "
+                f"{result['seconds'] * 1000:8.1f} ms ({result['mb_per_s']:.1f} MB/s)"
+            )
+
+
+if __name__ == "__main__":
+    main()
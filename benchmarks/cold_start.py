@@ -0,0 +1,76 @@
+"""
+Cold-start import benchmark.
+
+Measures how long a fresh interpreter takes to import the modules every Streamlit page
+pulls in (src.database, src.rag.generate_response). Each run is a separate process so
+nothing is cached between runs. With --compare, the same measurement is taken on another
+git revision (checked out into a temporary worktree) for a before/after comparison:
+
+    python benchmarks/cold_start.py --runs 10 --compare HEAD~1
+"""
+
+# Standard library imports
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+IMPORT_STATEMENT = "import src.database; import src.rag.generate_response"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(repo_dir: str, runs: int) -> Dict[str, float]:
+    durations: List[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_STATEMENT],
+            cwd=repo_dir,
+            capture_output=True,
+            text=True,
+        )
+        durations.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(f"Import failed in {repo_dir}:\n{result.stderr}")
+    return {
+        "runs": runs,
+        "median_s": statistics.median(durations),
+        "min_s": min(durations),
+        "max_s": max(durations),
+    }
+
+
+def measure_revision(revision: str, runs: int) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        worktree = os.path.join(tmp, "worktree")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, revision], cwd=REPO_ROOT, check=True, capture_output=True)
+        try:
+            # Secrets are not tracked, share the local ones with the checkout
+            secrets = os.path.join(REPO_ROOT, ".streamlit", "secrets.toml")
+            if os.path.exists(secrets):
+                os.symlink(secrets, os.path.join(worktree, ".streamlit", "secrets.toml"))
+            return measure(worktree, runs)
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=REPO_ROOT, check=False, capture_output=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--compare", help="git revision to measure as the baseline")
+    args = parser.parse_args()
+
+    results = {"current": measure(REPO_ROOT, args.runs)}
+    if args.compare:
+        results[args.compare] = measure_revision(args.compare, args.runs)
+
+    for label, stats in results.items():
+        print(f"{label:<12} median {stats['median_s'] * 1000:8.1f} ms  (min {stats['min_s'] * 1000:.1f}, max {stats['max_s'] * 1000:.1f}, {stats['runs']} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark of bulk ingestion under an embedding quota (src/utils/rate_limit.py).
+
+Several ingestion jobs of different sizes run at the same time, each as its own rate limit
+flow, through replace_document_chunks against the fake OpenAI of benchmarks/fakes.py, which
+enforces a requests/min and tokens/min quota and answers 429 with retry-after once it is
+spent. The quota is scaled to a short sliding window (--window-seconds) so runs stay short.
+Run with the scheduler and without it (the batch retries only), reporting:
+
+- wall time, throughput and the peak quota use in any window (must stay <= 100%)
+- 429 responses, and chunks that could not be embedded (must be 0 with the scheduler)
+- the finish time of every job: with fair queuing a small job isn't held back by a large one
+
+    python benchmarks/embedding_quota.py --jobs 200,60,20 --tpm 120000 --window-seconds 10
+"""
+
+# Standard library imports
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Local imports
+from benchmarks.fakes import FakeQuota, Latency, install
+from src.configs import openai_config, rag_config
+from src.database.pinecone_client import replace_document_chunks
+from src.models import Document
+from src.utils.rate_limit import BURST_SECONDS, RateLimitScheduler, flow, get_embedding_scheduler
+
+WORDS = "học sinh giáo viên lớp trường quy định lịch thi học phí phụ huynh thư viện đồng phục nội quy".split()
+
+
+def make_chunks(job: int, count: int, words: int) -> List[str]:
+    return [
+        f"Tài liệu {job} đoạn {position}: " + " ".join(WORDS[(position + offset) % len(WORDS)] for offset in range(words))
+        for position in range(count)
+    ]
+
+
+def run_job(job: int, chunks: List[str], start: float, results: Dict[int, Dict[str, Any]]) -> None:
+    document = Document(document_id=f"quota-{job}-{uuid.uuid4().hex[:8]}", name=f"job-{job}.pdf", topic=rag_config.DEFAULT_NAMESPACE, file_type=".pdf", file_size=0, chunk_count=len(chunks))
+    result: Dict[str, Any] = {"chunks": len(chunks), "embedded": 0, "error": None}
+    try:
+        with flow(f"job:{job}"):
+            result["embedded"] = replace_document_chunks(chunks, rag_config.DEFAULT_NAMESPACE, document, batch_size=50)["embedded"]
+    except Exception as e:
+        result["error"] = str(e)
+    result["finished_s"] = time.perf_counter() - start
+    results[job] = result
+
+
+def run(job_sizes: List[int], words: int) -> Dict[int, Dict[str, Any]]:
+    results: Dict[int, Dict[str, Any]] = {}
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=run_job, args=(job, make_chunks(job, size, words), start, results))
+        for job, size in enumerate(job_sizes)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", default="200,60,20", help="chunks per concurrent job")
+    parser.add_argument("--words", type=int, default=120, help="words per chunk")
+    parser.add_argument("--rpm", type=float, default=3000)
+    parser.add_argument("--tpm", type=float, default=150000)
+    parser.add_argument("--window-seconds", type=float, default=10)
+    parser.add_argument("--embedding-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    job_sizes = [int(size) for size in args.jobs.split(",")]
+    openai_config.EMBEDDING_CACHE_ENABLED = False
+    openai_config.EMBEDDING_RPM_LIMIT, openai_config.EMBEDDING_TPM_LIMIT = args.rpm, args.tpm
+    # Requests stay small next to the scaled-down quota (as 100-chunk batches are next to a real one)
+    openai_config.EMBEDDING_BATCH_SIZE = 10
+    backends = install(Latency(embedding=args.embedding_ms, vector_query=0, vector_write=0, mongo=0))
+
+    for scheduled in (False, True):
+        quota = FakeQuota(args.rpm, args.tpm, args.window_seconds)
+        backends.openai.quota = quota
+        headroom = openai_config.EMBEDDING_RATE_HEADROOM
+        # The burst allowance shrinks with the window, as the quota does
+        get_embedding_scheduler.override(
+            RateLimitScheduler(args.rpm * headroom, args.tpm * headroom, BURST_SECONDS * args.window_seconds / 60)
+            if scheduled else None
+        )
+
+        start = time.perf_counter()
+        results = run(job_sizes, args.words)
+        elapsed = time.perf_counter() - start
+        embedded = sum(result["embedded"] for result in results.values())
+        failed = sum(1 for result in results.values() if result["error"])
+
+        print(f"\n{'scheduler' if scheduled else 'no scheduler'}: {embedded}/{sum(job_sizes)} chunks embedded in {elapsed:.1f}s")
+        print(f"  peak quota use {quota.peak_tokens / quota.max_tokens:.0%} of {quota.max_tokens:.0f} tokens per {quota.window:.0f}s window")
+        print(f"  429 responses {quota.rejected}, failed jobs {failed}")
+        if scheduled:
+            print(f"  scheduler {get_embedding_scheduler().stats()}")
+        for job, result in sorted(results.items()):
+            status = f"error: {result['error']}" if result["error"] else "ok"
+            print(f"  job {job}: {result['chunks']:4d} chunks, finished after {result['finished_s']:6.1f}s ({status})")
+
+
+if __name__ == "__main__":
+    main()
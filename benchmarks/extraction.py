@@ -0,0 +1,98 @@
+"""
+PDF extraction benchmark: process-pool extraction streamed into the chunker vs. the former
+sequential loop that concatenated page texts on the Streamlit script thread.
+
+Reports total wall time, time until the first chunk is available and the pages reported
+without a text layer. Uses a generated 300-page fixture PDF (with a few blank pages) by
+default, or the PDF files given on the command line:
+
+    python benchmarks/extraction.py
+    python benchmarks/extraction.py docs/noi_quy.pdf --workers 8
+"""
+
+# Standard library imports
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Third-party imports
+import PyPDF2
+
+# Local imports
+from benchmarks.fixtures import write_regulation_pdf
+from src.configs import app_config
+from src.ingestion.chunking import iter_chunks, split_text
+from src.ingestion.extraction import extract_document
+
+
+def legacy_extract_text_from_pdf(path: str) -> str:
+    """The extractor previously used by the upload page"""
+    pdf_reader = PyPDF2.PdfReader(path)
+    text = ""
+    for page in pdf_reader.pages:
+        text += page.extract_text() + "\n"
+    return text
+
+
+def run_legacy(path: str) -> Dict[str, float]:
+    start = time.perf_counter()
+    chunks = split_text(legacy_extract_text_from_pdf(path))
+    elapsed = time.perf_counter() - start
+    # Nothing can be chunked before the whole file has been extracted
+    return {"seconds": elapsed, "first_chunk": elapsed, "chunks": len(chunks), "empty_pages": 0}
+
+
+def run_streaming(path: str) -> Dict[str, float]:
+    start = time.perf_counter()
+    first_chunk = None
+    extracted = extract_document(path, ".pdf")
+    chunks = 0
+    for _ in iter_chunks(extracted):
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        chunks += 1
+    return {
+        "seconds": time.perf_counter() - start,
+        "first_chunk": first_chunk or 0.0,
+        "chunks": chunks,
+        "empty_pages": len(extracted.empty_pages),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--pages", type=int, default=300, help="pages of the generated fixture")
+    parser.add_argument("--workers", type=int, default=app_config.EXTRACTION_WORKERS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    app_config.EXTRACTION_WORKERS = args.workers
+
+    paths: List[str] = args.files
+    if not paths:
+        fixture = os.path.join(tempfile.mkdtemp(), "fixture.pdf")
+        write_regulation_pdf(fixture, pages=args.pages)
+        paths = [fixture]
+
+    # Start the pool outside the measurements, it lives for the whole server process
+    run_streaming(paths[0])
+
+    for path in paths:
+        print(f"\n{path}: {len(PyPDF2.PdfReader(path).pages)} pages, {args.workers} workers")
+        for name, runner in (("legacy sequential +=", run_legacy), ("extract_document, streamed", run_streaming)):
+            results = [runner(path) for _ in range(args.repeat)]
+            print(
+                f"  {name:<24} {statistics.median(r['seconds'] for r in results) * 1000:8.0f} ms total  "
+                f"first chunk after {statistics.median(r['first_chunk'] for r in results) * 1000:7.0f} ms  "
+                f"{results[0]['chunks']:>5} chunks  {results[0]['empty_pages']} empty pages reported"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Local OpenAI-compatible chat completions endpoint with configurable latency and failures.
+
+Serves POST /v1/chat/completions (streamed as server-sent events or as one JSON body), so
+the real OpenAI SDK clients, and the provider router on top of them, can be pointed at it
+through OPENAI_BASE_URL / DEEPSEEK_BASE_URL:
+
+    python benchmarks/fake_llm_server.py --port 8101 --first-token-ms 400 --stall-rate 0.1
+    python benchmarks/fake_llm_server.py --port 8102 --first-token-ms 900 --error-rate 0.05
+
+A stalled request waits --stall-ms before its first token (a slow tail for hedging to cut);
+a failed request answers HTTP 500. `behaviour` can be changed while the server runs.
+"""
+
+# Standard library imports
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+
+@dataclass
+class Behaviour:
+    """Latencies in milliseconds, rates as shares of requests"""
+    first_token_ms: float = 400.0
+    token_ms: float = 10.0
+    answer_tokens: int = 40
+    stall_rate: float = 0.0
+    stall_ms: float = 5000.0
+    error_rate: float = 0.0
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int, behaviour: Behaviour, seed: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.behaviour = behaviour
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def draw(self) -> Dict[str, bool]:
+        """Decide the fate of one request"""
+        with self._lock:
+            self.requests += 1
+            failed = self.random.random() < self.behaviour.error_rate
+            self.errors += failed
+            return {"failed": failed, "stalled": self.random.random() < self.behaviour.stall_rate}
+
+    def start(self) -> "FakeLLMServer":
+        threading.Thread(target=self.serve_forever, name=f"fake-llm-{self.server_address[1]}", daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeLLMServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        if not self.path.endswith("/chat/completions"):
+            self._json(404, {"error": {"message": "not found"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        behaviour = self.server.behaviour
+        fate = self.server.draw()
+        first_token_ms = behaviour.stall_ms if fate["stalled"] else behaviour.first_token_ms
+        if fate["failed"]:
+            time.sleep(first_token_ms / 1000)
+            self._json(500, {"error": {"message": "injected failure", "type": "server_error"}})
+            return
+
+        words = " ".join(message.get("content", "") for message in request.get("messages", [])).split() or ["ok"]
+        count = min(request.get("max_tokens") or behaviour.answer_tokens, behaviour.answer_tokens)
+        tokens = [f"{words[position % len(words)]} " for position in range(count)]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        usage = {"prompt_tokens": len(words), "completion_tokens": len(tokens), "total_tokens": len(words) + len(tokens)}
+        base = {"id": completion_id, "created": int(time.time()), "model": request.get("model", "fake")}
+
+        if not request.get("stream"):
+            time.sleep((first_token_ms + behaviour.token_ms * (len(tokens) - 1)) / 1000)
+            message = {"role": "assistant", "content": "".join(tokens)}
+            self._json(200, {**base, "object": "chat.completion", "choices": [{"index": 0, "message": message, "finish_reason": "stop"}], "usage": usage})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            time.sleep(first_token_ms / 1000)
+            for position, token in enumerate(tokens):
+                if position:
+                    time.sleep(behaviour.token_ms / 1000)
+                self._event({**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]})
+            self._event({**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self._event({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream (e.g. the losing side of a hedged request)
+            pass
+        self.close_connection = True
+
+    def _event(self, payload: Dict[str, Any]) -> None:
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+        self.wfile.flush()
+
+    def _json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_servers(behaviours: List[Behaviour]) -> List[FakeLLMServer]:
+    """One server per behaviour, on free ports"""
+    return [FakeLLMServer(0, behaviour, seed=position).start() for position, behaviour in enumerate(behaviours)]
+
+
+__all__ = ["Behaviour", "FakeLLMServer", "start_servers"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8101)
+    defaults = Behaviour()
+    for name, value in vars(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=type(value), default=value)
+    args = parser.parse_args()
+    server = FakeLLMServer(args.port, Behaviour(**{name: getattr(args, name) for name in vars(defaults)}))
+    print(f"Fake chat completions endpoint at {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,657 @@
+"""
+Local stand-ins for OpenAI, Pinecone and MongoDB with configurable injected latency.
+
+Lets the benchmarks run the real chat and ingestion code without any network service:
+
+- FakeOpenAI: embeddings (deterministic hashed bag-of-words vectors, so retrieval still
+  finds the chunks sharing words with the query) and chat completions, streamed or not;
+  optionally behind a FakeQuota that answers 429 like the API once a per-minute quota is spent
+- LatencyIndex: the local vector store (src/database/vector_store.py) behind a per-call delay
+- FakeDatabase: an in-memory MongoDB subset covering the queries and updates the app issues
+
+`install(latency)` swaps them in through the lazy client singletons, so nothing in src/ is
+patched. Latencies are in milliseconds; every stand-in counts its calls and time spent.
+"""
+
+# Standard library imports
+import copy
+import hashlib
+import itertools
+import math
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+# Third-party imports
+import httpx
+from openai import RateLimitError
+from bson import ObjectId
+from pymongo import ReplaceOne
+
+# Local imports
+from src.configs import pinecone_config, rag_config
+from src.database.vector_store import LocalVectorStore
+
+WORD_PATTERN = re.compile(r"\w+")
+# Hashed bag-of-words vectors score lower than real embeddings: a chunk on the query's topic
+# reaches ~0.1 (against ~0.4 with text-embedding-3-small), unrelated text stays near 0
+FAKE_MIN_SIMILARITY = 0.05
+
+
+@dataclass
+class Latency:
+    """Injected latency per call, in milliseconds"""
+    embedding: float = 150.0
+    chat_first_token: float = 600.0
+    chat_token: float = 15.0
+    vector_query: float = 60.0
+    vector_write: float = 80.0
+    mongo: float = 3.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+class CallStats:
+    """Thread-safe call counter and time accumulator, per operation"""
+
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, seconds: float) -> None:
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            self.seconds[operation] = self.seconds.get(operation, 0.0) + seconds
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        return {
+            operation: {"calls": self.calls[operation], "seconds": round(self.seconds[operation], 4)}
+            for operation in sorted(self.calls)
+        }
+
+
+def _sleep(milliseconds: float) -> None:
+    if milliseconds > 0:
+        time.sleep(milliseconds / 1000)
+
+
+# --- OpenAI ---
+
+def fake_embedding(text: str, dimension: int) -> List[float]:
+    """
+    Normalized hashed bag-of-words vector: texts sharing words get a positive cosine similarity
+    """
+    vector = [0.0] * dimension
+    for word in WORD_PATTERN.findall(text.lower()):
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        vector[int.from_bytes(digest[:4], "little") % dimension] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+class FakeQuota:
+    """
+    Requests/min and tokens/min quota over a sliding window. With a `window_seconds` below 60 the
+    quota is scaled down to the window (limit * window / 60), so short runs still hit it.
+    Over the quota, requests fail with a 429 carrying retry-after-ms, like the OpenAI API.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, window_seconds: float = 60.0):
+        self.window = window_seconds
+        self.max_requests = requests_per_minute * window_seconds / 60
+        self.max_tokens = tokens_per_minute * window_seconds / 60
+        self.rejected = 0
+        self.peak_tokens = 0
+        self._log: deque = deque()
+        self._lock = threading.Lock()
+
+    def charge(self, tokens: int) -> None:
+        with self._lock:
+            now = time.monotonic()
+            while self._log and self._log[0][0] <= now - self.window:
+                self._log.popleft()
+            used = sum(amount for _, amount in self._log)
+            if len(self._log) + 1 > self.max_requests or used + tokens > self.max_tokens:
+                self.rejected += 1
+                # Until enough of the window has expired for this request to fit
+                freed, retry_after = used, self.window
+                for timestamp, amount in self._log:
+                    freed -= amount
+                    if freed + tokens <= self.max_tokens:
+                        retry_after = timestamp + self.window - now
+                        break
+                response = httpx.Response(
+                    429,
+                    headers={"retry-after-ms": str(int(retry_after * 1000) + 1)},
+                    request=httpx.Request("POST", "https://fake.local/v1/embeddings"),
+                )
+                raise RateLimitError("Rate limit reached", response=response, body={"code": "rate_limit_exceeded"})
+            self._log.append((now, tokens))
+            self.peak_tokens = max(self.peak_tokens, used + tokens)
+
+
+class _Embeddings:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+
+    def create(self, input, model: str, **kwargs) -> SimpleNamespace:
+        start = time.perf_counter()
+        inputs = input if isinstance(input, list) else [input]
+        tokens = sum(len(WORD_PATTERN.findall(text)) for text in inputs)
+        if self._owner.quota is not None:
+            self._owner.quota.charge(tokens)
+        _sleep(self._owner.latency.embedding)
+        data = [
+            SimpleNamespace(index=position, embedding=fake_embedding(text, self._owner.dimension))
+            for position, text in enumerate(inputs)
+        ]
+        self._owner.stats.record("embeddings", time.perf_counter() - start)
+        usage = SimpleNamespace(prompt_tokens=tokens, total_tokens=tokens)
+        return SimpleNamespace(data=data, model=model, usage=usage)
+
+
+class _Stream:
+    """Iterator of chat completion chunks, like openai.Stream"""
+
+    def __init__(self, tokens: List[str], latency: Latency, on_close, usage: Optional[SimpleNamespace] = None):
+        self._tokens = tokens
+        self._usage = usage
+        self._latency = latency
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self) -> Iterator[SimpleNamespace]:
+        _sleep(self._latency.chat_first_token)
+        for position, token in enumerate(self._tokens):
+            if self._closed:
+                return
+            if position:
+                _sleep(self._latency.chat_token)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token), finish_reason=None)], usage=None)
+        if self._usage is not None:
+            # stream_options={"include_usage": True}: a last chunk without choices
+            yield SimpleNamespace(choices=[], usage=self._usage)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._on_close()
+
+
+class _Completions:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+
+    def _answer(self, messages: List[Dict[str, str]]) -> List[str]:
+        # Echo a slice of the prompt so answers have a realistic, query-dependent length
+        words = WORD_PATTERN.findall(messages[-1]["content"]) or ["ok"]
+        return [f"{word} " for word in itertools.islice(itertools.cycle(words), self._owner.answer_tokens)]
+
+    def create(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        stream: bool = False,
+        max_tokens: Optional[int] = None,
+        stream_options: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ):
+        start = time.perf_counter()
+        tokens = self._answer(messages)[:max_tokens or None]
+        prompt_tokens = sum(len(WORD_PATTERN.findall(message["content"])) for message in messages)
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=len(tokens), total_tokens=prompt_tokens + len(tokens))
+        if stream:
+            include_usage = bool((stream_options or {}).get("include_usage"))
+            on_close = lambda: self._owner.stats.record("chat_stream", time.perf_counter() - start)
+            return _Stream(tokens, self._owner.latency, on_close, usage if include_usage else None)
+        _sleep(self._owner.latency.chat_first_token + self._owner.latency.chat_token * (len(tokens) - 1))
+        self._owner.stats.record("chat", time.perf_counter() - start)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content="".join(tokens)), finish_reason="stop")],
+            usage=usage,
+        )
+
+
+class FakeOpenAI:
+    """Stand-in for openai.OpenAI: `embeddings.create` and `chat.completions.create`"""
+
+    def __init__(self, latency: Latency, stats: CallStats, dimension: int, answer_tokens: int = 120):
+        self.latency = latency
+        self.stats = stats
+        self.dimension = dimension
+        self.answer_tokens = answer_tokens
+        self.quota: Optional[FakeQuota] = None
+        self.embeddings = _Embeddings(self)
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def with_options(self, **kwargs) -> "FakeOpenAI":
+        return self
+
+
+# --- Pinecone ---
+
+class LatencyIndex:
+    """
+    Local vector store with a delay before every call (queries and writes are configured separately)
+    """
+    WRITES = {"upsert", "update", "delete"}
+
+    def __init__(self, store: LocalVectorStore, latency: Latency, stats: CallStats):
+        self._store = store
+        self._latency = latency
+        self._stats = stats
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self._store, name)
+        delay = self._latency.vector_write if name in self.WRITES else self._latency.vector_query
+
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            _sleep(delay)
+            result = method(*args, **kwargs)
+            if name == "list":
+                # list() is a generator, charge the round trip once per page
+                result = list(result)
+            self._stats.record(f"index.{name}", time.perf_counter() - start)
+            return iter(result) if name == "list" else result
+
+        return call
+
+
+# --- MongoDB ---
+
+def _get_path(document: Dict[str, Any], key: str) -> Any:
+    value: Any = document
+    for part in key.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _matches(document: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for key, condition in query.items():
+        value = _get_path(document, key)
+        if isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+            for op, operand in condition.items():
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$exists" and (key in document) != bool(operand):
+                    return False
+                if op in ("$gt", "$gte", "$lt", "$lte"):
+                    if value is None:
+                        return False
+                    if op == "$gt" and not value > operand:
+                        return False
+                    if op == "$gte" and not value >= operand:
+                        return False
+                    if op == "$lt" and not value < operand:
+                        return False
+                    if op == "$lte" and not value <= operand:
+                        return False
+        elif value != condition and not (isinstance(value, list) and condition in value):
+            # A scalar condition on an array field matches any element, as in MongoDB
+            return False
+    return True
+
+
+def _project(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    document = copy.deepcopy(document)
+    if not projection:
+        return document
+    slices = {key: spec["$slice"] for key, spec in projection.items() if isinstance(spec, dict) and "$slice" in spec}
+    for key, count in slices.items():
+        if isinstance(document.get(key), list):
+            document[key] = document[key][count:] if count < 0 else document[key][:count]
+    included = {key for key, spec in projection.items() if key not in slices and spec and key != "_id"}
+    excluded = {key for key, spec in projection.items() if key not in slices and not spec}
+    if included:
+        # $slice-only projections keep every other field, like MongoDB
+        document = {key: value for key, value in document.items() if key in included or key in slices or key == "_id"}
+    for key in excluded:
+        document.pop(key, None)
+    return document
+
+
+def _apply_update(document: Dict[str, Any], update: Dict[str, Any], inserting: bool) -> None:
+    for op, fields in update.items():
+        if op == "$setOnInsert" and not inserting:
+            continue
+        for key, value in fields.items():
+            if op in ("$set", "$setOnInsert"):
+                document[key] = copy.deepcopy(value)
+            elif op == "$inc":
+                document[key] = document.get(key, 0) + value
+            elif op == "$push":
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                document.setdefault(key, []).extend(copy.deepcopy(items))
+            elif op == "$unset":
+                document.pop(key, None)
+            else:
+                raise NotImplementedError(f"Update operator {op} is not supported by the fake database")
+
+
+class _Cursor:
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self._documents = documents
+
+    def sort(self, key, direction: int = 1) -> "_Cursor":
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            self._documents.sort(key=lambda document: (_get_path(document, field) is None, _get_path(document, field)), reverse=order < 0)
+        return self
+
+    def skip(self, count: int) -> "_Cursor":
+        self._documents = self._documents[count:]
+        return self
+
+    def limit(self, count: int) -> "_Cursor":
+        if count:
+            self._documents = self._documents[:count]
+        return self
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._documents)
+
+
+def _expression(document: Dict[str, Any], expression: Any) -> Any:
+    """Aggregation expression: "$field.path", a dict of expressions or a constant"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return _get_path(document, expression[1:])
+    if isinstance(expression, dict):
+        return {key: _expression(document, value) for key, value in expression.items()}
+    return expression
+
+
+def _group(documents: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    groups: Dict[str, Dict[str, Any]] = {}
+    for document in documents:
+        key = _expression(document, spec["_id"])
+        group = groups.setdefault(repr(key), {"_id": key})
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (op, expression), = accumulator.items()
+            value = _expression(document, expression)
+            if op == "$sum":
+                group[field] = group.get(field, 0) + (value or 0)
+            elif op in ("$max", "$min") and value is not None:
+                current = group.get(field)
+                if current is None or (value > current if op == "$max" else value < current):
+                    group[field] = value
+    return list(groups.values())
+
+
+def _aggregate(documents: List[Dict[str, Any]], pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The $match / $group / $sort / $limit / $project subset of the aggregation pipeline"""
+    documents = copy.deepcopy(documents)
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            documents = [document for document in documents if _matches(document, spec)]
+        elif name == "$group":
+            documents = _group(documents, spec)
+        elif name == "$sort":
+            documents = _Cursor(documents).sort(list(spec.items()))._documents
+        elif name == "$limit":
+            documents = documents[:spec]
+        elif name == "$project":
+            documents = [
+                {
+                    **({"_id": document["_id"]} if spec.get("_id", 1) else {}),
+                    **{
+                        field: document.get(field) if value in (1, True) else _expression(document, value)
+                        for field, value in spec.items()
+                        if field != "_id"
+                    },
+                }
+                for document in documents
+            ]
+        else:
+            raise NotImplementedError(f"Aggregation stage {name} is not supported by the fake")
+    return documents
+
+
+class FakeCollection:
+    """In-memory collection implementing the subset of the pymongo API used by src/database"""
+
+    def __init__(self, name: str, latency: Latency, stats: CallStats):
+        self.name = name
+        self._documents: List[Dict[str, Any]] = []
+        # Increasing ObjectIds, as MongoDB assigns them (keyset pagination sorts on _id)
+        self._ids = iter(ObjectId, None)
+        self._latency = latency
+        self._stats = stats
+        self._lock = threading.RLock()
+
+    def _round_trip(self, operation: str, start: float) -> None:
+        self._stats.record(f"mongo.{operation}", time.perf_counter() - start)
+
+    def _find(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [document for document in self._documents if _matches(document, query)]
+
+    def _upsert_document(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        document = {key: value for key, value in query.items() if not isinstance(value, dict)}
+        document.setdefault("_id", next(self._ids))
+        self._documents.append(document)
+        return document
+
+    def find_one(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, sort=None, **kwargs):
+        start = time.perf_counter()
+        _sleep(self._latency.mongo)
+        with self._lock:
+            cursor = _Cursor(self._find(query or {}))
+            if sort:
+                cursor.sort(sort)
+            document = next(iter(cursor), None)
+            result = _project(document, projection) if document else None
+        self._round_trip("find_one", start)
+        return result
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, **kwargs) -> _Cursor:
+        start = time.perf_counter()
+        _sleep(self._latency.mongo)
+        with self._lock:
+            documents = [_project(document, projection) for document in self._find(query or {})]
+        self._round_trip("find", start)
+        return _Cursor(documents)
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs) -> _Cursor:
+        start = time.perf_counter()
+        _sleep(self._latency.mongo)
+        with self._lock:
+            documents = _aggregate(self._documents, pipeline)
+        self._round_trip("aggregate", start)
+        return _Cursor(documents)
+
+    def count_documents(self, query: Dict[str, Any], **kwargs) -> int:
+        _sleep(self._latency.mongo)
+        with self._lock:
+            return len(self._find(query))
+
+    def insert_one(self, document: Dict[str, Any]) -> SimpleNamespace:
+        start = time.perf_counter()
+        _sleep(self._latency.mongo)
+        with self._lock:
+            document = copy.deepcopy(document)
+            document.setdefault("_id", next(self._ids))
+            self._documents.append(document)
+        self._round_trip("insert_one", start)
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True, **kwargs) -> SimpleNamespace:
+        start = time.perf_counter()
+        _sleep(self._latency.mongo)
+        with self._lock:
+            ids = []
+            for document in documents:
+                document = copy.deepcopy(document)
+                document.setdefault("_id", next(self._ids))
+                self._documents.append(document)
+                ids.append(document["_id"])
+        self._round_trip("insert_many", start)
+        return SimpleNamespace(inserted_ids=ids)
+
+    def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **kwargs) -> SimpleNamespace:
+        start = time.perf_counter()
+        _sleep(self._latency.mongo)
+        with self._lock:
+            matches = self._find(query)
+            inserting = not matches and upsert
+            document = matches[0] if matches else (self._upsert_document(query) if upsert else None)
+            if document is not None:
+                _apply_update(document, update, inserting)
+        self._round_trip("update_one", start)
+        return SimpleNamespace(matched_count=len(matches[:1]), modified_count=int(bool(matches)), upserted_id=document["_id"] if inserting else None)
+
+    def update_many(self, query: Dict[str, Any], update: Dict[str, Any], **kwargs) -> SimpleNamespace:
+        _sleep(self._latency.mongo)
+        with self._lock:
+            matches = self._find(query)
+            for document in matches:
+                _apply_update(document, update, False)
+        return SimpleNamespace(matched_count=len(matches), modified_count=len(matches))
+
+    def find_one_and_update(
+        self,
+        query: Dict[str, Any],
+        update: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        upsert: bool = False,
+        return_document: bool = False,
+        **kwargs,
+    ):
+        start = time.perf_counter()
+        _sleep(self._latency.mongo)
+        with self._lock:
+            matches = self._find(query)
+            inserting = not matches and upsert
+            document = matches[0] if matches else (self._upsert_document(query) if upsert else None)
+            before = copy.deepcopy(document) if document is not None and not inserting else None
+            if document is not None:
+                _apply_update(document, update, inserting)
+            # ReturnDocument.AFTER is True
+            result = document if return_document else before
+            result = _project(result, projection) if result is not None else None
+        self._round_trip("find_one_and_update", start)
+        return result
+
+    def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs) -> SimpleNamespace:
+        """ReplaceOne / UpdateOne requests, applied in one round trip"""
+        start = time.perf_counter()
+        _sleep(self._latency.mongo)
+        with self._lock:
+            for request in requests:
+                matches = self._find(request._filter)
+                if not matches and not request._upsert:
+                    continue
+                if isinstance(request, ReplaceOne):
+                    if matches:
+                        self._documents.remove(matches[0])
+                    document = copy.deepcopy(request._doc)
+                    document["_id"] = matches[0]["_id"] if matches else request._filter.get("_id", next(self._ids))
+                    self._documents.append(document)
+                else:
+                    document = matches[0] if matches else self._upsert_document(request._filter)
+                    _apply_update(document, request._doc, not matches)
+        self._round_trip("bulk_write", start)
+        return SimpleNamespace(acknowledged=True)
+
+    def delete_one(self, query: Dict[str, Any]) -> SimpleNamespace:
+        _sleep(self._latency.mongo)
+        with self._lock:
+            matches = self._find(query)[:1]
+            for document in matches:
+                self._documents.remove(document)
+        return SimpleNamespace(deleted_count=len(matches))
+
+    def delete_many(self, query: Dict[str, Any]) -> SimpleNamespace:
+        _sleep(self._latency.mongo)
+        with self._lock:
+            matches = self._find(query)
+            self._documents = [document for document in self._documents if document not in matches]
+        return SimpleNamespace(deleted_count=len(matches))
+
+    def create_indexes(self, indexes, **kwargs) -> List[str]:
+        return []
+
+
+class FakeDatabase:
+    """Dict of FakeCollections, created on first access like a pymongo Database"""
+
+    def __init__(self, latency: Latency, stats: CallStats):
+        self._latency = latency
+        self._stats = stats
+        self._collections: Dict[str, FakeCollection] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = FakeCollection(name, self._latency, self._stats)
+            return self._collections[name]
+
+
+# --- Installation ---
+
+@dataclass
+class FakeBackends:
+    openai: FakeOpenAI
+    index: LatencyIndex
+    database: FakeDatabase
+    stats: CallStats
+    store_path: str
+
+
+def install(latency: Latency, answer_tokens: int = 120, store_path: Optional[str] = None) -> FakeBackends:
+    """
+    Route the app's OpenAI, vector index and MongoDB clients to the stand-ins (and set
+    RAG_MIN_SIMILARITY for the fake embeddings).
+    The vector store lives in `store_path` (a new temporary directory by default).
+    """
+    # Imported here so the module can be imported without touching the real clients
+    from src.database.mongo_client import get_db
+    from src.database.pinecone_client import get_index
+    from src.utils.clients import get_deepseek_client, get_openai_client
+
+    stats = CallStats()
+    store_path = store_path or tempfile.mkdtemp(prefix="bench-vectors-")
+    backends = FakeBackends(
+        openai=FakeOpenAI(latency, stats, pinecone_config.DIMENSION, answer_tokens),
+        index=LatencyIndex(LocalVectorStore(store_path, pinecone_config.DIMENSION), latency, stats),
+        database=FakeDatabase(latency, stats),
+        stats=stats,
+        store_path=store_path,
+    )
+    get_openai_client.override(backends.openai)
+    get_deepseek_client.override(backends.openai)
+    get_index.override(backends.index)
+    get_db.override(backends.database)
+    # The relevance cut-off of retrieval, scaled to the fake embeddings
+    rag_config.MIN_SIMILARITY = FAKE_MIN_SIMILARITY
+    return backends
+
+
+__all__ = [
+    "Latency",
+    "CallStats",
+    "FakeQuota",
+    "FakeOpenAI",
+    "LatencyIndex",
+    "FakeCollection",
+    "FakeDatabase",
+    "FakeBackends",
+    "fake_embedding",
+    "install",
+]
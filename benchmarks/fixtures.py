@@ -0,0 +1,115 @@
+"""
+Deterministic fixture documents for the offline benchmarks.
+
+Generates Vietnamese school-regulation style text (chapters, articles, clauses) so the
+benchmarks don't depend on private documents. Real files can be passed to each benchmark
+on the command line instead.
+"""
+
+# Standard library imports
+import random
+import textwrap
+import unicodedata
+from typing import List
+
+SUBJECTS = [
+    "Học sinh", "Giáo viên chủ nhiệm", "Phụ huynh học sinh", "Ban giám hiệu",
+    "Tổ chuyên môn", "Văn phòng nhà trường", "Đoàn thanh niên", "Thư viện",
+]
+ACTIONS = [
+    "có trách nhiệm thực hiện đầy đủ nội quy của nhà trường",
+    "phải có mặt tại lớp trước giờ vào học 15 phút",
+    "được tham gia các hoạt động ngoại khóa do nhà trường tổ chức",
+    "cần liên hệ với giáo viên chủ nhiệm khi nghỉ học có lý do",
+    "mặc đồng phục theo quy định vào các ngày thứ Hai và thứ Năm",
+    "nộp học phí đúng hạn theo thông báo của phòng kế toán",
+    "bảo vệ cơ sở vật chất, giữ gìn vệ sinh chung trong khuôn viên trường",
+    "tuân thủ lịch kiểm tra định kỳ và cuối học kỳ",
+]
+DETAILS = [
+    "theo quy định của Sở Giáo dục và Đào tạo Hà Nội",
+    "trong năm học 2024-2025",
+    "tại phòng 204 nhà A",
+    "vào sáng thứ Bảy hằng tuần",
+    "trừ trường hợp có giấy xác nhận của cơ sở y tế",
+    "và báo cáo kết quả cho Ban giám hiệu",
+]
+
+
+def _sentence(rng: random.Random) -> str:
+    return f"{rng.choice(SUBJECTS)} {rng.choice(ACTIONS)} {rng.choice(DETAILS)}."
+
+
+def regulation_pages(pages: int = 300, seed: int = 0) -> List[str]:
+    """
+    Text of a `pages`-page regulation document, one string per page
+    """
+    rng = random.Random(seed)
+    result = []
+    article = 0
+    for page in range(pages):
+        parts = []
+        if page % 10 == 0:
+            parts.append(f"CHƯƠNG {page // 10 + 1}. QUY ĐỊNH CHUNG VỀ HOẠT ĐỘNG GIÁO DỤC")
+        for _ in range(3):
+            article += 1
+            parts.append(f"Điều {article}. Quy định về nề nếp và học tập")
+            for clause in range(rng.randint(2, 4)):
+                parts.append(f"{clause + 1}. " + " ".join(_sentence(rng) for _ in range(rng.randint(2, 5))))
+        result.append("\n\n".join(parts))
+    return result
+
+
+def regulation_text(pages: int = 300, seed: int = 0) -> str:
+    return "\n".join(regulation_pages(pages, seed))
+
+
+def _ascii(text: str) -> str:
+    # The fixture PDF uses a standard Type 1 font, which has no Vietnamese glyphs
+    text = unicodedata.normalize("NFD", text.replace("đ", "d").replace("Đ", "D"))
+    return "".join(char for char in text if ord(char) < 128)
+
+
+def _pdf_lines(page_text: str, width: int = 95) -> List[str]:
+    lines = []
+    for paragraph in page_text.split("\n\n"):
+        lines.extend(textwrap.wrap(_ascii(paragraph), width) or [""])
+        lines.append("")
+    return lines
+
+
+def write_regulation_pdf(path: str, pages: int = 300, blank_every: int = 50, seed: int = 0) -> None:
+    """
+    Write the regulation fixture as a text-layer PDF (diacritics stripped), with every
+    `blank_every`-th page left without text like a scanned page
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for number, page_text in enumerate(regulation_pages(pages, seed), start=1):
+        commands = ["BT", "/F1 8 Tf", "10 TL", "40 800 Td"]
+        if not (blank_every and number % blank_every == 0):
+            for line in _pdf_lines(page_text):
+                escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+                commands.append(f"({escaped}) '")
+        commands.append("ET")
+        stream = "\n".join(commands).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects))
+        )
+        page_refs.append(len(objects))
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_refs))
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(output)
@@ -0,0 +1,196 @@
+"""
+Connection reuse benchmark: the shared keep-alive pool against a connection per request.
+
+A local TLS stub (self-signed certificate, generated on start) serves the OpenAI embeddings
+endpoint and counts TLS handshakes. Network distance is simulated with --rtt-ms: each
+handshake costs two round trips (TCP + TLS 1.3) and each request one. Embedding requests
+are sent through the real OpenAI SDK, sequentially and in bursts of --concurrency, with:
+
+- fresh-client: a new OpenAI client (and connection pool) per request
+- no-keepalive: one client whose pool keeps no idle connections
+- shared-pool: the app's shared pool (src/utils/clients.py, HTTP_* settings)
+
+    python benchmarks/http_pool.py --requests 60 --concurrency 8 --rtt-ms 40
+"""
+
+# Standard library imports
+import argparse
+import datetime
+import ipaddress
+import json
+import os
+import ssl
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Third-party imports
+import httpx
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from openai import OpenAI
+
+# Local imports
+from src.configs import app_config
+from src.utils.clients import create_http_client, embedding_timeout
+
+EMBEDDING = [0.0] * 8
+
+
+def write_certificate(directory: str) -> Tuple[str, str]:
+    """Self-signed certificate for 127.0.0.1, returns (certificate path, key path)"""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    certificate_path = os.path.join(directory, "stub.pem")
+    key_path = os.path.join(directory, "stub.key")
+    with open(certificate_path, "wb") as f:
+        f.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+    return certificate_path, key_path
+
+
+class TLSStubServer(ThreadingHTTPServer):
+    """Embeddings endpoint over TLS; the handshake runs (and is delayed) on the request thread"""
+    daemon_threads = True
+
+    def __init__(self, certificate_path: str, key_path: str, rtt_ms: float):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.context.load_cert_chain(certificate_path, key_path)
+        self.rtt = rtt_ms / 1000
+        self.handshakes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"https://127.0.0.1:{self.server_address[1]}/v1"
+
+    def finish_request(self, request, client_address) -> None:
+        # TCP + TLS 1.3 handshakes: two round trips before the first request
+        time.sleep(2 * self.rtt)
+        try:
+            request = self.context.wrap_socket(request, server_side=True)
+        except (ssl.SSLError, OSError):
+            return
+        with self._lock:
+            self.handshakes += 1
+        super().finish_request(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: TLSStubServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        inputs = request.get("input")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        time.sleep(self.server.rtt)
+        body = json.dumps({
+            "object": "list",
+            "data": [{"object": "embedding", "index": position, "embedding": EMBEDDING} for position in range(len(inputs))],
+            "model": request.get("model", "stub"),
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _client(base_url: str, http_client: httpx.Client) -> OpenAI:
+    return OpenAI(api_key="stub", base_url=base_url, http_client=http_client, max_retries=0)
+
+
+def make_modes(base_url: str, certificate_path: str) -> Dict[str, Callable[[], None]]:
+    """One embedding request per call, per connection handling mode"""
+    def fresh_client() -> None:
+        with httpx.Client(verify=certificate_path) as http_client:
+            _client(base_url, http_client).embeddings.create(input="xin chào", model="stub", timeout=embedding_timeout())
+
+    no_keepalive = _client(base_url, httpx.Client(verify=certificate_path, limits=httpx.Limits(max_keepalive_connections=0)))
+    shared = _client(base_url, create_http_client(verify=certificate_path))
+    return {
+        "fresh-client": fresh_client,
+        "no-keepalive": lambda: no_keepalive.embeddings.create(input="xin chào", model="stub", timeout=embedding_timeout()),
+        "shared-pool": lambda: shared.embeddings.create(input="xin chào", model="stub", timeout=embedding_timeout()),
+    }
+
+
+def measure(server: TLSStubServer, call: Callable[[], None], requests: int, concurrency: int) -> Dict[str, float]:
+    handshakes = server.handshakes
+    durations: List[float] = []
+
+    def timed() -> None:
+        start = time.perf_counter()
+        call()
+        durations.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(timed) for _ in range(requests)]:
+            future.result()
+    ordered = sorted(durations)
+    return {
+        "median_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))],
+        "wall_ms": (time.perf_counter() - start) * 1000,
+        "handshakes": server.handshakes - handshakes,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel requests of the burst runs")
+    parser.add_argument("--rtt-ms", type=float, default=30, help="simulated network round trip")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        certificate_path, key_path = write_certificate(directory)
+        server = TLSStubServer(certificate_path, key_path, args.rtt_ms)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        modes = make_modes(server.base_url, certificate_path)
+        print(f"TLS stub at {server.base_url}, rtt {args.rtt_ms:.0f} ms, pool limit {app_config.HTTP_MAX_CONNECTIONS}")
+        for concurrency in (1, args.concurrency):
+            print(f"\n{args.requests} requests, {concurrency} at a time")
+            for name, call in modes.items():
+                call()  # warm up: imports, first connection of the pooled modes
+                results = measure(server, call, args.requests, concurrency)
+                print(
+                    f"  {name:<13} median {results['median_ms']:7.1f} ms  p95 {results['p95_ms']:7.1f} ms"
+                    f"  wall {results['wall_ms']:8.1f} ms  TLS handshakes {results['handshakes']}"
+                )
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark of the LLM provider router (src/rag/llm_router.py) against local fake endpoints.
+
+Two OpenAI-compatible servers from benchmarks/fake_llm_server.py stand in for OpenAI (the
+primary: fast, with a slow tail of stalled requests) and DeepSeek (slower, steady). The same
+sequence of streamed requests runs through the real SDK clients and the router in three
+scenarios, reporting time to first token (median / p95 / max), which provider answered,
+hedges and failures:
+
+- failover: no hedging, a stalled primary request is waited out
+- hedged: the secondary is asked after --hedge-after seconds without a first token
+- outage: the primary fails every request; after BREAKER_FAILURE_THRESHOLD failures its
+  circuit opens and requests go straight to the secondary
+
+    python benchmarks/llm_routing.py --requests 40 --stall-rate 0.15 --hedge-after 1.0
+"""
+
+# Standard library imports
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Local imports
+from benchmarks.fake_llm_server import Behaviour, start_servers
+from src.configs import deepseek_config, openai_config
+from src.rag.llm_router import get_llm_router
+from src.utils.clients import get_deepseek_client, get_openai_client
+
+MESSAGES = [
+    {"role": "system", "content": "Bạn là trợ lý của trường."},
+    {"role": "user", "content": "Học sinh phải có mặt tại lớp trước giờ vào học bao nhiêu phút?"},
+]
+
+
+def configure(primary_url: str, secondary_url: str, hedge_after: float, max_retries: int) -> None:
+    """Point both providers at the fake servers and rebuild the clients and the router"""
+    for config, url in ((openai_config, primary_url), (deepseek_config, secondary_url)):
+        config.BASE_URL = url
+        config.API_KEY = config.API_KEY or "fake-key"
+        config.ENABLED = True
+        config.MAX_RETRIES = max_retries
+        config.HEDGE_AFTER_SECONDS = hedge_after
+    openai_config.PRIORITY, deepseek_config.PRIORITY = 0, 1
+    for factory in (get_openai_client, get_deepseek_client, get_llm_router):
+        factory.reset()
+
+
+def run_requests(count: int) -> Dict[str, Any]:
+    router = get_llm_router()
+    first_tokens: List[float] = []
+    providers: Dict[str, int] = {}
+    hedged = failed = 0
+    for _ in range(count):
+        start = time.perf_counter()
+        stream = router.stream(MESSAGES)
+        first_token = None
+        try:
+            for chunk in stream:
+                if first_token is None and chunk.choices and chunk.choices[0].delta.content:
+                    first_token = (time.perf_counter() - start) * 1000
+        except Exception:
+            failed += 1
+            continue
+        finally:
+            stream.close()
+        first_tokens.append(first_token or 0.0)
+        providers[stream.provider] = providers.get(stream.provider, 0) + 1
+        hedged += stream.hedged
+    ordered = sorted(first_tokens) or [0.0]
+    return {
+        "median_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))],
+        "max_ms": ordered[-1],
+        "providers": providers,
+        "hedged": hedged,
+        "failed": failed,
+        "state": router.snapshot(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--primary-first-token-ms", type=float, default=300)
+    parser.add_argument("--secondary-first-token-ms", type=float, default=700)
+    parser.add_argument("--stall-rate", type=float, default=0.15, help="share of primary requests that stall")
+    parser.add_argument("--stall-ms", type=float, default=4000)
+    parser.add_argument("--hedge-after", type=float, default=1.0, help="seconds without a first token before hedging")
+    parser.add_argument("--max-retries", type=int, default=0, help="SDK retries before the router fails over")
+    args = parser.parse_args()
+
+    primary, secondary = start_servers([
+        Behaviour(first_token_ms=args.primary_first_token_ms, stall_rate=args.stall_rate, stall_ms=args.stall_ms),
+        Behaviour(first_token_ms=args.secondary_first_token_ms),
+    ])
+    scenarios = [("failover", 0.0, 0.0), ("hedged", args.hedge_after, 0.0), ("outage", args.hedge_after, 1.0)]
+    for name, hedge_after, error_rate in scenarios:
+        # Same random draws in every scenario
+        primary.random.seed(0)
+        primary.behaviour.error_rate = error_rate
+        configure(primary.base_url, secondary.base_url, hedge_after, args.max_retries)
+        results = run_requests(args.requests)
+        print(
+            f"{name:<9} first token median {results['median_ms']:7.1f} ms  p95 {results['p95_ms']:7.1f} ms"
+            f"  max {results['max_ms']:7.1f} ms  providers {results['providers']}"
+            f"  hedged {results['hedged']}  failed {results['failed']}"
+        )
+        for provider, state in results["state"].items():
+            print(f"          {provider:<9} {state}")
+
+
+if __name__ == "__main__":
+    main()
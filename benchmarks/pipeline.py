@@ -0,0 +1,249 @@
+"""
+Offline end-to-end benchmark of the ingestion and chat paths.
+
+OpenAI, Pinecone and MongoDB are replaced by the local stand-ins of benchmarks/fakes.py,
+each with a configurable injected latency, so the measurements cover the app's own work
+plus a controlled amount of network time. Reported per stage (median / p95 / mean, ms):
+
+- ingestion of a fixture document (or the files given): extract, chunk, embed, upsert,
+  plus a re-ingestion of the unchanged document
+- chat turns through generate_response_stream: embed, vector_query, lexical, context,
+  session_read, llm_first_token, llm, session_write and the turn total
+
+Results are written as JSON (commit, settings, per-stage statistics, backend call counts)
+so runs can be compared across commits:
+
+    python benchmarks/pipeline.py --turns 30
+    python benchmarks/pipeline.py --chat-first-token-ms 0 --compare .cache/benchmarks/pipeline-abc1234.json
+"""
+
+# Standard library imports
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Local imports
+from benchmarks.fakes import Latency, install
+from benchmarks.fixtures import write_regulation_pdf
+from src.configs import openai_config, rag_config
+from src.database.pinecone_client import iter_namespace_chunks, replace_document_chunks
+from src.ingestion.chunking import iter_chunks
+from src.ingestion.extraction import extract_document
+from src.models import Document
+from src.rag.bm25 import get_lexical_index
+from src.rag.generate_response import generate_response_stream
+from src.utils.timing import StageTimer
+
+QUERIES = [
+    "Học sinh phải có mặt tại lớp trước giờ vào học bao nhiêu phút?",
+    "Quy định về đồng phục vào thứ Hai và thứ Năm như thế nào?",
+    "Phụ huynh nộp học phí ở đâu?",
+    "Khi nghỉ học có lý do cần liên hệ với ai?",
+    "Lịch kiểm tra định kỳ và cuối học kỳ",
+    "Phòng 204 nhà A dùng để làm gì?",
+    "Đoàn thanh niên tổ chức hoạt động ngoại khóa vào khi nào?",
+    "Thư viện có trách nhiệm gì trong năm học 2024-2025?",
+]
+
+
+def percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    position = min(len(ordered) - 1, max(0, round(share * (len(ordered) - 1))))
+    return ordered[position]
+
+
+def summarize(samples: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    return {
+        stage: {
+            "count": len(values),
+            "median_ms": round(statistics.median(values), 2),
+            "p95_ms": round(percentile(values, 0.95), 2),
+            "mean_ms": round(statistics.mean(values), 2),
+        }
+        for stage, values in samples.items()
+        if values
+    }
+
+
+class ProgressTimer:
+    """Splits replace_document_chunks into embed / upsert wall time from its progress callbacks"""
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self._stage: Optional[str] = None
+        self._since = time.perf_counter()
+
+    def __call__(self, stage: str, done: int, total: int) -> None:
+        self.switch({"embedding": "embed", "upserting": "upsert"}.get(stage, stage))
+
+    def switch(self, stage: Optional[str]) -> None:
+        now = time.perf_counter()
+        if self._stage is not None:
+            self.durations[self._stage] = self.durations.get(self._stage, 0.0) + (now - self._since) * 1000
+        self._stage, self._since = stage, now
+
+
+def ingest(path: str, namespace: str) -> Dict[str, float]:
+    """Run one ingestion of `path`, returning stage durations in ms"""
+    file_type = os.path.splitext(path)[1].lower()
+    durations: Dict[str, float] = {}
+
+    # Measured separately: in the worker, chunking overlaps extraction
+    start = time.perf_counter()
+    pages = list(extract_document(path, file_type))
+    durations["extract"] = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    chunks = list(iter_chunks(pages))
+    durations["chunk"] = (time.perf_counter() - start) * 1000
+
+    document = Document(
+        document_id=f"bench-{os.path.basename(path)}",
+        name=os.path.basename(path),
+        topic=namespace,
+        file_type=file_type,
+        file_size=os.path.getsize(path),
+        chunk_count=len(chunks),
+    )
+    progress = ProgressTimer()
+    start = time.perf_counter()
+    stats = replace_document_chunks(chunks, namespace, document, batch_size=100, on_progress=progress)
+    progress.switch(None)
+    durations["embed_upsert"] = (time.perf_counter() - start) * 1000
+    durations.update(progress.durations)
+    durations["total"] = durations["extract"] + durations["chunk"] + durations["embed_upsert"]
+    durations["chunks"] = len(chunks)
+    durations["embedded"] = stats["embedded"]
+    return durations
+
+
+def run_ingestion(paths: List[str], namespace: str) -> Dict[str, Any]:
+    first = [ingest(path, namespace) for path in paths]
+    # Same files again: every chunk is unchanged, only the index lookups remain
+    again = [ingest(path, namespace) for path in paths]
+    return {
+        "documents": len(paths),
+        "chunks": sum(run["chunks"] for run in first),
+        "stages": summarize({stage: [run[stage] for run in first if stage in run] for stage in ("extract", "chunk", "embed", "upsert", "total")}),
+        "unchanged_reingest": summarize({"total": [run["total"] for run in again]}),
+        "reembedded_on_reingest": sum(run["embedded"] for run in again),
+    }
+
+
+def run_chat(turns: int, sessions: int, namespace: Optional[str]) -> Dict[str, Any]:
+    samples: Dict[str, List[float]] = {}
+    session_ids = [str(uuid.uuid4()) for _ in range(sessions)]
+    for turn in range(turns):
+        timer = StageTimer()
+        first_token = None
+        for _ in generate_response_stream(session_ids[turn % sessions], QUERIES[turn % len(QUERIES)], namespace, timer=timer):
+            if first_token is None:
+                first_token = timer.elapsed_ms()
+        samples.setdefault("first_token", []).append(first_token or 0.0)
+        samples.setdefault("total", []).append(timer.elapsed_ms())
+        for stage, duration in timer.durations.items():
+            samples.setdefault(stage, []).append(duration)
+    return {"turns": turns, "sessions": sessions, "stages": summarize(samples)}
+
+
+def git_revision() -> Dict[str, Any]:
+    def _git(*args: str) -> str:
+        result = subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True)
+        return result.stdout.strip()
+    return {"commit": _git("rev-parse", "--short", "HEAD"), "dirty": bool(_git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def _report_stages(results: Dict[str, Any], section: str) -> Dict[str, Dict[str, float]]:
+    stages = dict(results.get(section, {}).get("stages", {}))
+    if "unchanged_reingest" in results.get(section, {}):
+        stages["unchanged re-ingest"] = results[section]["unchanged_reingest"]["total"]
+    return stages
+
+
+def print_report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    for section in ("ingestion", "chat"):
+        print(f"\n{section} ({results['revision']['commit']}{'+dirty' if results['revision']['dirty'] else ''})")
+        previous = _report_stages(baseline or {}, section)
+        for stage, stats in _report_stages(results, section).items():
+            line = f"  {stage:<36} median {stats['median_ms']:9.1f} ms  p95 {stats['p95_ms']:9.1f} ms"
+            if stage in previous and previous[stage]["median_ms"]:
+                change = stats["median_ms"] / previous[stage]["median_ms"] - 1
+                line += f"  ({previous[stage]['median_ms']:.1f} ms before, {change:+.0%})"
+            print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="documents to ingest instead of the generated fixture")
+    parser.add_argument("--pages", type=int, default=60, help="pages of the generated fixture PDF")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=4, help="chat turns are spread round-robin over this many sessions")
+    parser.add_argument("--namespace", default=rag_config.DEFAULT_NAMESPACE, help="ingestion namespace; chat turns are routed")
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    defaults = Latency()
+    for field, value in defaults.to_dict().items():
+        parser.add_argument(f"--{field.replace('_', '-')}-ms", dest=field, type=float, default=value)
+    parser.add_argument("--output", help="results file (default .cache/benchmarks/pipeline-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    latency = Latency(**{field: getattr(args, field) for field in defaults.to_dict()})
+    # Every embedding should reach the (fake) API, not the persistent cache
+    openai_config.EMBEDDING_CACHE_ENABLED = False
+    backends = install(latency, answer_tokens=args.answer_tokens)
+
+    paths: List[str] = args.files
+    if not paths:
+        fixture = os.path.join(tempfile.mkdtemp(), "fixture.pdf")
+        write_regulation_pdf(fixture, pages=args.pages)
+        paths = [fixture]
+
+    ingestion = run_ingestion(paths, args.namespace)
+    # Steady state: the lexical index is built before the first question, as on a warm server
+    get_lexical_index(args.namespace, iter_namespace_chunks)
+    chat = run_chat(args.turns, args.sessions, None)
+
+    revision = git_revision()
+    results = {
+        "benchmark": "pipeline",
+        "revision": revision,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "latency_ms": latency.to_dict(),
+        "settings": {
+            "pages": args.pages if not args.files else None,
+            "files": [os.path.basename(path) for path in args.files],
+            "hybrid_search": rag_config.HYBRID_SEARCH,
+            "topic_routing": rag_config.TOPIC_ROUTING,
+            "concurrent_retrieval": rag_config.CONCURRENT_RETRIEVAL,
+            "answer_cache": rag_config.ANSWER_CACHE_ENABLED,
+        },
+        "ingestion": ingestion,
+        "chat": chat,
+        "backend_calls": backends.stats.to_dict(),
+    }
+
+    output = args.output or os.path.join(REPO_ROOT, ".cache", "benchmarks", f"pipeline-{revision['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,8 @@ from datetime import datetime
 
 # Import từ hệ thống RAG của bạn
 try:
-    from src.rag.generate_response import generate_response
-    from src.configs.settings import pinecone_config
+    from src.rag.generate_response import generate_response_stream
+    from src.configs.settings import pinecone_config, rag_config
 except ImportError as e:
     st.error(f"Lỗi import: {e}")
     st.warning("Vui lòng đảm bảo rằng cấu trúc file và các thư viện cần thiết đã được cài đặt chính xác.")
@@ -23,9 +23,9 @@ st.caption("Trợ lý AI sẵn sàng trả lời các câu hỏi về thông tin
 if 'session_id' not in st.session_state:
     st.session_state.session_id = str(uuid.uuid4())
 
-# Khởi tạo chủ đề chat mặc định
+# Khởi tạo chủ đề chat mặc định (None: tự động chọn các namespace phù hợp với câu hỏi)
 if 'selected_topic' not in st.session_state:
-    st.session_state.selected_topic = pinecone_config.NAME_SPACE.THONG_TIN_TRUONG.value
+    st.session_state.selected_topic = None if rag_config.TOPIC_ROUTING else pinecone_config.NAME_SPACE.THONG_TIN_TRUONG.value
 
 # Khởi tạo lịch sử chat với tin nhắn chào mừng
 if "messages" not in st.session_state:
@@ -51,24 +51,21 @@ if prompt := st.chat_input("Nhập câu hỏi của bạn..."):
 
     # Tạo và hiển thị phản hồi của bot
     with st.chat_message("assistant"):
-        # Hiển thị spinner trong khi chờ phản hồi
-        with st.spinner("AI đang suy nghĩ..."):
-            try:
-                # Gọi hàm RAG để lấy câu trả lời
-                response = generate_response(
-                    session_id=st.session_state.session_id,
-                    query=prompt,
-                    namespace=st.session_state.selected_topic
-                )
-                st.markdown(response)
-                # Thêm phản hồi của bot vào lịch sử
-                st.session_state.messages.append({"role": "assistant", "content": response})
+        try:
+            # Gọi hàm RAG và hiển thị câu trả lời theo từng token ngay khi được sinh ra
+            response = st.write_stream(generate_response_stream(
+                session_id=st.session_state.session_id,
+                query=prompt,
+                namespace=st.session_state.selected_topic
+            ))
+            # Thêm phản hồi của bot vào lịch sử
+            st.session_state.messages.append({"role": "assistant", "content": response})
 
-            except Exception as e:
-                # Bắt lỗi và hiển thị thông báo thân thiện
-                error_message = f"Xin lỗi, đã có lỗi xảy ra trong quá trình xử lý. Vui lòng thử lại. (Lỗi: {e})"
-                st.error(error_message)
-                st.session_state.messages.append({"role": "assistant", "content": error_message})
+        except Exception as e:
+            # Bắt lỗi và hiển thị thông báo thân thiện
+            error_message = f"Xin lỗi, đã có lỗi xảy ra trong quá trình xử lý. Vui lòng thử lại. (Lỗi: {e})"
+            st.error(error_message)
+            st.session_state.messages.append({"role": "assistant", "content": error_message})
 
 # --- Chức năng phụ ---
 # Cung cấp nút để bắt đầu lại cuộc trò chuyện
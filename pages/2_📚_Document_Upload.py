@@ -1,16 +1,12 @@
 import streamlit as st
-import uuid
 from datetime import datetime
-from typing import List
 
 # Import các thư viện xử lý tài liệu và kết nối CSDL
 # Giả định các import này hoạt động chính xác trong môi trường của bạn
 try:
-    import PyPDF2
-    import docx
-    from src.database.pinecone_client import upsert_chunk_texts
     from src.database.mongo_client import document_collection
-    from src.models.document import Document
+    from src.ingestion.jobs import get_job_queue, ACTIVE_STATES, QUEUED, EXTRACTING, CHUNKING, EMBEDDING, UPSERTING, COMPLETED, FAILED
+    from src.ingestion.worker import submit_document, start_worker
     from src.configs.settings import app_config, pinecone_config
 except ImportError as e:
     st.error(f"Lỗi import: {e}")
@@ -24,91 +20,43 @@ st.set_page_config(
     layout="centered"
 )
 
-# --- Các hàm xử lý (Giữ nguyên logic gốc) ---
-
-def extract_text_from_pdf(file) -> str:
-    """Trích xuất văn bản từ file PDF."""
-    pdf_reader = PyPDF2.PdfReader(file)
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text() + "\n"
-    return text
-
-def extract_text_from_docx(file) -> str:
-    """Trích xuất văn bản từ file Word."""
-    doc = docx.Document(file)
-    text = "\n".join([para.text for para in doc.paragraphs])
-    return text
-
-def extract_text_from_txt(file) -> str:
-    """Trích xuất văn bản từ file text."""
-    content = file.read()
-    # Thử decode bằng utf-8, nếu lỗi thì thử latin-1
-    try:
-        return content.decode('utf-8')
-    except UnicodeDecodeError:
-        file.seek(0)
-        return content.decode('latin-1', errors='ignore')
-
-def extract_text(file, file_type: str) -> str:
-    """Trích xuất văn bản dựa trên loại file."""
-    extractors = {
-        '.pdf': extract_text_from_pdf,
-        '.docx': extract_text_from_docx,
-        '.txt': extract_text_from_txt,
-        '.md': extract_text_from_txt,
-    }
-    if file_type in extractors:
-        return extractors[file_type](file)
-    raise ValueError(f"Loại file không được hỗ trợ: {file_type}")
-
-def split_text_into_chunks(text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
-    """Chia văn bản thành các đoạn nhỏ có chồng lấn."""
-    if not text or not text.strip():
-        return []
-    
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        if end >= len(text):
-            break
-        start += (chunk_size - overlap)
-        
-    return [chunk.strip() for chunk in chunks if chunk.strip()]
-
-def process_document(file, filename: str, topic: str) -> tuple:
-    """Xử lý tài liệu, trả về các đoạn nhỏ và metadata."""
-    file_type = '.' + filename.split('.')[-1].lower()
-    
-    text = extract_text(file, file_type)
-    if not text.strip():
-        raise ValueError("Không thể trích xuất nội dung từ file hoặc file trống.")
-        
-    chunks = split_text_into_chunks(text)
-    if not chunks:
-        raise ValueError("Nội dung file quá ngắn để có thể chia nhỏ.")
-
-    document = Document(
-        document_id=str(uuid.uuid4()),
-        name=filename,
-        topic=topic,
-        file_type=file_type,
-        file_size=file.tell(),
-        chunk_count=len(chunks)
-    )
-    return chunks, document
+# --- Các hàm xử lý ---
+
+# Tài liệu được xử lý ở tiến trình nền (trích xuất -> chia đoạn -> embedding -> lưu vector),
+# trang này chỉ đưa file vào hàng đợi và theo dõi tiến độ
+if app_config.INGESTION_IN_PROCESS_WORKER:
+    start_worker()
+job_queue = get_job_queue()
+
+STATE_LABELS = {
+    QUEUED: "⏳ Đang chờ xử lý",
+    EXTRACTING: "📄 Đang trích xuất văn bản",
+    CHUNKING: "✂️ Đang chia đoạn",
+    EMBEDDING: "🧠 Đang tạo embedding",
+    UPSERTING: "💾 Đang lưu vào CSDL vector",
+    COMPLETED: "✅ Hoàn thành",
+    FAILED: "❌ Lỗi",
+}
+
+DOCUMENTS_PER_PAGE = 10
 
 @st.cache_data(ttl=60) # Cache kết quả trong 60 giây
-def get_documents_cached():
-    """Lấy danh sách tài liệu từ CSDL với cache."""
+def get_documents_page_cached(topic, after):
+    """Lấy một trang tài liệu (mới nhất trước) từ CSDL với cache; lọc theo chủ đề ngay trong truy vấn."""
     try:
-        # Giả định hàm này trả về một list các dictionary
-        return document_collection.get_all_documents()
+        return document_collection.list_documents(topic=topic, limit=DOCUMENTS_PER_PAGE, after=after)
     except Exception as e:
         st.error(f"Không thể tải danh sách tài liệu: {e}")
-        return []
+        return [], None
+
+@st.cache_data(ttl=60)
+def get_document_stats_cached():
+    """Số tài liệu, số phần và dung lượng theo chủ đề (tổng hợp trong CSDL)."""
+    try:
+        return document_collection.get_document_stats()
+    except Exception as e:
+        st.error(f"Không thể tải thống kê tài liệu: {e}")
+        return {"topics": {}, "total": {"documents": 0, "chunks": 0, "bytes": 0}}
 
 # --- Giao diện người dùng ---
 
@@ -145,54 +93,78 @@ if uploaded_files:
             st.info(f"📄 **{file.name}** ({file.size / 1024:.1f} KB)")
 
     if st.button("🚀 Xử lý các tài liệu đã tải lên", type="primary", use_container_width=True):
-        progress_bar = st.progress(0, text="Bắt đầu quá trình xử lý...")
-        success_count = 0
-        
-        for i, file in enumerate(uploaded_files):
-            # Cập nhật thanh tiến trình
-            progress_text = f"Đang xử lý file {i+1}/{len(uploaded_files)}: {file.name}"
-            progress_bar.progress((i + 1) / len(uploaded_files), text=progress_text)
-            
+        queued_count = 0
+        for file in uploaded_files:
             try:
-                # Đảm bảo con trỏ file ở đầu
-                file.seek(0)
-                
-                # Xử lý file
-                chunks, document = process_document(file, file.name, selected_topic)
-                
-                # Lưu vào CSDL
-                # upsert_chunk_texts(chunks, selected_topic, document)
-                # document_collection.create_document(
-                #     document_id=document.document_id,
-                #     name=document.name,
-                #     topic=document.topic,
-                #     file_type=document.file_type,
-                #     file_size=document.file_size,
-                #     chunk_count=document.chunk_count
-                # )
-                
-                st.success(f"✅ **{file.name}**: Xử lý thành công ({document.chunk_count} phần).")
-                success_count += 1
-            
+                submit_document(file.getvalue(), file.name, selected_topic)
+                queued_count += 1
             except Exception as e:
                 st.error(f"❌ **{file.name}**: Đã xảy ra lỗi - {e}")
+        if queued_count:
+            st.info(
+                f"📥 Đã đưa **{queued_count}/{len(uploaded_files)}** tài liệu vào hàng đợi. "
+                "Quá trình xử lý chạy nền, bạn có thể rời trang hoặc tải lại mà không mất tiến độ."
+            )
+        st.cache_data.clear()
 
-        # Thông báo kết quả cuối cùng
-        progress_bar.empty()
-        st.info(f"🏁 **Hoàn thành!** Đã xử lý thành công **{success_count}/{len(uploaded_files)}** tài liệu.")
-        # Xóa cache để danh sách được cập nhật
+# 4. Tiến độ xử lý (tự cập nhật khi còn tài liệu đang xử lý)
+@st.fragment(run_every=app_config.INGESTION_POLL_INTERVAL if job_queue.has_active_jobs() else None)
+def show_ingestion_jobs():
+    jobs = job_queue.list_jobs(limit=10)
+    if not jobs:
+        return
+
+    st.subheader("4. Tiến độ xử lý")
+    for job in jobs:
+        with st.container(border=True):
+            st.markdown(f"**📄 {job['name']}** — {STATE_LABELS.get(job['state'], job['state'])}")
+            if job["state"] in (EMBEDDING, UPSERTING) and job["chunks_total"]:
+                st.progress(
+                    min(1.0, job["chunks_done"] / job["chunks_total"]),
+                    text=f"{job['chunks_done']}/{job['chunks_total']} phần"
+                )
+            elif job["state"] == COMPLETED and job["stats"]:
+                st.caption(
+                    f"{job['chunk_count']} phần: {job['stats'].get('embedded', 0)} phần mới, "
+                    f"bỏ qua embedding {job['stats'].get('skipped', 0)} phần không đổi, "
+                    f"xóa {job['stats'].get('deleted', 0)} phần cũ."
+                )
+            elif job["state"] == FAILED:
+                st.error(job["error"] or "Không rõ nguyên nhân.")
+            elif job["state"] in ACTIVE_STATES and job["error"]:
+                st.caption(f"Lần thử {job['attempts']} gặp lỗi, sẽ thử lại: {job['error']}")
+            if job["empty_pages"]:
+                st.warning(
+                    f"⚠️ {len(job['empty_pages'])} trang không có lớp văn bản "
+                    f"(có thể là ảnh scan) nên không được đưa vào hệ thống: trang "
+                    f"{', '.join(str(page) for page in job['empty_pages'])}."
+                )
+
+    # Khi có tài liệu vừa xử lý xong: làm mới danh sách tài liệu (và dừng tự cập nhật nếu đã hết việc)
+    finished = {job["job_id"] for job in jobs if job["state"] not in ACTIVE_STATES}
+    known = st.session_state.get("finished_jobs")
+    st.session_state.finished_jobs = finished
+    if known is not None and finished - known:
         st.cache_data.clear()
+        st.rerun()
+
+show_ingestion_jobs()
 
 st.divider()
 
 # Danh sách tài liệu hiện có
 st.header("📖 Tài liệu hiện có trong hệ thống")
 
-documents = get_documents_cached()
+stats = get_document_stats_cached()
 
-if not documents:
+if not stats["total"]["documents"]:
     st.info("Hiện chưa có tài liệu nào trong cơ sở dữ liệu.")
 else:
+    col_documents, col_chunks, col_size = st.columns(3)
+    col_documents.metric("Tài liệu", stats["total"]["documents"])
+    col_chunks.metric("Số phần", stats["total"]["chunks"])
+    col_size.metric("Dung lượng", f"{stats['total']['bytes'] / (1024 * 1024):.1f} MB")
+
     # Bộ lọc
     all_topics = ["Tất cả"] + list(topic_options.keys())
     filter_topic = st.selectbox(
@@ -200,22 +172,33 @@ else:
         options=all_topics,
         format_func=lambda x: "Tất cả" if x == "Tất cả" else topic_options.get(x, x)
     )
-
-    # Lọc và hiển thị
-    if filter_topic == "Tất cả":
-        filtered_docs = documents
-    else:
-        filtered_docs = [doc for doc in documents if doc.get('topic') == filter_topic]
-        
-    st.write(f"Tìm thấy {len(filtered_docs)} tài liệu.")
-
-    # Hiển thị 10 tài liệu mới nhất
-    for doc in reversed(filtered_docs[-10:]):
+    topic = None if filter_topic == "Tất cả" else filter_topic
+    topic_count = stats["total"]["documents"] if topic is None else stats["topics"].get(topic, {}).get("documents", 0)
+    st.write(f"Tìm thấy {topic_count} tài liệu.")
+
+    # Phân trang theo con trỏ: lưu con trỏ đầu của các trang đã xem, đổi bộ lọc thì về trang đầu
+    if "document_cursors" not in st.session_state or st.session_state.document_filter != topic:
+        st.session_state.document_filter = topic
+        st.session_state.document_cursors = [None]
+    cursors = st.session_state.document_cursors
+    page_documents, next_cursor = get_documents_page_cached(topic, cursors[-1])
+
+    for doc in page_documents:
         with st.container(border=True):
             st.markdown(f"**📄 {doc.get('name', 'N/A')}**")
             meta_info = (
                 f"**Chủ đề:** {topic_options.get(doc.get('topic'), 'N/A')} | "
                 f"**Kích thước:** {doc.get('file_size', 0) / 1024:.1f} KB | "
-                f"**Số phần:** {doc.get('chunk_count', 0)}"
+                f"**Số phần:** {doc.get('chunk_count', 0)} | "
+                f"**Trạng thái:** {STATE_LABELS.get(doc.get('status'), doc.get('status', 'N/A'))}"
             )
-            st.caption(meta_info)
\ No newline at end of file
+            st.caption(meta_info)
+
+    col_previous, col_page, col_next = st.columns([1, 2, 1])
+    if col_previous.button("← Trang trước", disabled=len(cursors) == 1, use_container_width=True):
+        cursors.pop()
+        st.rerun()
+    col_page.caption(f"Trang {len(cursors)}/{max(1, -(-topic_count // DOCUMENTS_PER_PAGE))}")
+    if col_next.button("Trang sau →", disabled=next_cursor is None, use_container_width=True):
+        cursors.append(next_cursor)
+        st.rerun()
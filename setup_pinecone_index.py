@@ -0,0 +1,19 @@
+import argparse
+
+from src.configs import pinecone_config
+from src.database.pinecone_client import migrate_chunk_texts, provision_index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Provision the Pinecone index")
+    parser.add_argument(
+        "--migrate-chunk-texts",
+        action="store_true",
+        help="move chunk texts stored in vector metadata (older ingestions) to the MongoDB chunk store",
+    )
+    args = parser.parse_args()
+
+    provision_index()
+    if args.migrate_chunk_texts:
+        for namespace in pinecone_config.NAME_SPACE:
+            migrate_chunk_texts(namespace.value)
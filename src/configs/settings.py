@@ -4,6 +4,7 @@ Contains all application settings, API configurations, and environment managemen
 """
 
 # Standard library imports
+import os
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Dict, List
@@ -21,6 +22,43 @@ class AppConfig:
     # File Upload Limits
     MAX_UPLOAD_SIZE_MB: int = int(st.secrets.get("MAX_UPLOAD_SIZE_MB", 10))
     ALLOWED_FILE_TYPES: List[str] = field(default_factory=lambda: [".pdf", ".docx", ".txt", ".md"])
+
+    # Document Extraction (PDF pages are extracted in a process pool)
+    EXTRACTION_WORKERS: int = int(st.secrets.get("EXTRACTION_WORKERS", min(4, os.cpu_count() or 1)))
+    EXTRACTION_PAGES_PER_TASK: int = int(st.secrets.get("EXTRACTION_PAGES_PER_TASK", 8))
+    # Smaller PDFs are extracted in-process, the pool round trip isn't worth it
+    EXTRACTION_MIN_PARALLEL_PAGES: int = int(st.secrets.get("EXTRACTION_MIN_PARALLEL_PAGES", 16))
+
+    # Background Ingestion (SQLite job queue + worker)
+    INGESTION_QUEUE_PATH: str = st.secrets.get("INGESTION_QUEUE_PATH", ".cache/ingestion.sqlite3")
+    INGESTION_UPLOAD_DIR: str = st.secrets.get("INGESTION_UPLOAD_DIR", ".cache/uploads")
+    # Chunks embedded and upserted per checkpoint (a few embedding requests' worth)
+    INGESTION_BATCH_SIZE: int = int(st.secrets.get("INGESTION_BATCH_SIZE", 400))
+    INGESTION_POLL_INTERVAL: float = float(st.secrets.get("INGESTION_POLL_INTERVAL", 2.0))
+    # A job whose worker hasn't checkpointed for this long is considered abandoned and resumed
+    INGESTION_LEASE_SECONDS: int = int(st.secrets.get("INGESTION_LEASE_SECONDS", 300))
+    INGESTION_MAX_ATTEMPTS: int = int(st.secrets.get("INGESTION_MAX_ATTEMPTS", 3))
+    # Jobs processed at the same time per process; their embedding requests share the quota fairly
+    INGESTION_WORKERS: int = int(st.secrets.get("INGESTION_WORKERS", 2))
+    # Run the worker as a thread of the Streamlit server (disable when running `python -m src.ingestion.worker`)
+    INGESTION_IN_PROCESS_WORKER: bool = str(st.secrets.get("INGESTION_IN_PROCESS_WORKER", True)).lower() == "true"
+
+    # Tracing: per chat turn / ingestion job records, written to MongoDB in batches by a
+    # background thread; records beyond TRACE_BUFFER_SIZE pending ones are dropped, never waited on
+    TRACING_ENABLED: bool = str(st.secrets.get("TRACING_ENABLED", True)).lower() == "true"
+    TRACE_BUFFER_SIZE: int = int(st.secrets.get("TRACE_BUFFER_SIZE", 1000))
+    TRACE_BATCH_SIZE: int = int(st.secrets.get("TRACE_BATCH_SIZE", 100))
+    TRACE_FLUSH_INTERVAL: float = float(st.secrets.get("TRACE_FLUSH_INTERVAL", 2.0))
+
+    # HTTP connection pool shared by the OpenAI and DeepSeek clients (src/utils/clients.py).
+    # Idle connections are kept alive for HTTP_KEEPALIVE_EXPIRY seconds so bursts reuse them
+    # instead of paying a TLS handshake each; HTTP_POOL_TIMEOUT bounds the wait for a free one.
+    # HTTP2 needs the optional `h2` package (pip install "httpx[http2]").
+    HTTP_MAX_CONNECTIONS: int = int(st.secrets.get("HTTP_MAX_CONNECTIONS", 32))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(st.secrets.get("HTTP_MAX_KEEPALIVE_CONNECTIONS", 16))
+    HTTP_KEEPALIVE_EXPIRY: float = float(st.secrets.get("HTTP_KEEPALIVE_EXPIRY", 60))
+    HTTP_POOL_TIMEOUT: float = float(st.secrets.get("HTTP_POOL_TIMEOUT", 5))
+    HTTP2: bool = str(st.secrets.get("HTTP2", False)).lower() == "true"
     
     # Topics Configuration
     SUPPORTED_TOPICS: Dict[str, Dict] = field(default_factory=lambda: {
@@ -39,17 +77,66 @@ class DeepSeekConfig:
     BASE_URL: str = st.secrets.get("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
     MODEL: str = st.secrets.get("DEEPSEEK_MODEL", "deepseek-chat")
     TEMPERATURE: float = float(st.secrets.get("DEEPSEEK_TEMPERATURE", 0.1))
+    
+    # Client timeouts (seconds) and SDK-level retries
+    TIMEOUT: float = float(st.secrets.get("DEEPSEEK_TIMEOUT", 60))
+    CONNECT_TIMEOUT: float = float(st.secrets.get("DEEPSEEK_CONNECT_TIMEOUT", 5))
+    MAX_RETRIES: int = int(st.secrets.get("DEEPSEEK_MAX_RETRIES", 2))
+    
+    # Chat provider routing (src/rag/llm_router.py): used when an API key is configured, after
+    # providers with a lower PRIORITY unless measured to be faster. HEDGE_AFTER_SECONDS: when this
+    # provider is tried first and sends no token for this long, the next provider is asked too
+    # (0 disables hedging). The circuit breaker opens after BREAKER_FAILURE_THRESHOLD consecutive
+    # failures and lets a trial request through after BREAKER_COOLDOWN_SECONDS.
+    ENABLED: bool = str(st.secrets.get("DEEPSEEK_ENABLED", bool(st.secrets.get("DEEPSEEK_API_KEY", "")))).lower() == "true"
+    PRIORITY: int = int(st.secrets.get("DEEPSEEK_PRIORITY", 1))
+    HEDGE_AFTER_SECONDS: float = float(st.secrets.get("DEEPSEEK_HEDGE_AFTER_SECONDS", 4.0))
+    BREAKER_FAILURE_THRESHOLD: int = int(st.secrets.get("DEEPSEEK_BREAKER_FAILURE_THRESHOLD", 3))
+    BREAKER_COOLDOWN_SECONDS: float = float(st.secrets.get("DEEPSEEK_BREAKER_COOLDOWN_SECONDS", 30))
 
 
 @dataclass 
 class OpenAIConfig:
-    """OpenAI API configuration (for embeddings)"""
+    """OpenAI API configuration (embeddings and chat)"""
     
     API_KEY: str = st.secrets.get("OPENAI_API_KEY", "")
     BASE_URL: str = st.secrets.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
     EMBEDDING_MODEL: str = st.secrets.get("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
     LLM_MODEL: str = st.secrets.get("OPENAI_LLM_MODEL", "gpt-4o-mini")
     TEMPERATURE: float = float(st.secrets.get("OPENAI_TEMPERATURE", 0.1))
+    
+    # Client timeouts (seconds) and SDK-level retries. TIMEOUT is the read timeout of chat
+    # requests (for streams: the longest gap between chunks); embedding requests are small
+    # and get the shorter EMBEDDING_TIMEOUT, so a stalled socket fails (and is retried) sooner
+    TIMEOUT: float = float(st.secrets.get("OPENAI_TIMEOUT", 60))
+    CONNECT_TIMEOUT: float = float(st.secrets.get("OPENAI_CONNECT_TIMEOUT", 5))
+    EMBEDDING_TIMEOUT: float = float(st.secrets.get("OPENAI_EMBEDDING_TIMEOUT", 20))
+    MAX_RETRIES: int = int(st.secrets.get("OPENAI_MAX_RETRIES", 2))
+    
+    # Chat provider routing, see DeepSeekConfig
+    ENABLED: bool = str(st.secrets.get("OPENAI_ENABLED", True)).lower() == "true"
+    PRIORITY: int = int(st.secrets.get("OPENAI_PRIORITY", 0))
+    HEDGE_AFTER_SECONDS: float = float(st.secrets.get("OPENAI_HEDGE_AFTER_SECONDS", 4.0))
+    BREAKER_FAILURE_THRESHOLD: int = int(st.secrets.get("OPENAI_BREAKER_FAILURE_THRESHOLD", 3))
+    BREAKER_COOLDOWN_SECONDS: float = float(st.secrets.get("OPENAI_BREAKER_COOLDOWN_SECONDS", 30))
+    
+    # Batched embedding (ingestion)
+    EMBEDDING_BATCH_SIZE: int = int(st.secrets.get("OPENAI_EMBEDDING_BATCH_SIZE", 100))
+    EMBEDDING_MAX_CONCURRENCY: int = int(st.secrets.get("OPENAI_EMBEDDING_MAX_CONCURRENCY", 4))
+    EMBEDDING_MAX_RETRIES: int = int(st.secrets.get("OPENAI_EMBEDDING_MAX_RETRIES", 3))
+    EMBEDDING_RETRY_BACKOFF: float = float(st.secrets.get("OPENAI_EMBEDDING_RETRY_BACKOFF", 1.0))
+    
+    # Embedding quota of the account (src/utils/rate_limit.py): requests are scheduled to stay
+    # at EMBEDDING_RATE_HEADROOM of these limits, a 429 pauses them for its retry-after hint
+    EMBEDDING_RATE_LIMIT_ENABLED: bool = str(st.secrets.get("OPENAI_EMBEDDING_RATE_LIMIT_ENABLED", True)).lower() == "true"
+    EMBEDDING_RPM_LIMIT: int = int(st.secrets.get("OPENAI_EMBEDDING_RPM_LIMIT", 3000))
+    EMBEDDING_TPM_LIMIT: int = int(st.secrets.get("OPENAI_EMBEDDING_TPM_LIMIT", 1000000))
+    EMBEDDING_RATE_HEADROOM: float = float(st.secrets.get("OPENAI_EMBEDDING_RATE_HEADROOM", 0.9))
+    
+    # Persistent embedding cache (shared by all worker processes on this host)
+    EMBEDDING_CACHE_ENABLED: bool = str(st.secrets.get("OPENAI_EMBEDDING_CACHE_ENABLED", True)).lower() == "true"
+    EMBEDDING_CACHE_PATH: str = st.secrets.get("OPENAI_EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+    EMBEDDING_CACHE_MAX_SIZE_MB: int = int(st.secrets.get("OPENAI_EMBEDDING_CACHE_MAX_SIZE_MB", 512))
 
 
 @dataclass
@@ -66,6 +153,10 @@ class PineconeConfig:
     INDEX_NAME: str = st.secrets.get("PINECONE_INDEX_NAME", "thpt-nhan-chinh-kb")
     DIMENSION: int = int(st.secrets.get("PINECONE_DIMENSION", 1536))
     TOP_K: int = int(st.secrets.get("PINECONE_TOP_K", 7))
+    
+    # Vector store backend: "pinecone" (managed index) or "local" (in-process NumPy store)
+    BACKEND: str = st.secrets.get("PINECONE_BACKEND", "pinecone")
+    LOCAL_STORE_PATH: str = st.secrets.get("PINECONE_LOCAL_STORE_PATH", ".cache/vector_store")
 
 
 @dataclass
@@ -77,6 +168,24 @@ class MongoDBConfig:
     CHAT_SESSION_COLLECTION: str = st.secrets.get("MONGODB_CHAT_SESSION_COLLECTION", "chat_sessions")
     DOCUMENTS_COLLECTION: str = st.secrets.get("MONGODB_DOCUMENTS_COLLECTION", "documents")
     ERROR_LOG_COLLECTION: str = st.secrets.get("MONGODB_ERROR_LOG_COLLECTION", "error_logs")
+    CHAT_MESSAGE_COLLECTION: str = st.secrets.get("MONGODB_CHAT_MESSAGE_COLLECTION", "chat_messages")
+    TRACE_COLLECTION: str = st.secrets.get("MONGODB_TRACE_COLLECTION", "traces")
+    CHUNKS_COLLECTION: str = st.secrets.get("MONGODB_CHUNKS_COLLECTION", "chunks")
+    ANSWER_CACHE_COLLECTION: str = st.secrets.get("MONGODB_ANSWER_CACHE_COLLECTION", "answer_cache")
+    CORPUS_VERSION_COLLECTION: str = st.secrets.get("MONGODB_CORPUS_VERSION_COLLECTION", "corpus_versions")
+    
+    # Fail fast instead of hanging a page load when the cluster is unreachable
+    SERVER_SELECTION_TIMEOUT_MS: int = int(st.secrets.get("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 5000))
+    CONNECT_TIMEOUT_MS: int = int(st.secrets.get("MONGODB_CONNECT_TIMEOUT_MS", 5000))
+    
+    # Chat history is stored in bucket documents of this many turns (user + assistant messages)
+    CHAT_MESSAGE_BUCKET_TURNS: int = int(st.secrets.get("MONGODB_CHAT_MESSAGE_BUCKET_TURNS", 50))
+    
+    # Index provisioning; sessions idle longer than SESSION_TTL_DAYS expire
+    ENSURE_INDEXES_ON_STARTUP: bool = str(st.secrets.get("MONGODB_ENSURE_INDEXES_ON_STARTUP", True)).lower() == "true"
+    SESSION_TTL_DAYS: int = int(st.secrets.get("MONGODB_SESSION_TTL_DAYS", 30))
+    TRACE_TTL_DAYS: int = int(st.secrets.get("MONGODB_TRACE_TTL_DAYS", 14))
+    ANSWER_CACHE_TTL_DAYS: int = int(st.secrets.get("MONGODB_ANSWER_CACHE_TTL_DAYS", 7))
 
 @dataclass 
 class RAGConfig:
@@ -85,6 +194,57 @@ class RAGConfig:
     CHUNK_SIZE: int = int(st.secrets.get("RAG_CHUNK_SIZE", 1024))
     CHUNK_OVERLAP: int = int(st.secrets.get("RAG_CHUNK_OVERLAP", 128))
     SIMILARITY_TOP_K: int = int(st.secrets.get("RAG_SIMILARITY_TOP_K", 7))
+    
+    # Context assembly: candidates below MIN_SIMILARITY are dropped, CANDIDATE_MULTIPLIER x TOP_K
+    # candidates are retrieved and passages are picked by MMR (relevance vs. diversity trade-off
+    # MMR_LAMBDA) until TOP_K passages or CONTEXT_TOKEN_BUDGET tokens
+    MIN_SIMILARITY: float = float(st.secrets.get("RAG_MIN_SIMILARITY", 0.2))
+    CANDIDATE_MULTIPLIER: int = int(st.secrets.get("RAG_CANDIDATE_MULTIPLIER", 2))
+    CONTEXT_TOKEN_BUDGET: int = int(st.secrets.get("RAG_CONTEXT_TOKEN_BUDGET", 3000))
+    MMR_LAMBDA: float = float(st.secrets.get("RAG_MMR_LAMBDA", 0.7))
+    
+    # Number of most recent chat messages loaded for a turn
+    HISTORY_MESSAGES: int = int(st.secrets.get("RAG_HISTORY_MESSAGES", 10))
+    
+    # Rolling summarization: the last HISTORY_RECENT_TURNS turns are sent verbatim, older turns are
+    # folded into a running summary in the background once SUMMARY_BATCH_TURNS of them accumulate
+    HISTORY_SUMMARIZATION: bool = str(st.secrets.get("RAG_HISTORY_SUMMARIZATION", True)).lower() == "true"
+    HISTORY_RECENT_TURNS: int = int(st.secrets.get("RAG_HISTORY_RECENT_TURNS", 3))
+    HISTORY_SUMMARY_BATCH_TURNS: int = int(st.secrets.get("RAG_HISTORY_SUMMARY_BATCH_TURNS", 2))
+    HISTORY_SUMMARY_MAX_TOKENS: int = int(st.secrets.get("RAG_HISTORY_SUMMARY_MAX_TOKENS", 400))
+    # Upper bound on the prompt sent to the LLM (system prompt + context + summary + history);
+    # the oldest verbatim history messages are dropped to stay under it
+    MAX_PROMPT_TOKENS: int = int(st.secrets.get("RAG_MAX_PROMPT_TOKENS", 6000))
+    
+    # Run session loading and retrieval concurrently on a shared thread pool
+    CONCURRENT_RETRIEVAL: bool = str(st.secrets.get("RAG_CONCURRENT_RETRIEVAL", True)).lower() == "true"
+    ORCHESTRATION_WORKERS: int = int(st.secrets.get("RAG_ORCHESTRATION_WORKERS", 8))
+    # Background work (history summaries, BM25 rebuilds) runs on its own smaller pool
+    BACKGROUND_WORKERS: int = int(st.secrets.get("RAG_BACKGROUND_WORKERS", 2))
+    
+    # Hybrid retrieval: BM25 over chunk text fused with vector results (reciprocal-rank fusion)
+    HYBRID_SEARCH: bool = str(st.secrets.get("RAG_HYBRID_SEARCH", True)).lower() == "true"
+    RRF_K: int = int(st.secrets.get("RAG_RRF_K", 60))
+    # The in-memory BM25 index is rebuilt from the chunk store when the corpus version shows
+    # that another process changed the namespace (checked this often, in the background),
+    # and at the latest after BM25_MAX_AGE_SECONDS
+    BM25_REFRESH_SECONDS: int = int(st.secrets.get("RAG_BM25_REFRESH_SECONDS", 30))
+    BM25_MAX_AGE_SECONDS: int = int(st.secrets.get("RAG_BM25_MAX_AGE_SECONDS", 600))
+    
+    # Topic routing: queries without a fixed namespace are searched in DEFAULT_NAMESPACE plus the
+    # namespaces their keywords point to (at most ROUTER_MAX_NAMESPACES), concurrently
+    TOPIC_ROUTING: bool = str(st.secrets.get("RAG_TOPIC_ROUTING", True)).lower() == "true"
+    DEFAULT_NAMESPACE: str = st.secrets.get("RAG_DEFAULT_NAMESPACE", PineconeConfig.NAME_SPACE.THONG_TIN_TRUONG.value)
+    ROUTER_MAX_NAMESPACES: int = int(st.secrets.get("RAG_ROUTER_MAX_NAMESPACES", 3))
+    
+    # Answer cache (src/rag/answer_cache.py): a first-turn question whose embedding is at least
+    # ANSWER_CACHE_SIMILARITY (cosine) close to a cached one over the same namespaces and corpus
+    # version gets the cached answer. Up to ANSWER_CACHE_MAX_ENTRIES per namespace set are held in
+    # memory, reloaded from MongoDB every ANSWER_CACHE_REFRESH_SECONDS (answers of other processes)
+    ANSWER_CACHE_ENABLED: bool = str(st.secrets.get("RAG_ANSWER_CACHE_ENABLED", True)).lower() == "true"
+    ANSWER_CACHE_SIMILARITY: float = float(st.secrets.get("RAG_ANSWER_CACHE_SIMILARITY", 0.95))
+    ANSWER_CACHE_MAX_ENTRIES: int = int(st.secrets.get("RAG_ANSWER_CACHE_MAX_ENTRIES", 1000))
+    ANSWER_CACHE_REFRESH_SECONDS: float = float(st.secrets.get("RAG_ANSWER_CACHE_REFRESH_SECONDS", 30))
 
 
 # Export configuration instances
@@ -1,2 +1,3 @@
 from .mongo_client import *
-from .pinecone_client import *
\ No newline at end of file
+from .pinecone_client import *
+from .embedding_cache import get_embedding_cache_stats
\ No newline at end of file
@@ -0,0 +1,251 @@
+# Standard library imports
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from array import array
+from typing import Dict, List, Optional, Any
+
+# Local imports
+from src.configs import openai_config, pinecone_config
+from src.utils import log
+from src.utils.concurrency import run_once
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text before hashing so trivially different inputs share a cache entry
+    (Unicode NFC form, collapsed whitespace)
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """
+    Content-addressed, disk-backed embedding cache.
+
+    Entries are keyed by (embedding model, dimension, normalized text hash), so changing
+    the embedding model or dimension can never serve stale vectors. The store is a SQLite
+    database in WAL mode, which makes it safe to share between several Streamlit worker
+    processes. Once the cache grows past its size budget, the least recently used entries
+    are evicted. Neither path takes the shared write lock needlessly: hits refresh their
+    access time at most once a minute, and the table is counted only periodically.
+    """
+
+    # Evict down to this fraction of the budget so eviction doesn't run on every write
+    EVICTION_TARGET = 0.9
+    # A hit refreshes last_access only when it is older than this (LRU order to the minute)
+    ACCESS_REFRESH_SECONDS = 60
+    # Between exact counts (a full scan), the entry count is estimated from this process's writes;
+    # writes of other processes are caught by a recount every this many writes
+    COUNT_INTERVAL = 100
+
+    def __init__(self, path: str, max_size_mb: int):
+        self.path = path
+        self.max_size_mb = max_size_mb
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._estimated_entries: Optional[int] = None
+        self._writes_since_count = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+
+    @property
+    def model(self) -> str:
+        # Read from config on every use so a model switch can't hit old entries
+        return openai_config.EMBEDDING_MODEL
+
+    @property
+    def dimension(self) -> int:
+        return pinecone_config.DIMENSION
+
+    @property
+    def max_entries(self) -> int:
+        return max(1, (self.max_size_mb * 1024 * 1024) // (self.dimension * 4))
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads, keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def make_key(self, text: str) -> str:
+        payload = f"{self.model}\x00{self.dimension}\x00{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up embeddings for texts, returning None for every miss
+        """
+        keys = [self.make_key(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        stale: List[str] = []
+        now = time.time()
+        try:
+            conn = self._connection()
+            unique_keys = list(dict.fromkeys(keys))
+            # Stay well below SQLite's bound parameter limit
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, vector, last_access FROM embeddings "
+                    f"WHERE key IN ({placeholders}) AND model = ? AND dimension = ?",
+                    (*batch, self.model, self.dimension),
+                ).fetchall()
+                for key, blob, last_access in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+                    if now - last_access > self.ACCESS_REFRESH_SECONDS:
+                        stale.append(key)
+            if stale:
+                conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in stale],
+                )
+        except sqlite3.Error as e:
+            log.warn(f"Embedding cache read failed: {str(e)}")
+
+        results = [found.get(key) for key in keys]
+        hits = sum(1 for result in results if result is not None)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def get(self, text: str) -> Optional[List[float]]:
+        return self.get_many([text])[0]
+
+    def put_many(self, texts: List[str], embeddings: List[List[float]]) -> None:
+        """
+        Store embeddings for texts, evicting least recently used entries when over budget
+        """
+        now = time.time()
+        rows = [
+            (self.make_key(text), self.model, self.dimension, array("f", embedding).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+            if embedding is not None and len(embedding) == self.dimension
+        ]
+        if not rows:
+            return
+        conn = self._connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dimension, vector, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            log.warn(f"Embedding cache write failed: {str(e)}")
+            return
+
+        with self._lock:
+            self._writes_since_count += 1
+            if self._estimated_entries is not None:
+                # Replaced entries are counted too, the estimate errs high
+                self._estimated_entries += len(rows)
+            recount = (
+                self._estimated_entries is None
+                or self._estimated_entries > self.max_entries
+                or self._writes_since_count >= self.COUNT_INTERVAL
+            )
+            if recount:
+                self._writes_since_count = 0
+        if recount:
+            self._evict(conn)
+
+    def put(self, text: str, embedding: List[float]) -> None:
+        self.put_many([text], [embedding])
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """
+        Count the entries exactly and evict the least recently used ones when over budget.
+        The count is a plain read (no write lock under WAL); only the delete takes the lock.
+        """
+        try:
+            count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - int(self.max_entries * self.EVICTION_TARGET)
+                conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                    (excess,),
+                )
+                count -= excess
+                log.info(f"Evicted {excess} least recently used embeddings from cache")
+        except sqlite3.Error as e:
+            log.warn(f"Embedding cache eviction failed: {str(e)}")
+            return
+        with self._lock:
+            self._estimated_entries = count
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters for this process plus the current number of stored entries
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        try:
+            entries = self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
+
+
+@run_once
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Process-wide embedding cache, opened on first use (None when disabled)
+    """
+    if not openai_config.EMBEDDING_CACHE_ENABLED:
+        return None
+    return EmbeddingCache(
+        path=openai_config.EMBEDDING_CACHE_PATH,
+        max_size_mb=openai_config.EMBEDDING_CACHE_MAX_SIZE_MB,
+    )
+
+
+def get_embedding_cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss counters of the embedding cache ({} when the cache is disabled)
+    """
+    embedding_cache = get_embedding_cache()
+    return embedding_cache.stats() if embedding_cache is not None else {}
+
+
+__all__ = ["get_embedding_cache", "get_embedding_cache_stats"]
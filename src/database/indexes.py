@@ -0,0 +1,158 @@
+# Standard library imports
+import json
+from typing import Dict, List, Any
+
+# Third-party imports
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.database import Database
+from pymongo.errors import PyMongoError
+
+# Local imports
+from src.configs import mongodb_config
+from src.utils import log
+
+
+def _index_specs() -> Dict[str, List[IndexModel]]:
+    session_ttl = mongodb_config.SESSION_TTL_DAYS * 24 * 60 * 60
+    return {
+        mongodb_config.CHAT_SESSION_COLLECTION: [
+            IndexModel([("session_id", ASCENDING)], unique=True, name="session_id_unique"),
+            # Sessions with no new turn for SESSION_TTL_DAYS are removed by Mongo's TTL monitor
+            IndexModel([("last_active", ASCENDING)], expireAfterSeconds=session_ttl, name="last_active_ttl"),
+        ],
+        mongodb_config.CHAT_MESSAGE_COLLECTION: [
+            IndexModel([("session_id", ASCENDING), ("bucket", DESCENDING)], unique=True, name="session_bucket_unique"),
+            # Buckets expire counting from their last write, so old buckets of a long-running session
+            # may go first; only the most recent messages are ever read back
+            IndexModel([("updated_at", ASCENDING)], expireAfterSeconds=session_ttl, name="updated_at_ttl"),
+        ],
+        mongodb_config.DOCUMENTS_COLLECTION: [
+            IndexModel([("document_id", ASCENDING)], unique=True, name="document_id_unique"),
+            IndexModel([("topic", ASCENDING), ("_id", DESCENDING)], name="topic_recent"),
+            IndexModel([("topic", ASCENDING), ("name", ASCENDING)], name="topic_name"),
+        ],
+        mongodb_config.ERROR_LOG_COLLECTION: [
+            IndexModel([("error_id", ASCENDING)], name="error_id"),
+            IndexModel([("timestamp", DESCENDING)], name="timestamp_recent"),
+            IndexModel([("level", ASCENDING), ("_id", DESCENDING)], name="level_recent"),
+        ],
+        mongodb_config.TRACE_COLLECTION: [
+            IndexModel([("kind", ASCENDING), ("timestamp", DESCENDING)], name="kind_recent"),
+            IndexModel([("timestamp", ASCENDING)], expireAfterSeconds=mongodb_config.TRACE_TTL_DAYS * 24 * 60 * 60, name="timestamp_ttl"),
+        ],
+        mongodb_config.CHUNKS_COLLECTION: [
+            IndexModel([("namespace", ASCENDING)], name="namespace"),
+            IndexModel([("document_id", ASCENDING), ("chunk_index", ASCENDING)], name="document_chunk_index"),
+        ],
+        mongodb_config.ANSWER_CACHE_COLLECTION: [
+            IndexModel([("scope", ASCENDING), ("corpus_version", ASCENDING), ("hits", DESCENDING)], name="scope_version_hits"),
+            IndexModel([("entry_id", ASCENDING)], unique=True, name="entry_id_unique"),
+            IndexModel([("namespaces", ASCENDING)], name="namespaces"),
+            IndexModel([("created_at", ASCENDING)], expireAfterSeconds=mongodb_config.ANSWER_CACHE_TTL_DAYS * 24 * 60 * 60, name="created_at_ttl"),
+        ],
+    }
+
+
+def ensure_indexes(db: Database) -> None:
+    """
+    Create the indexes backing the hot queries in mongo_client.py.
+    Idempotent: existing indexes with the same definition are left untouched.
+    """
+    for collection_name, indexes in _index_specs().items():
+        try:
+            db[collection_name].create_indexes(indexes)
+        except PyMongoError as e:
+            # e.g. duplicate session_id values left over from before the unique index
+            log.warn(f"Could not create indexes on {collection_name}: {str(e)}")
+    _backfill_last_active(db)
+
+
+def _backfill_last_active(db: Database) -> None:
+    """
+    Sessions written before last_active existed are skipped by the TTL monitor and would never
+    expire: date them from their start (now if unknown). Idempotent, later runs match nothing.
+    """
+    try:
+        result = db[mongodb_config.CHAT_SESSION_COLLECTION].update_many(
+            {"last_active": {"$exists": False}},
+            [{"$set": {"last_active": {"$ifNull": ["$start_time", "$$NOW"]}}}],
+        )
+        if result.modified_count:
+            log.info(f"Set last_active on {result.modified_count} older chat sessions")
+    except PyMongoError as e:
+        log.warn(f"Could not backfill last_active on chat sessions: {str(e)}")
+
+
+def _hot_queries() -> List[Dict[str, Any]]:
+    """
+    The lookups issued by mongo_client.py, as (collection, filter, sort)
+    """
+    return [
+        {"collection": mongodb_config.CHAT_SESSION_COLLECTION, "filter": {"session_id": ""}, "sort": None},
+        {"collection": mongodb_config.CHAT_MESSAGE_COLLECTION, "filter": {"session_id": ""}, "sort": [("bucket", DESCENDING)]},
+        {"collection": mongodb_config.CHAT_MESSAGE_COLLECTION, "filter": {"session_id": "", "bucket": 0}, "sort": None},
+        {"collection": mongodb_config.DOCUMENTS_COLLECTION, "filter": {"document_id": ""}, "sort": None},
+        {"collection": mongodb_config.DOCUMENTS_COLLECTION, "filter": {"topic": ""}, "sort": [("_id", DESCENDING)]},
+        {"collection": mongodb_config.DOCUMENTS_COLLECTION, "filter": {"topic": "", "name": ""}, "sort": [("_id", DESCENDING)]},
+        {"collection": mongodb_config.DOCUMENTS_COLLECTION, "filter": {}, "sort": [("_id", DESCENDING)]},
+        {"collection": mongodb_config.ERROR_LOG_COLLECTION, "filter": {"error_id": ""}, "sort": None},
+        {"collection": mongodb_config.ERROR_LOG_COLLECTION, "filter": {}, "sort": [("_id", DESCENDING)]},
+        {"collection": mongodb_config.ERROR_LOG_COLLECTION, "filter": {"level": ""}, "sort": [("_id", DESCENDING)]},
+        {"collection": mongodb_config.TRACE_COLLECTION, "filter": {"kind": ""}, "sort": [("timestamp", DESCENDING)]},
+        {"collection": mongodb_config.CHUNKS_COLLECTION, "filter": {"_id": {"$in": [""]}}, "sort": None},
+        {"collection": mongodb_config.CHUNKS_COLLECTION, "filter": {"document_id": ""}, "sort": [("chunk_index", ASCENDING)]},
+        {"collection": mongodb_config.CHUNKS_COLLECTION, "filter": {"namespace": ""}, "sort": None},
+        {"collection": mongodb_config.ANSWER_CACHE_COLLECTION, "filter": {"scope": "", "corpus_version": 0}, "sort": [("hits", DESCENDING)]},
+        {"collection": mongodb_config.ANSWER_CACHE_COLLECTION, "filter": {"entry_id": ""}, "sort": None},
+        {"collection": mongodb_config.ANSWER_CACHE_COLLECTION, "filter": {"namespaces": ""}, "sort": None},
+        {"collection": mongodb_config.CORPUS_VERSION_COLLECTION, "filter": {"_id": {"$in": [""]}}, "sort": None},
+    ]
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    """
+    Collect every stage name in an explain plan tree (classic and slot-based engine formats)
+    """
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+def explain_hot_queries(db: Database) -> List[Dict[str, Any]]:
+    """
+    Run explain on each hot query and report whether its winning plan uses an index
+    """
+    report = []
+    for query in _hot_queries():
+        cursor = db[query["collection"]].find(query["filter"])
+        if query["sort"]:
+            cursor = cursor.sort(query["sort"])
+        try:
+            winning_plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+            stages = _plan_stages(winning_plan)
+            uses_index = any(stage in ("IXSCAN", "IDHACK", "EXPRESS_IXSCAN", "COUNT_SCAN") for stage in stages)
+            report.append({**query, "stages": stages, "uses_index": uses_index and "COLLSCAN" not in stages})
+        except PyMongoError as e:
+            report.append({**query, "stages": [], "uses_index": False, "error": str(e)})
+    return report
+
+
+__all__ = ["ensure_indexes", "explain_hot_queries"]
+
+
+if __name__ == "__main__":
+    # python -m src.database.indexes : provision indexes and print the explain report
+    from src.database.mongo_client import get_db
+
+    db = get_db()
+    ensure_indexes(db)
+    for entry in explain_hot_queries(db):
+        status = "index" if entry["uses_index"] else "COLLECTION SCAN"
+        print(f"{entry['collection']:<20} {json.dumps(entry['filter'], default=str):<40} -> {status} {entry['stages']}")
@@ -1,36 +1,187 @@
+# Standard library imports
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
 # Third-party imports
-from pymongo import MongoClient
-from typing import Optional
+from bson import ObjectId
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.database import Database
 
 # Local imports
-from src.configs import mongodb_config
-from src.models import ChatSession, Document, ErrorLog
+from src.configs import mongodb_config, rag_config
+from src.models import CachedAnswer, ChatSession, Document, ErrorLog, ErrorType, Message
+from src.database.indexes import ensure_indexes
+from src.utils.concurrency import run_once
+
 
-client = MongoClient(mongodb_config.CONNECTION_STRING)
-db = client[mongodb_config.DATABASE_NAME]
+@run_once
+def get_db() -> Database:
+    """
+    Connect on first use and reuse the client for the rest of the process.
+    Index provisioning runs once, on that first connection.
+    """
+    client = MongoClient(
+        mongodb_config.CONNECTION_STRING,
+        serverSelectionTimeoutMS=mongodb_config.SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=mongodb_config.CONNECT_TIMEOUT_MS,
+    )
+    db = client[mongodb_config.DATABASE_NAME]
+    if mongodb_config.ENSURE_INDEXES_ON_STARTUP:
+        ensure_indexes(db)
+    return db
 
 def get_collection(collection_name: str):
-    return db[collection_name]
+    return get_db()[collection_name]
+
+
+def _page(collection, query: dict, projection: dict, limit: int, after: Optional[str]) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of a keyset-paginated query, newest first: sorted on _id (ObjectIds grow with
+    insertion time), resuming below `after`, the cursor returned with the previous page.
+    Returns the page and the cursor of the next one (None on the last page).
+    """
+    if after:
+        query = {**query, "_id": {"$lt": ObjectId(after)}}
+    documents = list(collection.find(query, projection).sort("_id", DESCENDING).limit(limit + 1))
+    next_cursor = str(documents[limit - 1]["_id"]) if len(documents) > limit else None
+    return documents[:limit], next_cursor
 
 
 class ChatSessionCollection:
-    def __init__(self):
-        self.collection = get_collection(mongodb_config.CHAT_SESSION_COLLECTION)
+    """
+    Chat sessions are stored as a small session document (topic, timestamps, turn counter)
+    plus bucket documents in the chat messages collection, each holding the messages of
+    CHAT_MESSAGE_BUCKET_TURNS consecutive turns. New messages are appended with $push, so
+    writes don't grow with the conversation and no document approaches Mongo's size limit.
+    """
+    @property
+    def collection(self):
+        return get_collection(mongodb_config.CHAT_SESSION_COLLECTION)
+    
+    @property
+    def message_collection(self):
+        return get_collection(mongodb_config.CHAT_MESSAGE_COLLECTION)
         
     def create_session(self, session_id: str, topic: str) -> ChatSession:
         session = ChatSession(session_id=session_id, topic=topic)
-        result = self.collection.insert_one(session.model_dump())
-        session.id = str(result.inserted_id)
-        return session
+        session_data = self.collection.find_one_and_update(
+            {"session_id": session_id},
+            {"$setOnInsert": session.model_dump(exclude={"id", "messages"})},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return ChatSession.from_dict(session_data)
     
-    def get_session(self, session_id: str) -> Optional[ChatSession]:
-        session_data = self.collection.find_one({"session_id": session_id})
+    def get_session(self, session_id: str, message_limit: Optional[int] = None) -> Optional[ChatSession]:
+        """Get session with only its last `message_limit` messages (defaults to RAG_HISTORY_MESSAGES)"""
+        message_limit = message_limit or rag_config.HISTORY_MESSAGES
+        # Sessions written before bucketing keep their messages embedded, fetch only the tail
+        session_data = self.collection.find_one(
+            {"session_id": session_id},
+            {"messages": {"$slice": -message_limit}}
+        )
         if session_data:
+            messages = session_data.get("messages", []) + self.get_recent_messages(session_id, message_limit)
+            session_data["messages"] = messages[-message_limit:]
             return ChatSession.from_dict(session_data)
         return None
     
+    def get_recent_messages(self, session_id: str, limit: int) -> List[dict]:
+        """Get the last `limit` bucketed messages of a session, oldest first"""
+        messages = []
+        # Only the tail of each bucket is read, so the payload is bounded by `limit`, not the bucket size
+        buckets = self.message_collection.find(
+            {"session_id": session_id},
+            {"messages": {"$slice": -limit}}
+        ).sort("bucket", DESCENDING)
+        for bucket in buckets:
+            messages = bucket.get("messages", []) + messages
+            if len(messages) >= limit:
+                break
+        # Concurrent turns may land in a bucket out of order, the turn number is authoritative
+        messages.sort(key=lambda message: message.get("turn") or 0)
+        return messages[-limit:]
+    
+    def get_messages_by_turns(self, session_id: str, start_turn: int, end_turn: int) -> List[dict]:
+        """Get the bucketed messages of turns [start_turn, end_turn), oldest first"""
+        bucket_turns = mongodb_config.CHAT_MESSAGE_BUCKET_TURNS
+        buckets = self.message_collection.find(
+            {
+                "session_id": session_id,
+                "bucket": {"$gte": start_turn // bucket_turns, "$lte": (end_turn - 1) // bucket_turns},
+            },
+            {"messages": 1}
+        )
+        messages = [
+            message
+            for bucket in buckets
+            for message in bucket.get("messages", [])
+            if start_turn <= (message.get("turn") or 0) < end_turn
+        ]
+        messages.sort(key=lambda message: message.get("turn") or 0)
+        return messages
+    
+    def get_summary_state(self, session_id: str) -> Optional[dict]:
+        """Get the running summary fields (summary, summarized_turns, turn_count) of a session"""
+        return self.collection.find_one(
+            {"session_id": session_id},
+            {"summary": 1, "summarized_turns": 1, "turn_count": 1}
+        )
+    
+    def update_summary(self, session_id: str, summary: str, summarized_turns: int, expected_summarized_turns: int) -> bool:
+        """
+        Store a new running summary, unless another writer already advanced it
+        (compare-and-set on summarized_turns)
+        """
+        # Sessions created before summaries existed have no summarized_turns field yet
+        expected = {"$in": [0, None]} if expected_summarized_turns == 0 else expected_summarized_turns
+        try:
+            result = self.collection.update_one(
+                {"session_id": session_id, "summarized_turns": expected},
+                {"$set": {"summary": summary, "summarized_turns": summarized_turns}}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            print(f"Error updating session summary: {e}")
+            return False
+    
+    def append_messages(self, session_id: str, messages: List[Message], topic: str = "") -> bool:
+        """
+        Append the messages of one turn to a session, creating the session if needed.
+        The turn number is reserved with an atomic $inc, then all messages of the turn are
+        pushed to their bucket in a single update, so concurrent turns never overwrite each other.
+        """
+        try:
+            now = datetime.utcnow()
+            session_data = self.collection.find_one_and_update(
+                {"session_id": session_id},
+                {
+                    "$inc": {"turn_count": 1},
+                    "$set": {"last_active": now},
+                    "$setOnInsert": {"topic": topic, "start_time": now},
+                },
+                projection={"turn_count": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            turn = session_data["turn_count"] - 1
+            documents = [message.model_dump(exclude={"turn"}) | {"turn": turn, "created_at": now} for message in messages]
+            self.message_collection.update_one(
+                {"session_id": session_id, "bucket": turn // mongodb_config.CHAT_MESSAGE_BUCKET_TURNS},
+                {
+                    "$push": {"messages": {"$each": documents}},
+                    "$inc": {"count": len(documents)},
+                    "$set": {"updated_at": now},
+                },
+                upsert=True,
+            )
+            return True
+        except Exception as e:
+            print(f"Error appending messages: {e}")
+            return False
+    
     def update_session(self, chat_session: ChatSession) -> bool:
-        """Update session with ChatSession object"""
+        """Update session with ChatSession object (rewrites the whole document, prefer append_messages)"""
         try:
             session_dict = chat_session.model_dump(exclude={"id"})
             result = self.collection.update_one(
@@ -53,41 +204,243 @@ class ChatSessionCollection:
     
     
 class DocumentCollection:
-    def __init__(self):
-        self.collection = get_collection(mongodb_config.DOCUMENTS_COLLECTION)
+    @property
+    def collection(self):
+        return get_collection(mongodb_config.DOCUMENTS_COLLECTION)
     
-    def create_document(self, document_id: str, name: str, topic: str, file_type: str, file_size: int, chunk_count: int):
-        document = Document(document_id=document_id, name=name, topic=topic, file_type=file_type, file_size=file_size, chunk_count=chunk_count)
+    def create_document(self, document_id: str, name: str, topic: str, file_type: str, file_size: int, chunk_count: int, status: str = "uploaded"):
+        document = Document(document_id=document_id, name=name, topic=topic, file_type=file_type, file_size=file_size, chunk_count=chunk_count, status=status)
         self.collection.insert_one(document.model_dump())
         return document
     
     def get_document(self, document_id: str):
         return self.collection.find_one({"document_id": document_id})
     
+    def find_document(self, name: str, topic: str):
+        """Find a previously uploaded document by file name within a topic"""
+        return self.collection.find_one({"topic": topic, "name": name}, sort=[("_id", -1)])
+    
     def update_document(self, document_id: str, **kwargs):
         self.collection.update_one({"document_id": document_id}, {"$set": kwargs})
     
     def get_all_documents(self):
+        """Every document, unpaginated (the document page uses list_documents)"""
         return list(self.collection.find())
     
+    def list_documents(self, topic: Optional[str] = None, limit: int = 10, after: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Newest documents first, optionally of one topic, `limit` per page (see _page).
+        Only the fields the document list shows are read.
+        """
+        query = {"topic": topic} if topic else {}
+        projection = {"document_id": 1, "name": 1, "topic": 1, "file_size": 1, "chunk_count": 1, "status": 1}
+        return _page(self.collection, query, projection, limit, after)
+    
+    def get_document_stats(self) -> Dict[str, Any]:
+        """
+        Document, chunk and byte counts per topic and in total, aggregated by Mongo
+        """
+        rows = self.collection.aggregate([
+            {"$group": {
+                "_id": "$topic",
+                "documents": {"$sum": 1},
+                "chunks": {"$sum": "$chunk_count"},
+                "bytes": {"$sum": "$file_size"},
+            }},
+            {"$sort": {"_id": ASCENDING}},
+        ])
+        topics = {row["_id"]: {key: row[key] for key in ("documents", "chunks", "bytes")} for row in rows}
+        total = {key: sum(counts[key] for counts in topics.values()) for key in ("documents", "chunks", "bytes")}
+        return {"topics": topics, "total": total}
+    
 class ErrorLogCollection:
-    def __init__(self):
-        self.collection = get_collection(mongodb_config.ERROR_LOG_COLLECTION)
+    @property
+    def collection(self):
+        return get_collection(mongodb_config.ERROR_LOG_COLLECTION)
         
-    def create_error_log(self, error_id: str, message: str, level: str, component: str, topic: str):
-        error_log = ErrorLog(error_id=error_id, message=message, level=level, component=component, topic=topic)
-        self.collection.insert_one(error_log.model_dump())
+    def create_error_log(
+        self,
+        message: str,
+        level: str,
+        component: str,
+        error_type: str = ErrorType.UNKNOWN_ERROR,
+        topic: Optional[str] = None,
+        details: Optional[dict] = None,
+    ) -> ErrorLog:
+        error_log = ErrorLog(message=message, level=level, component=component, error_type=error_type, topic=topic, details=details or {})
+        self.collection.insert_one(error_log.model_dump(exclude={"id"}))
         return error_log
     
     def get_all_error_logs(self):
+        """Every error log, unpaginated (prefer list_error_logs)"""
         return list(self.collection.find())
     
+    def list_error_logs(self, level: Optional[str] = None, limit: int = 50, after: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Newest error logs first, optionally of one level, `limit` per page (see _page).
+        The details field, the bulky one, is left out.
+        """
+        query = {"level": level} if level else {}
+        projection = {"details": 0}
+        return _page(self.collection, query, projection, limit, after)
+    
+    def get_error_stats(self) -> List[dict]:
+        """
+        Error count and latest occurrence per level and component, most frequent first
+        """
+        return list(self.collection.aggregate([
+            {"$group": {
+                "_id": {"level": "$level", "component": "$component"},
+                "count": {"$sum": 1},
+                "last_seen": {"$max": "$timestamp"},
+            }},
+            {"$sort": {"count": DESCENDING}},
+            {"$project": {"_id": 0, "level": "$_id.level", "component": "$_id.component", "count": 1, "last_seen": 1}},
+        ]))
+    
     def get_error_log(self, error_id: str):
         return self.collection.find_one({"error_id": error_id})
     
 
+class TraceCollection:
+    @property
+    def collection(self):
+        return get_collection(mongodb_config.TRACE_COLLECTION)
+    
+    def get_recent_traces(self, kind: str, limit: int = 1000) -> List[dict]:
+        """Get the stage durations and metrics of the last `limit` traces of a kind, newest first"""
+        return list(
+            self.collection.find(
+                {"kind": kind},
+                {"_id": 0, "timestamp": 1, "duration_ms": 1, "stages": 1, "metrics": 1, "error": 1}
+            ).sort("timestamp", DESCENDING).limit(limit)
+        )
+    
+
+class ChunkCollection:
+    """
+    Chunk texts keyed by vector ID (`_id`): the vector index only holds the embeddings, so
+    query responses stay small and chunk size isn't bound by the metadata size limit
+    """
+    @property
+    def collection(self):
+        return get_collection(mongodb_config.CHUNKS_COLLECTION)
+    
+    def upsert_chunks(self, namespace: str, chunks: List[Dict[str, Any]]) -> None:
+        """Write chunks given as {"chunk_id", "text", "document_id", "chunk_index"} in one bulk request"""
+        if not chunks:
+            return
+        now = datetime.utcnow()
+        self.collection.bulk_write(
+            [
+                ReplaceOne(
+                    {"_id": chunk["chunk_id"]},
+                    {
+                        "namespace": namespace,
+                        "document_id": chunk["document_id"],
+                        "chunk_index": chunk["chunk_index"],
+                        "text": chunk["text"],
+                        "updated_at": now,
+                    },
+                    upsert=True,
+                )
+                for chunk in chunks
+            ],
+            ordered=False,
+        )
+    
+    def get_chunks(self, chunk_ids: List[str]) -> Dict[str, dict]:
+        """Multi-get by vector ID in one round trip; IDs not stored are left out"""
+        if not chunk_ids:
+            return {}
+        return {
+            chunk["_id"]: chunk
+            for chunk in self.collection.find(
+                {"_id": {"$in": list(chunk_ids)}}, {"text": 1, "document_id": 1, "chunk_index": 1}
+            )
+        }
+    
+    def get_document_chunks(self, document_id: str) -> List[dict]:
+        return list(self.collection.find({"document_id": document_id}).sort("chunk_index", ASCENDING))
+    
+    def iter_namespace(self, namespace: str) -> Iterator[dict]:
+        return iter(self.collection.find({"namespace": namespace}, {"text": 1, "document_id": 1, "chunk_index": 1}))
+    
+    def set_chunk_indexes(self, chunk_indexes: Dict[str, int]) -> None:
+        if chunk_indexes:
+            self.collection.bulk_write(
+                [UpdateOne({"_id": chunk_id}, {"$set": {"chunk_index": idx}}) for chunk_id, idx in chunk_indexes.items()],
+                ordered=False,
+            )
+    
+    def delete_chunks(self, chunk_ids: List[str]) -> int:
+        if not chunk_ids:
+            return 0
+        return self.collection.delete_many({"_id": {"$in": list(chunk_ids)}}).deleted_count
+    
+
+class CorpusVersionCollection:
+    """One counter per namespace, bumped whenever the namespace's indexed chunks change"""
+    @property
+    def collection(self):
+        return get_collection(mongodb_config.CORPUS_VERSION_COLLECTION)
+    
+    def get_versions(self, namespaces: List[str]) -> Dict[str, int]:
+        """Current version of each namespace (0 for a namespace never changed)"""
+        versions = {namespace: 0 for namespace in namespaces}
+        for entry in self.collection.find({"_id": {"$in": list(namespaces)}}):
+            versions[entry["_id"]] = entry.get("version", 0)
+        return versions
+    
+    def bump(self, namespace: str) -> int:
+        entry = self.collection.find_one_and_update(
+            {"_id": namespace},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return entry["version"]
+    
+
+class AnswerCacheCollection:
+    @property
+    def collection(self):
+        return get_collection(mongodb_config.ANSWER_CACHE_COLLECTION)
+    
+    def get_entries(self, scope: str, corpus_version: int, limit: int) -> List[dict]:
+        """Cached answers of a namespace set at a corpus version, most served first"""
+        return list(
+            self.collection.find(
+                {"scope": scope, "corpus_version": corpus_version},
+                {"_id": 0, "entry_id": 1, "answer": 1, "embedding": 1}
+            ).sort("hits", DESCENDING).limit(limit)
+        )
+    
+    def insert_entry(self, entry: CachedAnswer) -> None:
+        self.collection.insert_one(entry.model_dump())
+    
+    def record_hit(self, entry_id: str) -> None:
+        self.collection.update_one({"entry_id": entry_id}, {"$inc": {"hits": 1}, "$set": {"last_hit_at": datetime.utcnow()}})
+    
+    def delete_namespace(self, namespace: str) -> int:
+        """Drop every cached answer built on a namespace (their corpus version is stale)"""
+        return self.collection.delete_many({"namespaces": namespace}).deleted_count
+    
+
 chat_session_collection = ChatSessionCollection()
 document_collection = DocumentCollection()
 error_log_collection = ErrorLogCollection()
+trace_collection = TraceCollection()
+chunk_collection = ChunkCollection()
+corpus_version_collection = CorpusVersionCollection()
+answer_cache_collection = AnswerCacheCollection()
 
-__all__ = ["chat_session_collection", "document_collection", "error_log_collection"]
\ No newline at end of file
+__all__ = [
+    "chat_session_collection",
+    "document_collection",
+    "error_log_collection",
+    "trace_collection",
+    "chunk_collection",
+    "corpus_version_collection",
+    "answer_cache_collection",
+]
\ No newline at end of file
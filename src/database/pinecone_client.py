@@ -1,26 +1,51 @@
 # Standard library imports
-import uuid
-from typing import List, Dict, Any
-import json
+import time
+import hashlib
+import random
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Dict, Any, Optional, Tuple, Union
 
 # Third-party imports
+from openai import APIConnectionError, BadRequestError, InternalServerError, RateLimitError
 from pinecone import Pinecone, ServerlessSpec
-from openai import OpenAI
 
 # Local imports
-from src.configs import pinecone_config, openai_config
+from src.configs import pinecone_config, openai_config, rag_config
 from src.utils import log
-from src.models import Document
+from src.utils.clients import embedding_timeout, get_openai_client
+from src.utils.concurrency import get_executor, run_once
+from src.utils.rate_limit import DEFAULT_RETRY_AFTER, get_embedding_scheduler, retry_after_seconds
+from src.utils.timing import StageTimer
+from src.utils.tracing import add_metric, log_error, set_metric
+from src.models import ComponentType, Document, ErrorType
+from src.database.embedding_cache import get_embedding_cache, normalize_text
+from src.database.mongo_client import answer_cache_collection, chunk_collection, corpus_version_collection
+from src.database.vector_store import LocalVectorStore
+from src.ingestion.chunking import count_tokens
+from src.rag.bm25 import get_lexical_index, index_chunks, unindex_chunks, note_corpus_version, reciprocal_rank_fusion
+from src.rag.context import Passage, assemble_context
+from src.rag.router import resolve_namespaces
 
-# Initialize clients
-pc = Pinecone(api_key=pinecone_config.API_KEY)
-openai_client = OpenAI(
-    api_key=openai_config.API_KEY,
-    base_url=openai_config.BASE_URL
-)
+# Pinecone limits: fetch URLs stay short with 100 IDs, delete accepts up to 1000 IDs per call
+FETCH_BATCH_SIZE = 100
+DELETE_BATCH_SIZE = 1000
+
+
+def provision_index() -> None:
+    """
+    Create the Pinecone index if it does not exist yet (without auto-embedding).
+    Run explicitly via `python setup_pinecone_index.py`, never at import time.
+    """
+    if pinecone_config.BACKEND == "local":
+        log.info("Local vector store backend selected, nothing to provision")
+        return
+
+    pc = Pinecone(api_key=pinecone_config.API_KEY)
+    if pc.has_index(pinecone_config.INDEX_NAME):
+        log.info(f"Pinecone index {pinecone_config.INDEX_NAME} already exists")
+        return
 
-# Create index if not exists (without auto-embedding)
-if not pc.has_index(pinecone_config.INDEX_NAME):
     pc.create_index(
         name=pinecone_config.INDEX_NAME,
         dimension=pinecone_config.DIMENSION,  # 1536 for text-embedding-3-small, 3072 for text-embedding-3-large
@@ -30,11 +55,64 @@ if not pc.has_index(pinecone_config.INDEX_NAME):
             region="us-east-1",
         )
     )
-
     log.success(f"Pinecone index {pinecone_config.INDEX_NAME} created successfully")
 
-index = pc.Index(pinecone_config.INDEX_NAME)
-log.success(f"Pinecone index {pinecone_config.INDEX_NAME} loaded successfully")
+
+@run_once
+def get_index():
+    """
+    Vector index selected by PINECONE_BACKEND, connected on first use and reused process-wide
+    """
+    if pinecone_config.BACKEND == "local":
+        index = LocalVectorStore(pinecone_config.LOCAL_STORE_PATH, pinecone_config.DIMENSION)
+        log.success(f"Local vector store {pinecone_config.LOCAL_STORE_PATH} loaded successfully")
+    else:
+        index = Pinecone(api_key=pinecone_config.API_KEY).Index(pinecone_config.INDEX_NAME)
+        log.success(f"Pinecone index {pinecone_config.INDEX_NAME} loaded successfully")
+    return index
+
+
+def _create_embeddings(inputs: Union[str, List[str]]):
+    """
+    One embeddings request, scheduled within the account's quota (src/utils/rate_limit.py) under
+    the caller's flow. A 429 pauses the scheduler for the server's retry-after hint and the request
+    queues again, so rate limiting delays texts but never fails them.
+    """
+    scheduler = get_embedding_scheduler()
+    if scheduler is None:
+        return get_openai_client().embeddings.create(
+            input=inputs,
+            model=openai_config.EMBEDDING_MODEL,  # Consider changing to 'text-embedding-3-small'
+            timeout=embedding_timeout(),
+        )
+    
+    estimated = sum(count_tokens(text) for text in (inputs if isinstance(inputs, list) else [inputs]))
+    # Retries are made here: the SDK's would ignore the scheduler and resend into the 429s
+    client = get_openai_client().with_options(max_retries=0)
+    failures = 0
+    while True:
+        scheduler.acquire(estimated)
+        try:
+            response = client.embeddings.create(input=inputs, model=openai_config.EMBEDDING_MODEL, timeout=embedding_timeout())
+        except RateLimitError as e:
+            scheduler.settle(estimated, 0)
+            if getattr(e, "code", None) == "insufficient_quota":
+                raise e
+            delay = retry_after_seconds(e) or DEFAULT_RETRY_AFTER
+            log.warn(f"Embedding rate limit hit, pausing embedding requests for {delay:.1f}s")
+            scheduler.pause(delay)
+            continue
+        except (APIConnectionError, InternalServerError) as e:
+            scheduler.settle(estimated, 0)
+            failures += 1
+            if failures > openai_config.MAX_RETRIES:
+                raise e
+            time.sleep(0.5 * (2 ** failures) * (1 + random.random()))
+            continue
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            scheduler.settle(estimated, usage.prompt_tokens)
+        return response
 
 
 def embed_text(text: str) -> List[float]:
@@ -44,121 +122,645 @@ def embed_text(text: str) -> List[float]:
     - 'text-embedding-3-small' (dimension 1536) - Default
     - 'text-embedding-ada-002' (dimension 1536) - Alternative
     - 'text-embedding-3-large' (dimension 3072) - High quality
+    Results are served from the persistent embedding cache when available.
     """
     try:
-        response = openai_client.embeddings.create(
-            input=text,
-            model=openai_config.EMBEDDING_MODEL  # Consider changing to 'text-embedding-3-small'
-        )
+        embedding_cache = get_embedding_cache()
+        if embedding_cache is not None:
+            cached = embedding_cache.get(text)
+            if cached is not None:
+                add_metric("embedding_cache_hits")
+                return cached
+            add_metric("embedding_cache_misses")
+
+        response = _create_embeddings(text)
         embedding = response.data[0].embedding
+        if embedding_cache is not None:
+            embedding_cache.put(text, embedding)
         return embedding
     except Exception as e:
         log.error(f"Error creating embedding: {str(e)}")
         raise e
 
 
-def upsert_chunk_texts(chunk_texts: List[str], namespace: str, metadata: Document):
+def _embed_batch(batch: List[str]) -> List[List[float]]:
     """
-    Embed chunk texts and upsert to Pinecone index
+    Embed a batch of texts in a single request, retrying with exponential backoff
+    (a rejected input is not retried, resending it won't help)
     """
-    def _get_id(index: int):
-        return f'{metadata.document_id}-{index}-{uuid.uuid4()}'
-    
-    vectors = []
-    for idx, chunk_text in enumerate(chunk_texts):
+    max_retries = openai_config.EMBEDDING_MAX_RETRIES
+    for attempt in range(max_retries + 1):
+        try:
+            response = _create_embeddings(batch)
+            # The API returns one item per input, tagged with its position
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        except Exception as e:
+            if attempt == max_retries or isinstance(e, BadRequestError):
+                raise e
+            delay = openai_config.EMBEDDING_RETRY_BACKOFF * (2 ** attempt) * (1 + random.random())
+            log.warn(f"Embedding batch of {len(batch)} failed ({str(e)}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _embed_in_batches(texts: List[str]) -> Tuple[List[Optional[List[float]]], Dict[int, Exception]]:
+    """
+    Embed texts in batches with bounded concurrency.
+    Cached texts are served from the embedding cache and only misses are sent to the API.
+    Returns the embeddings in input order (None where embedding failed) and
+    a mapping of input position -> error for every text that could not be embedded.
+    """
+    embeddings: List[Optional[List[float]]] = [None] * len(texts)
+    errors: Dict[int, Exception] = {}
+
+    embedding_cache = get_embedding_cache()
+    if embedding_cache is not None:
+        embeddings = embedding_cache.get_many(texts)
+        hits = sum(1 for embedding in embeddings if embedding is not None)
+        add_metric("embedding_cache_hits", hits)
+        add_metric("embedding_cache_misses", len(texts) - hits)
+
+    # Group the remaining positions by text so duplicates are embedded once
+    pending: Dict[str, List[int]] = {}
+    for position, (text, embedding) in enumerate(zip(texts, embeddings)):
+        if embedding is None:
+            pending.setdefault(text, []).append(position)
+    missing = list(pending)
+
+    batch_size = max(1, openai_config.EMBEDDING_BATCH_SIZE)
+    starts = list(range(0, len(missing), batch_size))
+
+    def _store(text: str, embedding: List[float]) -> None:
+        for position in pending[text]:
+            embeddings[position] = embedding
+
+    def _run(start: int) -> None:
+        batch = missing[start:start + batch_size]
         try:
-            # Embed the chunk text
-            embedding = embed_text(chunk_text)
+            batch_embeddings = _embed_batch(batch)
+            for text, embedding in zip(batch, batch_embeddings):
+                _store(text, embedding)
+            if embedding_cache is not None:
+                embedding_cache.put_many(batch, batch_embeddings)
+        except BadRequestError as e:
+            # An input was rejected: isolate it so a single bad chunk doesn't cost the whole batch
+            log.warn(f"Embedding batch of {len(batch)} texts rejected: {str(e)}, falling back to single requests")
+            for text in batch:
+                try:
+                    _store(text, embed_text(text))
+                except Exception as item_error:
+                    for position in pending[text]:
+                        errors[position] = item_error
+        except Exception as e:
+            # Connection errors and 5xx outlived the retries: single requests would only
+            # multiply the load on a failing API, the whole batch fails
+            log.warn(f"Embedding batch of {len(batch)} texts failed: {str(e)}")
+            for text in batch:
+                for position in pending[text]:
+                    errors[position] = e
+
+    if starts:
+        max_workers = max(1, min(openai_config.EMBEDDING_MAX_CONCURRENCY, len(starts)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Each batch runs in a copy of the caller's context: its rate limit flow and trace
+            futures = [executor.submit(contextvars.copy_context().run, _run, start) for start in starts]
+            for future in futures:
+                future.result()
+
+    return embeddings, errors
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """
+    Embed many texts using batched, concurrent requests to the OpenAI embedding model.
+    Raises the first error if any text could not be embedded.
+    """
+    embeddings, errors = _embed_in_batches(texts)
+    if errors:
+        position = min(errors)
+        log.error(f"Error creating embeddings for {len(errors)}/{len(texts)} texts")
+        raise errors[position]
+    return embeddings
+
+
+def chunk_id(document_id: str, chunk_text: str) -> str:
+    """
+    Deterministic chunk vector ID: document prefix + hash of the normalized chunk content,
+    so an unchanged chunk keeps its ID (and vector) across re-uploads
+    """
+    digest = hashlib.sha256(normalize_text(chunk_text).encode("utf-8")).hexdigest()[:32]
+    return f"{chunk_id_prefix(document_id)}{digest}"
+
+
+def _plan_chunks(chunk_texts: List[str], document_id: str) -> Dict[str, Tuple[int, str]]:
+    """
+    Map chunk ID -> (chunk index, chunk text) in document order; repeated chunks are kept once
+    """
+    planned: Dict[str, Tuple[int, str]] = {}
+    for idx, chunk_text in enumerate(chunk_texts):
+        planned.setdefault(chunk_id(document_id, chunk_text), (idx, chunk_text))
+    return planned
+
+
+def _embed_and_upsert(
+    planned: Dict[str, Tuple[int, str]],
+    namespace: str,
+    metadata: Document,
+    batch_size: Optional[int] = None,
+    on_progress: Optional[Callable[[str, int], None]] = None,
+    raise_on_failure: bool = True,
+) -> int:
+    """
+    Embed the planned chunks and upsert them, returning the number of vectors written.
+    Chunks that fail to embed are logged individually and the rest of their batch is still
+    upserted; with `raise_on_failure` an error is then raised so the ingestion job is retried
+    (which resumes from the upserted chunks).
+    With `batch_size`, chunks are embedded and upserted batch by batch, so every finished
+    batch is durable in the index; `on_progress(stage, done)` is called before each
+    "embedding" and "upserting" step with the number of chunks already upserted.
+    """
+    chunk_ids = list(planned)
+    batch_size = batch_size or max(1, len(chunk_ids))
+    written = 0
+    failed = 0
+    for start in range(0, len(chunk_ids), batch_size):
+        batch_ids = chunk_ids[start:start + batch_size]
+        start_time = time.perf_counter()
+        if on_progress:
+            on_progress("embedding", start)
+        embeddings, errors = _embed_in_batches([planned[vector_id][1] for vector_id in batch_ids])
+
+        vectors = []
+        chunks = []
+        for position, (vector_id, embedding) in enumerate(zip(batch_ids, embeddings)):
+            idx, chunk_text = planned[vector_id]
+            if position in errors:
+                log.error(f"Error processing chunk {idx}: {str(errors[position])}")
+                failed += 1
+                continue
             
+            # The text goes to the chunk store, the vector only carries what filters need
             vectors.append({
-                "id": _get_id(idx),
+                "id": vector_id,
                 "values": embedding,
                 "metadata": {
-                    "chunk_text": chunk_text,
                     "document_id": metadata.document_id,
                     "document_name": metadata.name,
-                    "chunk_index": idx
                 }
             })
-        except Exception as e:
-            log.error(f"Error processing chunk {idx}: {str(e)}")
-            continue
+            chunks.append({"chunk_id": vector_id, "text": chunk_text, "document_id": metadata.document_id, "chunk_index": idx})
+        
+        if vectors:
+            if on_progress:
+                on_progress("upserting", start)
+            # Texts first: every vector a query can return has its text stored
+            chunk_collection.upsert_chunks(namespace, chunks)
+            get_index().upsert(vectors=vectors, namespace=namespace, batch_size=100)
+            index_chunks(namespace, [(chunk["chunk_id"], chunk["text"], _chunk_metadata(chunk)) for chunk in chunks])
+            written += len(vectors)
+            elapsed = time.perf_counter() - start_time
+            throughput = len(vectors) / elapsed if elapsed > 0 else float("inf")
+            log.success(
+                f"Upserted {len(vectors)} chunk texts to Pinecone index {pinecone_config.INDEX_NAME} successfully "
+                f"in {elapsed:.2f}s ({throughput:.1f} chunks/sec)"
+            )
+    if written:
+        bump_corpus_version(namespace)
+    if failed and raise_on_failure:
+        raise RuntimeError(f"{failed} of {len(chunk_ids)} chunks could not be embedded ({written} upserted)")
+    if not written:
+        log.warn("No vectors to upsert")
+    return written
+
+
+def upsert_chunk_texts(chunk_texts: List[str], namespace: str, metadata: Document):
+    """
+    Embed chunk texts and upsert to Pinecone index.
+    Chunks that fail to embed are logged and skipped, the others are still upserted.
+    """
+    _embed_and_upsert(_plan_chunks(chunk_texts, metadata.document_id), namespace, metadata, raise_on_failure=False)
+
+
+def replace_document_chunks(
+    chunk_texts: List[str],
+    namespace: str,
+    metadata: Document,
+    batch_size: Optional[int] = None,
+    on_progress: Optional[Callable[[str, int, int], None]] = None,
+) -> Dict[str, int]:
+    """
+    Replace the stored chunks of a document with `chunk_texts`, re-embedding as little as possible:
+    only new or changed chunks are embedded, chunks that no longer exist are deleted and
+    unchanged vectors are left alone (their chunk_index in the chunk store is updated if the chunk moved).
+    Returns counts of embedded, skipped (unchanged) and deleted chunks.
+
+    Because chunk IDs are content-addressed, an interrupted run is resumed by calling this again:
+    chunks upserted by earlier batches are found in the index and skipped.
+    `on_progress(stage, done, total)` reports the chunks present in the index so far.
+    Raises once the other chunks are upserted if any chunk could not be embedded, so the
+    ingestion job retries it.
+    """
+    planned = _plan_chunks(chunk_texts, metadata.document_id)
+    existing_ids = set(list_chunk_ids(metadata.document_id, namespace))
     
-    if vectors:
-        index.upsert(vectors=vectors, namespace=namespace, batch_size=100)
-        log.success(f"Upserted {len(vectors)} chunk texts to Pinecone index {pinecone_config.INDEX_NAME} successfully")
-    else:
-        log.warning("No vectors to upsert")
+    new_chunks = {vector_id: chunk for vector_id, chunk in planned.items() if vector_id not in existing_ids}
+    unchanged_ids = [vector_id for vector_id in planned if vector_id in existing_ids]
+    stale_ids = [vector_id for vector_id in existing_ids if vector_id not in planned]
+    
+    def _report(stage: str, done: int) -> None:
+        if on_progress:
+            on_progress(stage, len(unchanged_ids) + done, len(planned))
+
+    embedded = _embed_and_upsert(new_chunks, namespace, metadata, batch_size, _report) if new_chunks else 0
+    _report("upserting", len(new_chunks))
+    
+    # Unchanged chunks may have shifted position; fix their index in the chunk store without
+    # touching the vector. Chunks stored before the chunk store existed are written to it.
+    stored = chunk_collection.get_chunks(unchanged_ids)
+    moved = {
+        vector_id: planned[vector_id][0]
+        for vector_id in unchanged_ids
+        if vector_id in stored and stored[vector_id].get("chunk_index") != planned[vector_id][0]
+    }
+    chunk_collection.set_chunk_indexes(moved)
+    missing = [
+        {"chunk_id": vector_id, "text": planned[vector_id][1], "document_id": metadata.document_id, "chunk_index": planned[vector_id][0]}
+        for vector_id in unchanged_ids
+        if vector_id not in stored
+    ]
+    chunk_collection.upsert_chunks(namespace, missing)
+    index_chunks(namespace, [
+        (vector_id, planned[vector_id][1], {"document_id": metadata.document_id, "chunk_index": idx})
+        for vector_id, idx in moved.items()
+    ])
+    
+    for start in range(0, len(stale_ids), DELETE_BATCH_SIZE):
+        get_index().delete(ids=stale_ids[start:start + DELETE_BATCH_SIZE], namespace=namespace)
+    chunk_collection.delete_chunks(stale_ids)
+    unindex_chunks(namespace, stale_ids)
+    if (moved or stale_ids) and not embedded:
+        # Chunks added above already bumped the version
+        bump_corpus_version(namespace)
+    
+    stats = {"embedded": embedded, "skipped": len(unchanged_ids), "deleted": len(stale_ids)}
+    log.success(
+        f"Replaced chunks of document {metadata.document_id}: {stats['embedded']} embedded, "
+        f"{stats['skipped']} unchanged (embedding skipped), {stats['deleted']} deleted"
+    )
+    return stats
+
+
+def chunk_id_prefix(document_id: str) -> str:
+    """
+    Every chunk vector ID starts with this prefix, so a document's chunks can be listed by ID
+    """
+    return f"{document_id}#"
+
+
+def list_chunk_ids(document_id: str, namespace: str) -> List[str]:
+    """
+    List the IDs of all chunks of a document by ID prefix (paginated, no top_k ceiling)
+    """
+    # Chunks ingested before the prefix scheme are named '{document_id}-{index}-{uuid}'
+    # (earlier prefixed chunks are '{document_id}#{index}', covered by the first prefix)
+    prefixes = [chunk_id_prefix(document_id), f"{document_id}-"]
+    chunk_ids = []
+    for prefix in prefixes:
+        for page in get_index().list(prefix=prefix, namespace=namespace):
+            chunk_ids.extend(page)
+    return chunk_ids
 
 
 def get_chunk_texts_by_document_id(document_id: str, namespace: str) -> List[Dict[str, Any]]:
     """
-    Get all chunk texts for a specific document
+    Get all chunks of a specific document from the chunk store, ordered by chunk index
     """
     try:
-        # Use query with filter instead of search
-        response = index.query(
-            namespace=namespace,
-            filter={
-                "document_id": {"$eq": document_id}
-            },
-            top_k=10000,  # Large number to get all chunks
-            include_metadata=True
-        )
-        with open("response.json", "w", encoding="utf-8") as f:
-            json.dump(response, f, ensure_ascii=False, indent=4)
-
-        return response.matches
+        return chunk_collection.get_document_chunks(document_id)
     except Exception as e:
         log.error(f"Error getting chunks by document_id: {str(e)}")
         return []
 
 
-def get_context_by_query(query: str, namespace: str, top_k: int = None) -> str:
+def _chunk_metadata(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    return {"document_id": chunk.get("document_id", ""), "chunk_index": chunk.get("chunk_index")}
+
+
+def _vector_count(namespace: str) -> int:
+    stats = get_index().describe_index_stats()
+    namespace_stats = stats.namespaces.get(namespace)
+    return namespace_stats.vector_count if namespace_stats else 0
+
+
+def iter_namespace_chunks(namespace: str) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
     """
-    Get relevant context by embedding the query and searching similar vectors
+    Yield (chunk ID, chunk text, metadata) for every chunk stored in a namespace.
+    While the namespace has vectors without a chunk store entry (written before the chunk
+    store, see migrate_chunk_texts), their texts are read from the vector metadata and
+    backfilled into the chunk store, so the next build finds them there.
     """
-   
+    stored = set()
+    for chunk in chunk_collection.iter_namespace(namespace):
+        stored.add(chunk["_id"])
+        if chunk.get("text"):
+            yield chunk["_id"], chunk["text"], _chunk_metadata(chunk)
     
+    if len(stored) >= _vector_count(namespace):
+        return
+    for page in get_index().list(namespace=namespace):
+        missing = [vector_id for vector_id in page if vector_id not in stored]
+        for vector_id, chunk in _fetch_legacy_chunks(missing, namespace).items():
+            yield vector_id, chunk["text"], _chunk_metadata(chunk)
+
+
+def migrate_chunk_texts(namespace: str) -> Dict[str, int]:
+    """
+    Move the chunk texts of vectors written before the chunk store out of their metadata:
+    the text is copied to the chunk store and the vector re-upserted without it.
+    Idempotent; returns the number of chunks migrated and the metadata bytes removed.
+    """
+    migrated = removed_bytes = 0
+    for page in get_index().list(namespace=namespace):
+        for start in range(0, len(page), FETCH_BATCH_SIZE):
+            vectors = get_index().fetch(ids=page[start:start + FETCH_BATCH_SIZE], namespace=namespace).vectors
+            legacy = {vector_id: vector for vector_id, vector in vectors.items() if (vector.metadata or {}).get("chunk_text")}
+            if not legacy:
+                continue
+            chunk_collection.upsert_chunks(namespace, [
+                {
+                    "chunk_id": vector_id,
+                    "text": vector.metadata["chunk_text"],
+                    "document_id": vector.metadata.get("document_id", ""),
+                    "chunk_index": vector.metadata.get("chunk_index"),
+                }
+                for vector_id, vector in legacy.items()
+            ])
+            get_index().upsert(
+                vectors=[
+                    {
+                        "id": vector_id,
+                        # Local store records are dicts, where .values is the dict method
+                        "values": list(vector["values"] if isinstance(vector, dict) else vector.values),
+                        "metadata": {key: value for key, value in vector.metadata.items() if key not in ("chunk_text", "chunk_index")},
+                    }
+                    for vector_id, vector in legacy.items()
+                ],
+                namespace=namespace,
+                batch_size=100,
+            )
+            migrated += len(legacy)
+            removed_bytes += sum(len(vector.metadata["chunk_text"].encode("utf-8")) for vector in legacy.values())
+    log.success(f"Moved {migrated} chunk texts of namespace {namespace} to the chunk store ({removed_bytes} bytes of metadata)")
+    return {"migrated": migrated, "removed_bytes": removed_bytes}
+
+
+def _to_passage(chunk_id: str, namespace: str, score: float, metadata: Optional[Dict[str, Any]] = None, vector_match: bool = False) -> Passage:
+    metadata = metadata or {}
+    return Passage(
+        chunk_id=chunk_id,
+        text="",
+        score=score,
+        document_id=metadata.get("document_id", ""),
+        chunk_index=metadata.get("chunk_index"),
+        namespace=namespace,
+        vector_match=vector_match,
+    )
+
+
+def _fetch_legacy_chunks(chunk_ids: List[str], namespace: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Chunks not in the chunk store yet (see migrate_chunk_texts): read from the vector
+    metadata and written to the chunk store, so the next query finds them there
+    """
+    chunks = {}
+    for start in range(0, len(chunk_ids), FETCH_BATCH_SIZE):
+        vectors = get_index().fetch(ids=chunk_ids[start:start + FETCH_BATCH_SIZE], namespace=namespace).vectors
+        for vector_id, vector in vectors.items():
+            metadata = vector.metadata or {}
+            if metadata.get("chunk_text"):
+                chunks[vector_id] = {"text": metadata["chunk_text"], "document_id": metadata.get("document_id", ""), "chunk_index": metadata.get("chunk_index")}
     try:
-        # Embed the query
-        query_embedding = embed_text(query)
-        
-        # Search for similar vectors
-        response = index.query(
+        chunk_collection.upsert_chunks(namespace, [{"chunk_id": vector_id, **chunk} for vector_id, chunk in chunks.items()])
+    except Exception as e:
+        log.warn(f"Could not backfill the chunk store: {str(e)}")
+    return chunks
+
+
+def _hydrate(passages: List[Passage]) -> Tuple[List[Passage], int]:
+    """
+    Read the text of every candidate from the chunk store with one multi-get; the chunk store
+    is the source of truth, so a BM25 match whose chunk was deleted or replaced since its
+    index was built is dropped rather than served. Passages whose text can't be found are
+    dropped. Also returns the bytes of chunk text the vector query responses no longer carry
+    as metadata.
+    """
+    chunks = chunk_collection.get_chunks([passage.chunk_id for passage in passages])
+    legacy: Dict[str, List[str]] = {}
+    for passage in passages:
+        if passage.chunk_id not in chunks:
+            legacy.setdefault(passage.namespace, []).append(passage.chunk_id)
+    for namespace, chunk_ids in legacy.items():
+        chunks.update(_fetch_legacy_chunks(chunk_ids, namespace))
+    
+    hydrated = []
+    hydrated_bytes = 0
+    for passage in passages:
+        chunk = chunks.get(passage.chunk_id)
+        if chunk is None or not chunk.get("text"):
+            continue
+        if passage.vector_match:
+            hydrated_bytes += len(chunk["text"].encode("utf-8"))
+        passage.text = chunk["text"]
+        passage.document_id = chunk.get("document_id", "")
+        passage.chunk_index = chunk.get("chunk_index")
+        hydrated.append(passage)
+    return hydrated, hydrated_bytes
+
+
+def _corpus_version(namespace: str) -> int:
+    return corpus_version_collection.get_versions([namespace])[namespace]
+
+
+def _lexical_search(query: str, namespace: str, top_k: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    BM25 matches as (chunk ID, chunk metadata), best first
+    """
+    try:
+        # Never block a query on building the index, the first queries use vector results alone
+        lexical_index = get_lexical_index(namespace, iter_namespace_chunks, wait=False, version_reader=_corpus_version)
+        if lexical_index is None:
+            return []
+        return [(chunk_id, lexical_index.metadata[chunk_id]) for chunk_id, _ in lexical_index.search(query, top_k)]
+    except Exception as e:
+        # Lexical retrieval only refines the ranking, fall back to vector results alone
+        log.warn(f"Lexical search failed: {str(e)}")
+        return []
+
+
+def _rank_namespace(
+    query: str,
+    query_embedding: List[float],
+    namespace: str,
+    candidate_count: int,
+    timer: StageTimer,
+    stage_suffix: str = "",
+) -> Tuple[List[Passage], float]:
+    """
+    Ranked candidates of one namespace and the best vector similarity found.
+    Candidate scores are cosine similarities, or fused RRF scores with hybrid search, so
+    rankings of different namespaces can be merged by score. Vector matches come back as IDs
+    and scores only and BM25 matches as IDs; their text is filled in by `_hydrate` once the
+    rankings are merged.
+    """
+    # Search for similar vectors
+    with timer.stage(f"vector_query{stage_suffix}"):
+        response = get_index().query(
             namespace=namespace,
             vector=query_embedding,
-            top_k=10,
-            include_metadata=True
+            top_k=candidate_count,
+            include_metadata=False
         )
+    
+    # Extract candidates from matches
+    candidates: Dict[str, Passage] = {}
+    vector_ranking = []
+    for match in response.matches:
+        if match.score > rag_config.MIN_SIMILARITY:  # Only include high similarity matches
+            candidates[match.id] = _to_passage(match.id, namespace, match.score, vector_match=True)
+            vector_ranking.append(match.id)
+    top_similarity = max((match.score for match in response.matches), default=0.0)
+    
+    # Lexical matches only refine a relevant vector result: without one, the query is off-topic
+    # (a shared common word is no evidence) and gets no context
+    if not rag_config.HYBRID_SEARCH or not vector_ranking:
+        return [candidates[chunk_id] for chunk_id in vector_ranking], top_similarity
+    
+    # Exact terms (class names, rooms, dates, names) via BM25, fused with the vector ranking
+    with timer.stage(f"lexical{stage_suffix}"):
+        lexical_matches = _lexical_search(query, namespace, top_k=candidate_count)
+    for chunk_id, metadata in lexical_matches:
+        candidates.setdefault(chunk_id, _to_passage(chunk_id, namespace, 0.0, metadata))
+    fused = reciprocal_rank_fusion([vector_ranking, [chunk_id for chunk_id, _ in lexical_matches]])
+    ranked = []
+    for chunk_id, score in fused[:candidate_count]:
+        candidates[chunk_id].score = score
+        ranked.append(candidates[chunk_id])
+    return ranked, top_similarity
+
+
+def _rank_namespace_safe(
+    query: str,
+    query_embedding: List[float],
+    namespace: str,
+    candidate_count: int,
+    timer: StageTimer,
+) -> Tuple[List[Passage], float]:
+    # In a fan-out, a failing namespace must not cost the results of the others
+    try:
+        return _rank_namespace(query, query_embedding, namespace, candidate_count, timer, f":{namespace}")
+    except Exception as e:
+        log.warn(f"Search in namespace {namespace} failed: {str(e)}")
+        return [], 0.0
+
+
+def get_context_by_query(
+    query: str,
+    namespace: Optional[Union[str, List[str]]] = None,
+    top_k: int = None,
+    timer: Optional[StageTimer] = None,
+    query_embedding: Optional[List[float]] = None,
+) -> str:
+    """
+    Get relevant context by embedding the query and searching similar vectors.
+    `namespace` is one namespace, a list of namespaces, or None to let the topic router
+    (src/rag/router.py) pick them. Several namespaces are searched concurrently with the same
+    query embedding and their candidates are merged by score.
+    The chunk texts of the merged candidates are read from the chunk store in one batch.
+    Up to `top_k` passages (defaults to RAG_SIMILARITY_TOP_K) are packed into the
+    context within RAG_CONTEXT_TOKEN_BUDGET tokens (see src/rag/context.py).
+    Stage durations (embed, vector_query, lexical, hydrate, context) are recorded on `timer` when given;
+    with several namespaces the per-namespace stages are suffixed with ":<namespace>".
+    A `query_embedding` computed earlier in the turn (answer cache lookup) is reused.
+    """
+    timer = timer or StageTimer()
+    top_k = top_k or rag_config.SIMILARITY_TOP_K
+    candidate_count = top_k * max(1, rag_config.CANDIDATE_MULTIPLIER)
+    
+    try:
+        namespaces = resolve_namespaces(query, namespace)
+        
+        # Embed the query
+        if query_embedding is None:
+            with timer.stage("embed"):
+                query_embedding = embed_text(query)
+        
+        if len(namespaces) == 1:
+            ranked, top_similarity = _rank_namespace(query, query_embedding, namespaces[0], candidate_count, timer)
+        else:
+            with timer.stage("search"):
+                # The first namespace is searched on the calling thread, the others on the shared pool
+                futures = [
+                    get_executor().submit(_rank_namespace_safe, query, query_embedding, name, candidate_count, timer)
+                    for name in namespaces[1:]
+                ]
+                ranked, top_similarity = _rank_namespace_safe(query, query_embedding, namespaces[0], candidate_count, timer)
+                for future in futures:
+                    namespace_ranked, namespace_similarity = future.result()
+                    ranked.extend(namespace_ranked)
+                    top_similarity = max(top_similarity, namespace_similarity)
+            ranked.sort(key=lambda passage: passage.score, reverse=True)
+            ranked = ranked[:candidate_count]
         
-        # Extract context from matches
-        contexts = []
-        for match in response.matches:
-            if match.score > 0.2:  # Only include high similarity matches
-                chunk_text = match.metadata.get('chunk_text', '')
-                if chunk_text:
-                    contexts.append(chunk_text)
-        log.success(f"Retrieved {len(contexts)} relevant chunks for query")
-        context = "\n\n".join(contexts)
+        with timer.stage("hydrate"):
+            ranked, saved_bytes = _hydrate(ranked)
+        
+        with timer.stage("context"):
+            context, stats = assemble_context(ranked, top_k=top_k)
+        set_metric("namespaces", len(namespaces))
+        set_metric("retrieval_candidates", len(ranked))
+        set_metric("retrieval_hits", stats["passages"])
+        set_metric("top_score", round(top_similarity, 4))
+        set_metric("context_tokens", stats["tokens"])
+        set_metric("payload_bytes_saved", saved_bytes)
+        log.success(
+            f"Retrieved {stats['passages']} relevant chunks for query from {', '.join(namespaces)} in {stats['spans']} spans, "
+            f"{stats['tokens']} context tokens (saved {stats['saved_tokens']} of {stats['naive_tokens']}), "
+            f"{saved_bytes} bytes of chunk text read from the chunk store instead of the vector query"
+        )
         return context
         
     except Exception as e:
         log.error(f"Error getting context by query: {str(e)}")
+        log_error(f"Error getting context by query: {str(e)}", ComponentType.QUERY_ENGINE, ErrorType.QUERY_PROCESSING)
         return ""
 
 
+def bump_corpus_version(namespace: str) -> int:
+    """
+    Record that a namespace's chunks changed: answers cached over the old chunks stop matching
+    (src/rag/answer_cache.py) and are deleted. Returns the new version.
+    """
+    version = corpus_version_collection.bump(namespace)
+    # This process already applied its change to the BM25 index
+    note_corpus_version(namespace, version)
+    removed = answer_cache_collection.delete_namespace(namespace)
+    log.info(f"Corpus version of {namespace} is now {version}, {removed} cached answers dropped")
+    return version
+
+
 def delete_document_chunks(document_id: str, namespace: str) -> bool:
     """
     Delete all chunks for a specific document
     """
     try:
         # Get all chunk IDs for the document
-        matches = get_chunk_texts_by_document_id(document_id, namespace)
-        chunk_ids = [match.id for match in matches]
+        chunk_ids = list_chunk_ids(document_id, namespace)
         
         if chunk_ids:
-            index.delete(ids=chunk_ids, namespace=namespace)
+            for start in range(0, len(chunk_ids), DELETE_BATCH_SIZE):
+                get_index().delete(ids=chunk_ids[start:start + DELETE_BATCH_SIZE], namespace=namespace)
+            chunk_collection.delete_chunks(chunk_ids)
+            unindex_chunks(namespace, chunk_ids)
+            bump_corpus_version(namespace)
             log.success(f"Deleted {len(chunk_ids)} chunks for document {document_id}")
             return True
         else:
@@ -171,9 +773,19 @@ def delete_document_chunks(document_id: str, namespace: str) -> bool:
 
 
 __all__ = [
+    "provision_index",
+    "get_index",
     "embed_text",
+    "embed_texts",
+    "bump_corpus_version",
     "upsert_chunk_texts", 
+    "replace_document_chunks",
+    "chunk_id",
+    "chunk_id_prefix",
+    "list_chunk_ids",
     "get_chunk_texts_by_document_id", 
+    "iter_namespace_chunks",
+    "migrate_chunk_texts",
     "get_context_by_query",
     "delete_document_chunks"
 ]
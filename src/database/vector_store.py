@@ -0,0 +1,342 @@
+# Standard library imports
+import os
+import json
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes are only serialized within the process
+    fcntl = None
+
+# Third-party imports
+import numpy as np
+
+
+class _Record(dict):
+    """
+    Dict with attribute access, so results read like Pinecone's response objects
+    (match.id, match.score, response.matches) and still serialize as plain JSON
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def _matches_filter(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evaluate the subset of Pinecone's metadata filter language we use
+    ({"field": value} or {"field": {"$eq" | "$ne" | "$in" | "$nin": ...}})
+    """
+    if not filter:
+        return True
+    for field, condition in filter.items():
+        value = metadata.get(field)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, operand in condition.items():
+            if operator == "$eq" and value != operand:
+                return False
+            if operator == "$ne" and value == operand:
+                return False
+            if operator == "$in" and value not in operand:
+                return False
+            if operator == "$nin" and value in operand:
+                return False
+            if operator not in ("$eq", "$ne", "$in", "$nin"):
+                raise ValueError(f"Unsupported filter operator: {operator}")
+    return True
+
+
+class _Namespace:
+    """
+    Vectors of one namespace: an (n, dimension) float32 matrix of L2-normalized rows
+    plus parallel lists of IDs and metadata
+    """
+
+    def __init__(self, dimension: int):
+        self.matrix = np.empty((0, dimension), dtype=np.float32)
+        self.ids: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self.positions: Dict[str, int] = {}
+        # Matrix file of the stored pair, bumped with every matrix write
+        self.generation = 0
+        self.matrix_file = "vectors.npy"
+        # Identity of the metadata file this was loaded from, (inode, mtime)
+        self.version: Optional[Tuple[int, int]] = None
+
+    def reindex(self) -> None:
+        self.positions = {vector_id: position for position, vector_id in enumerate(self.ids)}
+
+
+class LocalVectorStore:
+    """
+    In-process vector store exposing the subset of the Pinecone Index API used by the app
+    (upsert, query by vector and/or metadata filter, list IDs by prefix, fetch, update
+    metadata and delete by ID).
+
+    Each namespace is a NumPy matrix of normalized vectors, so cosine similarity is a single
+    matmul and top-k is an argpartition. Namespaces are persisted under `path` as a .npy
+    matrix (loaded memory-mapped for fast startup) next to a JSON file of IDs and metadata.
+    Every matrix write goes to a new generation file that the metadata file names, and the
+    metadata file is replaced atomically, so a reader always gets a matching pair. Writers,
+    in this or another process (Streamlit server, standalone ingestion worker), hold an
+    exclusive file lock on the namespace while they reload, modify and save it; readers
+    don't lock and pick up the new files on their next access.
+    """
+
+    def __init__(self, path: str, dimension: int):
+        self.path = path
+        self.dimension = dimension
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+    # --- Persistence ---
+
+    def _files(self, namespace: str):
+        directory = os.path.join(self.path, namespace)
+        return directory, os.path.join(directory, "metadata.json")
+
+    @contextmanager
+    def _write_lock(self, namespace: str):
+        """
+        Serialize writers of a namespace across threads and processes
+        """
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.path, f"{namespace}.lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self, namespace: str) -> _Namespace:
+        """
+        Return the namespace, (re)loading it from disk when the files changed
+        """
+        directory, metadata_file = self._files(namespace)
+        cached = self._namespaces.get(namespace)
+        try:
+            stat = os.stat(metadata_file)
+        except FileNotFoundError:
+            stat = None
+        version = (stat.st_ino, stat.st_mtime_ns) if stat is not None else None
+        if cached is not None and cached.version == version:
+            return cached
+
+        data = _Namespace(self.dimension)
+        if version is not None:
+            for attempt in range(3):
+                try:
+                    with open(metadata_file, "r", encoding="utf-8") as f:
+                        stored = json.load(f)
+                    # Stores written before generations have a fixed matrix file name
+                    matrix_file = stored.get("matrix_file", "vectors.npy")
+                    data.matrix = np.load(os.path.join(directory, matrix_file), mmap_mode="r")
+                    break
+                except FileNotFoundError:
+                    # A writer replaced the pair and removed this matrix in between: read the new pair
+                    if attempt == 2:
+                        raise
+            data.ids = stored["ids"]
+            data.metadata = stored["metadata"]
+            data.generation = stored.get("generation", 0)
+            data.matrix_file = matrix_file
+            data.reindex()
+            data.version = version
+        self._namespaces[namespace] = data
+        return data
+
+    def _save(self, namespace: str, data: _Namespace, write_matrix: bool = True) -> None:
+        """
+        Persist the namespace; call with the namespace's write lock held
+        """
+        directory, metadata_file = self._files(namespace)
+        os.makedirs(directory, exist_ok=True)
+        previous_matrix_file = data.matrix_file
+        if write_matrix:
+            # A new file per generation: readers of the previous metadata still find their matrix
+            data.generation += 1
+            data.matrix_file = f"vectors-{data.generation}.npy"
+            matrix_path = os.path.join(directory, data.matrix_file)
+            with open(matrix_path + ".tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(data.matrix, dtype=np.float32))
+            os.replace(matrix_path + ".tmp", matrix_path)
+        with open(metadata_file + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(
+                {"generation": data.generation, "matrix_file": data.matrix_file, "ids": data.ids, "metadata": data.metadata},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(metadata_file + ".tmp", metadata_file)
+        if write_matrix:
+            try:
+                # Open memory maps keep the old file readable until they are closed
+                os.remove(os.path.join(directory, previous_matrix_file))
+            except OSError:
+                pass
+        # Reopen memory-mapped so the in-memory copy doesn't outlive the write
+        data.matrix = np.load(os.path.join(directory, data.matrix_file), mmap_mode="r")
+        stat = os.stat(metadata_file)
+        data.version = (stat.st_ino, stat.st_mtime_ns)
+
+    # --- Index API ---
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        Insert or overwrite vectors given as {"id", "values", "metadata"} dicts
+        """
+        if not vectors:
+            return {"upserted_count": 0}
+        values = np.asarray([vector["values"] for vector in vectors], dtype=np.float32)
+        if values.ndim != 2 or values.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension {values.shape[-1]} does not match the dimension of the index {self.dimension}")
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        values = values / np.where(norms == 0, 1, norms)
+
+        with self._write_lock(namespace):
+            data = self._load(namespace)
+            matrix = np.array(data.matrix, dtype=np.float32)
+            appended = []
+            for row, vector in zip(values, vectors):
+                position = data.positions.get(vector["id"])
+                if position is None:
+                    data.positions[vector["id"]] = len(data.ids)
+                    data.ids.append(vector["id"])
+                    data.metadata.append(vector.get("metadata") or {})
+                    appended.append(row)
+                else:
+                    matrix[position] = row
+                    data.metadata[position] = vector.get("metadata") or {}
+            if appended:
+                matrix = np.vstack([matrix, np.asarray(appended, dtype=np.float32)])
+            data.matrix = matrix
+            self._save(namespace, data)
+        return {"upserted_count": len(vectors)}
+
+    def query(
+        self,
+        namespace: str,
+        vector: Optional[List[float]] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        include_metadata: bool = False,
+        **kwargs,
+    ) -> _Record:
+        """
+        Return the top_k matches by cosine similarity among vectors passing the metadata filter.
+        Without a query vector, matching vectors are returned in insertion order with score 0.
+        """
+        with self._lock:
+            data = self._load(namespace)
+            candidates = np.arange(len(data.ids))
+            if filter:
+                candidates = np.asarray(
+                    [position for position in candidates if _matches_filter(data.metadata[position], filter)],
+                    dtype=np.int64,
+                )
+
+            if vector is None or len(candidates) == 0:
+                selected = candidates[:top_k]
+                scores = np.zeros(len(selected), dtype=np.float32)
+            else:
+                query_vector = np.asarray(vector, dtype=np.float32)
+                norm = np.linalg.norm(query_vector)
+                if norm:
+                    query_vector = query_vector / norm
+                candidate_scores = data.matrix[candidates] @ query_vector if filter else data.matrix @ query_vector
+                k = min(top_k, len(candidates))
+                if k < len(candidates):
+                    top = np.argpartition(-candidate_scores, k - 1)[:k]
+                else:
+                    top = np.arange(len(candidates))
+                top = top[np.argsort(-candidate_scores[top], kind="stable")]
+                selected = candidates[top]
+                scores = candidate_scores[top]
+
+            matches = [
+                _Record(
+                    id=data.ids[position],
+                    score=float(score),
+                    metadata=dict(data.metadata[position]) if include_metadata else None,
+                )
+                for position, score in zip(selected, scores)
+            ]
+        return _Record(matches=matches, namespace=namespace)
+
+    def list(self, namespace: str, prefix: str = "", limit: int = 100) -> Iterator[List[str]]:
+        """
+        Yield pages of IDs starting with `prefix`, like Pinecone's serverless list()
+        """
+        with self._lock:
+            ids = sorted(vector_id for vector_id in self._load(namespace).ids if vector_id.startswith(prefix))
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def fetch(self, ids: List[str], namespace: str) -> _Record:
+        """
+        Fetch stored vectors (values and metadata) by ID; unknown IDs are omitted
+        """
+        with self._lock:
+            data = self._load(namespace)
+            vectors = {
+                vector_id: _Record(
+                    id=vector_id,
+                    values=data.matrix[data.positions[vector_id]].tolist(),
+                    metadata=dict(data.metadata[data.positions[vector_id]]),
+                )
+                for vector_id in ids
+                if vector_id in data.positions
+            }
+        return _Record(vectors=vectors, namespace=namespace)
+
+    def update(self, id: str, namespace: str, set_metadata: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        """
+        Merge `set_metadata` into the metadata of one vector, leaving its values untouched
+        """
+        with self._write_lock(namespace):
+            data = self._load(namespace)
+            position = data.positions.get(id)
+            if position is not None and set_metadata:
+                data.metadata[position] = {**data.metadata[position], **set_metadata}
+                self._save(namespace, data, write_matrix=False)
+        return {}
+
+    def delete(self, ids: List[str], namespace: str) -> Dict[str, Any]:
+        """
+        Delete vectors by ID (unknown IDs are ignored)
+        """
+        with self._write_lock(namespace):
+            data = self._load(namespace)
+            doomed = {data.positions[vector_id] for vector_id in ids if vector_id in data.positions}
+            if doomed:
+                keep = np.asarray([position for position in range(len(data.ids)) if position not in doomed], dtype=np.int64)
+                data.matrix = np.array(data.matrix, dtype=np.float32)[keep] if len(keep) else np.empty((0, self.dimension), dtype=np.float32)
+                data.ids = [data.ids[position] for position in keep]
+                data.metadata = [data.metadata[position] for position in keep]
+                data.reindex()
+                self._save(namespace, data)
+        return {}
+
+    def describe_index_stats(self) -> _Record:
+        with self._lock:
+            namespaces = {}
+            for namespace in sorted(os.listdir(self.path)):
+                if os.path.isdir(os.path.join(self.path, namespace)):
+                    namespaces[namespace] = _Record(vector_count=len(self._load(namespace).ids))
+        return _Record(
+            dimension=self.dimension,
+            namespaces=namespaces,
+            total_vector_count=sum(stats.vector_count for stats in namespaces.values()),
+        )
+
+
+__all__ = ["LocalVectorStore"]
@@ -0,0 +1,8 @@
+"""
+Document ingestion: text extraction, chunking and the background ingestion pipeline
+"""
+
+from .chunking import count_tokens, iter_chunks, split_text
+from .extraction import ExtractedDocument, UnusableFileError, extract_document, extract_text
+
+__all__ = ["count_tokens", "iter_chunks", "split_text", "ExtractedDocument", "UnusableFileError", "extract_document", "extract_text"]
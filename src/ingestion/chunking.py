@@ -0,0 +1,215 @@
+"""
+Structure-aware, token-budgeted chunking.
+
+Text is split on headings first, then paragraphs, then sentences, and only a single
+sentence longer than the budget is cut between words. Sizes are measured in tokens of the
+embedding model's tokenizer, so CHUNK_SIZE / CHUNK_OVERLAP mean what the API bills. Each
+unit is tokenized exactly once and chunks are produced by a generator, so chunking is
+linear in the input and can consume pages while they are still being extracted.
+"""
+
+# Standard library imports
+import re
+import math
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Third-party imports
+import tiktoken
+
+# Local imports
+from src.configs import openai_config, rag_config
+from src.utils import log
+from src.utils.concurrency import run_once
+
+# Markdown headings, Vietnamese legal/regulation structure (Chương, Mục, Điều, Phần)
+# and roman-numeral section titles
+HEADING_PATTERN = re.compile(
+    r"^\s*(#{1,6}\s+\S|(chương|mục|điều|phần|phụ lục)\s+[\dIVXLC]+\b|(?-i:[IVXLC]+)\.\s+\S)",
+    re.IGNORECASE,
+)
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# Units are joined with a blank line, budget one token for it
+SEPARATOR_TOKENS = 1
+# A sentence ends with . ! ? … (optionally followed by closing quotes/brackets) and whitespace
+# (a number followed by a period is a list marker such as "1.", not a sentence end)
+SENTENCE_END = re.compile(r"(?<=[^\d\s][.!?…])[\"')\]]*\s+")
+# Token estimate when the tokenizer can't be loaded. Vietnamese averages fewer UTF-8 bytes
+# per token than English (~4), so this errs towards more tokens, i.e. smaller chunks
+FALLBACK_BYTES_PER_TOKEN = 3
+
+
+@run_once
+def _encoding() -> Optional[tiktoken.Encoding]:
+    """
+    The embedding model's tokenizer, or None when its BPE file can't be loaded (tiktoken
+    downloads it on first use). The outcome is cached, so a failed download isn't retried
+    on every call.
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(openai_config.EMBEDDING_MODEL)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        log.warn(f"Could not load the tokenizer, token counts are estimated from text length: {str(e)}")
+        return None
+
+
+def tokenizer_name() -> str:
+    encoding = _encoding()
+    return encoding.name if encoding is not None else f"estimate ({FALLBACK_BYTES_PER_TOKEN} bytes per token)"
+
+
+def count_tokens(text: str) -> int:
+    """
+    Number of tokens of `text` for the embedding model's tokenizer (estimated when it is unavailable)
+    """
+    encoding = _encoding()
+    if encoding is None:
+        return math.ceil(len(text.encode("utf-8")) / FALLBACK_BYTES_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _is_heading(paragraph: str) -> bool:
+    first_line = paragraph.lstrip().split("\n", 1)[0]
+    return len(first_line) <= 120 and bool(HEADING_PATTERN.match(first_line))
+
+
+def _iter_paragraphs(blocks: Iterable[str]) -> Iterator[str]:
+    for block in blocks:
+        for paragraph in PARAGRAPH_BREAK.split(block):
+            paragraph = paragraph.strip()
+            if paragraph:
+                yield paragraph
+
+
+def _split_long_sentence(sentence: str, chunk_size: int) -> Iterator[Tuple[str, int]]:
+    """
+    Cut a sentence that alone exceeds the budget between words
+    """
+    words = sentence.split()
+    piece: List[str] = []
+    piece_tokens = 0
+    for word in words:
+        word_tokens = count_tokens(" " + word)
+        if piece and piece_tokens + word_tokens > chunk_size:
+            yield " ".join(piece), piece_tokens
+            piece, piece_tokens = [], 0
+        piece.append(word)
+        piece_tokens += word_tokens
+    if piece:
+        yield " ".join(piece), piece_tokens
+
+
+def _iter_units(paragraph: str, chunk_size: int) -> Iterator[Tuple[str, int]]:
+    """
+    Yield (text, token count) units of a paragraph: the paragraph itself when it fits,
+    otherwise its sentences (and word-cut pieces of over-long sentences)
+    """
+    paragraph_tokens = count_tokens(paragraph)
+    if paragraph_tokens <= chunk_size:
+        yield paragraph, paragraph_tokens
+        return
+    for sentence in SENTENCE_END.split(paragraph):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        tokens = count_tokens(sentence)
+        if tokens <= chunk_size:
+            yield sentence, tokens
+        else:
+            yield from _split_long_sentence(sentence, chunk_size)
+
+
+def iter_chunks(
+    blocks: Union[str, Iterable[str]],
+    chunk_size: Optional[int] = None,
+    overlap: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Split text into chunks of at most `chunk_size` tokens (defaults to RAG_CHUNK_SIZE).
+
+    `blocks` is a string or an iterable of strings (e.g. pages as they are extracted).
+    A heading starts a new chunk (consecutive headings stay together with the text below
+    them). Consecutive chunks within a section share up to `overlap` tokens (defaults to
+    RAG_CHUNK_OVERLAP) of whole trailing sentences/paragraphs, never a cut word.
+    """
+    chunk_size = chunk_size or rag_config.CHUNK_SIZE
+    overlap = rag_config.CHUNK_OVERLAP if overlap is None else overlap
+    overlap = min(overlap, chunk_size // 2)
+    if isinstance(blocks, str):
+        blocks = [blocks]
+
+    # Units of the chunk being built: (text, tokens incl. separator, starts a paragraph)
+    current: Deque[Tuple[str, int, bool]] = deque()
+    current_tokens = 0
+    fresh = False  # current holds more than the overlap carried over from the previous chunk
+    has_body = False  # current holds more than headings
+
+    def _render() -> str:
+        parts = []
+        for position, (text, _, starts_paragraph) in enumerate(current):
+            if position:
+                parts.append("\n\n" if starts_paragraph else " ")
+            parts.append(text)
+        return "".join(parts)
+
+    def _flush(carry: bool) -> Optional[str]:
+        nonlocal current_tokens, fresh, has_body
+        chunk = _render() if fresh else None
+        # Keep the trailing units (up to `overlap` tokens) as the start of the next chunk
+        carried: Deque[Tuple[str, int, bool]] = deque()
+        carried_tokens = 0
+        if carry:
+            for unit in reversed(current):
+                if carried_tokens + unit[1] > overlap:
+                    break
+                carried.appendleft(unit)
+                carried_tokens += unit[1]
+        current.clear()
+        current.extend(carried)
+        current_tokens = carried_tokens
+        fresh = has_body = False
+        return chunk
+
+    for paragraph in _iter_paragraphs(blocks):
+        heading = _is_heading(paragraph)
+        if heading and has_body:
+            # No overlap across section boundaries
+            chunk = _flush(carry=False)
+            if chunk:
+                yield chunk
+        elif heading and not fresh:
+            current.clear()
+            current_tokens = 0
+
+        starts_paragraph = True
+        for text, tokens in _iter_units(paragraph, chunk_size - SEPARATOR_TOKENS):
+            tokens += SEPARATOR_TOKENS
+            if fresh and current_tokens + tokens > chunk_size:
+                chunk = _flush(carry=True)
+                if chunk:
+                    yield chunk
+            # Drop carried-over context that no longer leaves room for the new unit
+            while current and current_tokens + tokens > chunk_size:
+                current_tokens -= current.popleft()[1]
+            current.append((text, tokens, starts_paragraph))
+            current_tokens += tokens
+            starts_paragraph = False
+            fresh = True
+            has_body = has_body or not heading
+
+    chunk = _flush(carry=False)
+    if chunk:
+        yield chunk
+
+
+def split_text(text: str, chunk_size: Optional[int] = None, overlap: Optional[int] = None) -> List[str]:
+    """
+    Chunk a whole text at once (see iter_chunks)
+    """
+    return list(iter_chunks(text, chunk_size, overlap))
+
+
+__all__ = ["count_tokens", "tokenizer_name", "iter_chunks", "split_text"]
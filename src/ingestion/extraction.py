@@ -0,0 +1,184 @@
+"""
+Text extraction for uploaded documents.
+
+PDF text extraction with PyPDF2 is pure-Python and CPU-bound, so pages are extracted in a
+process pool: the page range is cut into slices, each worker opens the file and extracts
+its slice, and pages are yielded in order as soon as their slice is done. Chunking can
+therefore start before the last page is extracted, and the text is never concatenated
+page by page. Pages without a text layer (e.g. scanned images) are reported instead of
+silently contributing empty strings.
+"""
+
+# Standard library imports
+import os
+import tempfile
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Iterator, List, Tuple, Union
+
+# Third-party imports
+import docx
+import PyPDF2
+from docx.opc.exceptions import PackageNotFoundError
+from PyPDF2.errors import PdfReadError
+
+# Local imports
+from src.configs import app_config
+from src.utils import log
+from src.utils.concurrency import run_once
+
+
+class UnusableFileError(ValueError):
+    """
+    The file itself can't be ingested (unsupported type, corrupt, no text): retrying won't help
+    """
+
+
+class ExtractedDocument:
+    """
+    Text of a document, extracted lazily while it is iterated: one string per page for PDF,
+    a single block for DOCX/TXT/MD. Once iteration is over, `page_count` holds the number of
+    pages seen and `empty_pages` the 1-based numbers of pages without extractable text.
+    Iterate it once (e.g. pass it to `iter_chunks`).
+    """
+
+    def __init__(self, pages: Iterator[Tuple[int, str]]):
+        self._pages = pages
+        self.page_count = 0
+        self.empty_pages: List[int] = []
+
+    def __iter__(self) -> Iterator[str]:
+        for number, text in self._pages:
+            self.page_count += 1
+            if text and text.strip():
+                yield text
+            else:
+                self.empty_pages.append(number)
+
+
+def _iter_page_texts(path: str, start: int, stop: int) -> Iterator[str]:
+    reader = PyPDF2.PdfReader(path)
+    for index in range(start, stop):
+        try:
+            yield reader.pages[index].extract_text() or ""
+        except Exception:
+            # A malformed page is reported like a page without text, the rest of the file is still usable
+            yield ""
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """
+    Extract the text of pages [start, stop) of a PDF (runs in a pool worker)
+    """
+    return list(_iter_page_texts(path, start, stop))
+
+
+@run_once
+def _get_process_pool() -> ProcessPoolExecutor:
+    # spawn rather than fork: the Streamlit server process runs many threads
+    return ProcessPoolExecutor(
+        max_workers=app_config.EXTRACTION_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def _iter_pdf_pages(path: str) -> Iterator[Tuple[int, str]]:
+    try:
+        page_count = len(PyPDF2.PdfReader(path).pages)
+    except PdfReadError as e:
+        raise UnusableFileError(f"Unreadable PDF: {str(e)}") from e
+    workers = app_config.EXTRACTION_WORKERS
+    if workers <= 1 or page_count < app_config.EXTRACTION_MIN_PARALLEL_PAGES:
+        for index, text in enumerate(_iter_page_texts(path, 0, page_count)):
+            yield index + 1, text
+        return
+
+    # Enough slices to keep every worker busy, small enough that the first pages come back early
+    slice_size = max(1, min(app_config.EXTRACTION_PAGES_PER_TASK, -(-page_count // workers)))
+    pool = _get_process_pool()
+    futures = [
+        pool.submit(_extract_page_range, path, start, min(start + slice_size, page_count))
+        for start in range(0, page_count, slice_size)
+    ]
+    try:
+        page_number = 0
+        for future in futures:
+            for text in future.result():
+                page_number += 1
+                yield page_number, text
+    finally:
+        # The consumer may stop early (e.g. on an error further down the pipeline)
+        for future in futures:
+            future.cancel()
+
+
+def _pdf_pages(file: Union[str, BinaryIO]) -> Iterator[Tuple[int, str]]:
+    """
+    Pages of a PDF given as a path or a file object (copied to a temporary file the
+    workers can open)
+    """
+    if isinstance(file, (str, os.PathLike)):
+        yield from _iter_pdf_pages(file)
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(file.read())
+    try:
+        yield from _iter_pdf_pages(tmp.name)
+    finally:
+        os.remove(tmp.name)
+
+
+def _docx_pages(file: Union[str, BinaryIO]) -> Iterator[Tuple[int, str]]:
+    try:
+        document = docx.Document(file)
+    except (PackageNotFoundError, zipfile.BadZipFile, KeyError) as e:
+        raise UnusableFileError(f"Unreadable DOCX: {str(e)}") from e
+    # Blank lines between paragraphs keep the paragraph/heading structure for the chunker
+    yield 1, "\n\n".join(paragraph.text for paragraph in document.paragraphs)
+
+
+def _txt_pages(file: Union[str, BinaryIO]) -> Iterator[Tuple[int, str]]:
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            content = f.read()
+    else:
+        content = file.read()
+    try:
+        yield 1, content.decode("utf-8")
+    except UnicodeDecodeError:
+        yield 1, content.decode("latin-1", errors="ignore")
+
+
+EXTRACTORS = {
+    ".pdf": _pdf_pages,
+    ".docx": _docx_pages,
+    ".txt": _txt_pages,
+    ".md": _txt_pages,
+}
+
+
+def extract_document(file: Union[str, BinaryIO], file_type: str) -> ExtractedDocument:
+    """
+    Start extracting a document given as a path or a file object. `file_type` is the
+    extension including the dot (".pdf", ".docx", ".txt", ".md").
+    """
+    extractor = EXTRACTORS.get(file_type.lower())
+    if extractor is None:
+        raise UnusableFileError(f"Unsupported file type: {file_type}")
+    return ExtractedDocument(extractor(file))
+
+
+def extract_text(file: Union[str, BinaryIO], file_type: str) -> Tuple[str, List[int]]:
+    """
+    Extract a whole document at once: (text with pages separated by blank lines, empty page numbers)
+    """
+    extracted = extract_document(file, file_type)
+    text = "\n\n".join(extracted)
+    if extracted.empty_pages:
+        log.warn(f"{len(extracted.empty_pages)}/{extracted.page_count} pages have no text layer: {extracted.empty_pages}")
+    return text, extracted.empty_pages
+
+
+__all__ = ["UnusableFileError", "ExtractedDocument", "extract_document", "extract_text"]
@@ -0,0 +1,236 @@
+"""
+Persistent ingestion job queue.
+
+Jobs live in a SQLite database (WAL mode, safe to share between the Streamlit server and a
+standalone worker process) and move through the states
+
+    queued -> extracting -> chunking -> embedding <-> upserting -> completed | failed
+
+The chunk texts are checkpointed once chunking is done and progress is recorded after every
+embedded/upserted batch, so a worker that dies mid-job leaves enough behind for the next one
+to pick the job up where it stopped.
+"""
+
+# Standard library imports
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+# Local imports
+from src.configs import app_config
+from src.utils.concurrency import run_once
+
+QUEUED = "queued"
+EXTRACTING = "extracting"
+CHUNKING = "chunking"
+EMBEDDING = "embedding"
+UPSERTING = "upserting"
+COMPLETED = "completed"
+FAILED = "failed"
+ACTIVE_STATES = (QUEUED, EXTRACTING, CHUNKING, EMBEDDING, UPSERTING)
+
+
+class JobQueue:
+    """
+    SQLite-backed queue of ingestion jobs.
+
+    A worker claims a job by taking a lease on it (`claim`); every checkpoint renews the
+    lease. A job whose lease ran out, because its worker crashed or was restarted, is
+    claimed again and resumed from its last checkpoint.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        # Set whenever a job is enqueued, so an in-process worker wakes up without waiting for its next poll
+        self.wakeup = threading.Event()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                document_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                file_type TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                file_size INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                chunked INTEGER NOT NULL DEFAULT 0,
+                chunk_count INTEGER NOT NULL DEFAULT 0,
+                chunks_done INTEGER NOT NULL DEFAULT 0,
+                chunks_total INTEGER NOT NULL DEFAULT 0,
+                empty_pages TEXT NOT NULL DEFAULT '[]',
+                stats TEXT NOT NULL DEFAULT '{}',
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_until REAL NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_document ON jobs (document_id, state)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_chunks (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (job_id, idx)
+            )
+            """
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads, keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["empty_pages"] = json.loads(job["empty_pages"])
+        job["stats"] = json.loads(job["stats"])
+        job["chunked"] = bool(job["chunked"])
+        return job
+
+    def enqueue(self, document_id: str, name: str, topic: str, file_type: str, file_path: str, file_size: int) -> str:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO jobs (job_id, document_id, name, topic, file_type, file_path, file_size, state, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, document_id, name, topic, file_type, file_path, file_size, QUEUED, now, now),
+        )
+        self.wakeup.set()
+        return job_id
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Lease the oldest job that is queued or whose previous worker's lease expired.
+        Jobs of a document another worker holds a lease on are skipped: a re-upload of a
+        document still being processed waits, so two versions are never written at once.
+        """
+        conn = self._connection()
+        now = time.time()
+        states = ','.join('?' * len(ACTIVE_STATES))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE state IN ({states}) AND lease_until < ? "
+                f"AND NOT EXISTS (SELECT 1 FROM jobs AS other WHERE other.document_id = jobs.document_id "
+                f"AND other.job_id != jobs.job_id AND other.state IN ({states}) AND other.lease_until >= ?) "
+                f"ORDER BY created_at LIMIT 1",
+                (*ACTIVE_STATES, now, *ACTIVE_STATES, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET attempts = attempts + 1, lease_until = ?, updated_at = ? WHERE job_id = ?",
+                    (now + app_config.INGESTION_LEASE_SECONDS, now, row["job_id"]),
+                )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return self.get(row["job_id"])
+
+    def checkpoint(self, job_id: str, **fields) -> None:
+        """
+        Record progress (state, chunks_done, ...) and renew the job's lease (unless `lease_until` is given)
+        """
+        now = time.time()
+        for key in ("empty_pages", "stats"):
+            if key in fields:
+                fields[key] = json.dumps(fields[key])
+        fields["updated_at"] = now
+        fields.setdefault("lease_until", now + app_config.INGESTION_LEASE_SECONDS)
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        self._connection().execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def save_chunks(self, job_id: str, chunks: List[str], empty_pages: List[int]) -> None:
+        """
+        Checkpoint the result of extraction + chunking; the job moves on to embedding
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+            conn.executemany(
+                "INSERT INTO job_chunks (job_id, idx, text) VALUES (?, ?, ?)",
+                [(job_id, idx, text) for idx, text in enumerate(chunks)],
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        self.checkpoint(job_id, state=EMBEDDING, chunked=1, chunk_count=len(chunks), empty_pages=empty_pages)
+
+    def get_chunks(self, job_id: str) -> List[str]:
+        rows = self._connection().execute("SELECT text FROM job_chunks WHERE job_id = ? ORDER BY idx", (job_id,))
+        return [row["text"] for row in rows]
+
+    def finish(self, job_id: str, state: str, error: Optional[str] = None, stats: Optional[Dict[str, int]] = None) -> None:
+        """
+        Mark a job completed or failed and drop its checkpointed chunks
+        """
+        self.checkpoint(job_id, state=state, error=error, stats=stats or {}, lease_until=0)
+        self._connection().execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._to_dict(self._connection().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone())
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Most recent jobs first
+        """
+        rows = self._connection().execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [self._to_dict(row) for row in rows]
+
+    def has_active_jobs(self) -> bool:
+        row = self._connection().execute(
+            f"SELECT 1 FROM jobs WHERE state IN ({','.join('?' * len(ACTIVE_STATES))}) LIMIT 1",
+            ACTIVE_STATES,
+        ).fetchone()
+        return row is not None
+
+
+@run_once
+def get_job_queue() -> JobQueue:
+    """
+    Process-wide ingestion job queue, opened on first use
+    """
+    return JobQueue(app_config.INGESTION_QUEUE_PATH)
+
+
+__all__ = [
+    "JobQueue",
+    "get_job_queue",
+    "QUEUED",
+    "EXTRACTING",
+    "CHUNKING",
+    "EMBEDDING",
+    "UPSERTING",
+    "COMPLETED",
+    "FAILED",
+    "ACTIVE_STATES",
+]
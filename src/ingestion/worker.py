@@ -0,0 +1,245 @@
+"""
+Background ingestion worker.
+
+Uploaded files are stored on disk and queued (`submit_document`); worker threads claim
+jobs from the queue and run extract -> chunk -> embed -> upsert, checkpointing after every
+batch and mirroring the job state into the document's `status` in MongoDB. Up to
+INGESTION_WORKERS jobs run at once, their embedding requests sharing the quota fairly
+(src/utils/rate_limit.py). The workers run as daemon threads of the Streamlit server
+(`start_worker`) or in their own process:
+
+    python -m src.ingestion.worker
+"""
+
+# Standard library imports
+import os
+import time
+import uuid
+import threading
+from typing import Any, Dict, List
+
+# Local imports
+from src.configs import app_config
+from src.database.mongo_client import document_collection
+from src.database.pinecone_client import replace_document_chunks
+from src.models import ComponentType, Document, ErrorType
+from src.utils import log
+from src.utils.concurrency import run_once
+from src.utils.rate_limit import flow
+from src.utils.tracing import INGESTION_JOB, Trace, activate, current_trace, finish, log_error, set_metric
+from src.ingestion.chunking import iter_chunks
+from src.ingestion.extraction import UnusableFileError, extract_document
+from src.ingestion.jobs import (
+    get_job_queue,
+    QUEUED,
+    EXTRACTING,
+    CHUNKING,
+    COMPLETED,
+    FAILED,
+)
+
+
+def submit_document(data: bytes, filename: str, topic: str) -> str:
+    """
+    Store an uploaded file and queue it for ingestion, returning the job ID.
+    A file with the same name in the same topic is processed as a new version of that
+    document (only changed chunks are re-embedded).
+    """
+    file_type = os.path.splitext(filename)[1].lower()
+    if file_type not in app_config.ALLOWED_FILE_TYPES:
+        raise UnusableFileError(f"Unsupported file type: {file_type}")
+
+    existing = document_collection.find_document(filename, topic)
+    if existing:
+        document_id = existing["document_id"]
+        document_collection.update_document(document_id, status=QUEUED)
+    else:
+        document_id = str(uuid.uuid4())
+        document_collection.create_document(
+            document_id=document_id,
+            name=filename,
+            topic=topic,
+            file_type=file_type,
+            file_size=len(data),
+            chunk_count=0,
+            status=QUEUED,
+        )
+
+    os.makedirs(app_config.INGESTION_UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.join(app_config.INGESTION_UPLOAD_DIR, f"{uuid.uuid4()}{file_type}")
+    with open(file_path, "wb") as f:
+        f.write(data)
+
+    job_id = get_job_queue().enqueue(document_id, filename, topic, file_type, file_path, len(data))
+    log.info(f"Queued {filename} for ingestion (job {job_id})")
+    return job_id
+
+
+def process_job(job: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Run (or resume) one ingestion job, returning the embedded / skipped / deleted counts.
+    Stage times (extract_chunk, embedding, upserting) go to the active trace, if any.
+    """
+    queue = get_job_queue()
+    trace = current_trace()
+    job_id, document_id = job["job_id"], job["document_id"]
+    document = Document(
+        document_id=document_id,
+        name=job["name"],
+        topic=job["topic"],
+        file_type=job["file_type"],
+        file_size=job["file_size"],
+        chunk_count=job["chunk_count"],
+    )
+    current_state = {"state": None}
+
+    def _set_state(state: str, **fields) -> None:
+        if trace is not None and state != current_state["state"]:
+            # Extraction and chunking overlap, they are timed as one stage
+            trace.enter_stage("extract_chunk" if state in (EXTRACTING, CHUNKING) else state)
+        queue.checkpoint(job_id, state=state, **fields)
+        # Only state changes are mirrored to MongoDB, not every progress update
+        if state != current_state["state"]:
+            document_collection.update_document(document_id, status=state)
+            current_state["state"] = state
+
+    if job["chunked"]:
+        chunks = queue.get_chunks(job_id)
+        log.info(f"Resuming ingestion of {job['name']} at {job['chunks_done']}/{job['chunks_total'] or len(chunks)} chunks")
+    else:
+        _set_state(EXTRACTING)
+        extracted = extract_document(job["file_path"], job["file_type"])
+        chunks = []
+        # Pages are chunked while later pages are still being extracted
+        for chunk in iter_chunks(extracted):
+            if not chunks:
+                _set_state(CHUNKING)
+            chunks.append(chunk)
+        if not chunks:
+            raise UnusableFileError("No text could be extracted from the file")
+        if extracted.empty_pages:
+            log.warn(f"{job['name']}: {len(extracted.empty_pages)} pages without a text layer: {extracted.empty_pages}")
+        queue.save_chunks(job_id, chunks, extracted.empty_pages)
+        set_metric("empty_pages", len(extracted.empty_pages))
+    document.chunk_count = len(chunks)
+    set_metric("chunks", len(chunks))
+
+    stats = replace_document_chunks(
+        chunks,
+        job["topic"],
+        document,
+        batch_size=app_config.INGESTION_BATCH_SIZE,
+        on_progress=lambda stage, done, total: _set_state(stage, chunks_done=done, chunks_total=total),
+    )
+    document_collection.update_document(
+        document_id,
+        status=COMPLETED,
+        file_size=document.file_size,
+        chunk_count=document.chunk_count,
+    )
+    queue.finish(job_id, COMPLETED, stats=stats)
+    _remove_upload(job)
+    for name, count in stats.items():
+        set_metric(f"chunks_{name}", count)
+    return stats
+
+
+def _remove_upload(job: Dict[str, Any]) -> None:
+    try:
+        os.remove(job["file_path"])
+    except OSError:
+        pass
+
+
+class IngestionWorker(threading.Thread):
+    """
+    Claims jobs from the queue one at a time until stopped
+    """
+
+    def __init__(self, name: str = "ingestion-worker"):
+        super().__init__(name=name, daemon=True)
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        get_job_queue().wakeup.set()
+
+    def run(self) -> None:
+        queue = get_job_queue()
+        log.info(f"Ingestion worker {self.name} started")
+        while not self._stop_event.is_set():
+            try:
+                job = queue.claim()
+            except Exception as e:
+                log.error(f"Error claiming ingestion job: {str(e)}")
+                job = None
+            if job is None:
+                queue.wakeup.wait(app_config.INGESTION_POLL_INTERVAL)
+                queue.wakeup.clear()
+                continue
+            self._run_job(job)
+
+    def _run_job(self, job: Dict[str, Any]) -> None:
+        queue = get_job_queue()
+        start_time = time.perf_counter()
+        trace = Trace(INGESTION_JOB, job_id=job["job_id"], document_id=job["document_id"], name=job["name"], attempt=job["attempts"])
+        token = activate(trace)
+        try:
+            # The job's embedding requests queue as their own flow, served round-robin with other jobs
+            with flow(f"job:{job['job_id']}"):
+                stats = process_job(job)
+            log.success(
+                f"Ingested {job['name']} in {time.perf_counter() - start_time:.1f}s: {stats['embedded']} embedded, "
+                f"{stats['skipped']} skipped, {stats['deleted']} deleted"
+            )
+        except Exception as e:
+            unusable = isinstance(e, UnusableFileError)
+            permanent = unusable or job["attempts"] >= app_config.INGESTION_MAX_ATTEMPTS
+            log.error(f"Ingestion of {job['name']} failed (attempt {job['attempts']}): {str(e)}")
+            log_error(
+                f"Ingestion of {job['name']} failed: {str(e)}",
+                ComponentType.DOCUMENT_PROCESSOR,
+                ErrorType.FILE_PROCESSING if unusable else ErrorType.UNKNOWN_ERROR,
+                topic=job["topic"],
+                job_id=job["job_id"],
+                attempt=job["attempts"],
+                permanent=permanent,
+            )
+            try:
+                if permanent:
+                    queue.finish(job["job_id"], FAILED, error=str(e))
+                    document_collection.update_document(job["document_id"], status=FAILED)
+                    _remove_upload(job)
+                else:
+                    # Keep the checkpoint and state, retry once the backoff has passed
+                    backoff = app_config.INGESTION_POLL_INTERVAL * (2 ** job["attempts"])
+                    queue.checkpoint(job["job_id"], error=str(e), lease_until=time.time() + backoff)
+            except Exception as record_error:
+                log.error(f"Error recording ingestion failure: {str(record_error)}")
+        finally:
+            finish(trace, token)
+
+
+@run_once
+def start_worker() -> List[IngestionWorker]:
+    """
+    Start the in-process worker threads on first call (also resumes jobs left unfinished
+    by a previous server process)
+    """
+    workers = [IngestionWorker(f"ingestion-worker-{number}") for number in range(max(1, app_config.INGESTION_WORKERS))]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+__all__ = ["submit_document", "process_job", "IngestionWorker", "start_worker"]
+
+
+if __name__ == "__main__":
+    # python -m src.ingestion.worker : run the workers in the foreground
+    workers = start_worker()
+    try:
+        while any(worker.is_alive() for worker in workers):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        log.info("Ingestion workers stopped")
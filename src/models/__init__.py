@@ -6,11 +6,15 @@ This package contains all data models used in the application:
 - error_log.py: Error tracking models  
 - chat_session.py: Chat session models
 - vector.py: Vector database models
+- trace.py: Request tracing models
+- answer_cache.py: Cached answer models
 """
 
 from .document import Document
 from .error_log import ErrorLog, ErrorLevel, ComponentType, ErrorType
 from .chat_session import ChatSession, Message
+from .trace import TraceRecord
+from .answer_cache import CachedAnswer
 
 __all__ = [
     "Document",
@@ -19,5 +23,7 @@ __all__ = [
     "Message",
     "ErrorLevel",
     "ComponentType",
-    "ErrorType"
+    "ErrorType",
+    "TraceRecord",
+    "CachedAnswer",
 ] 
\ No newline at end of file
@@ -0,0 +1,20 @@
+# Standard library imports
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+# Third-party imports
+from pydantic import BaseModel, Field
+
+
+class CachedAnswer(BaseModel):
+    entry_id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="Cache entry identifier")
+    question: str = Field(..., description="First-turn question the answer was generated for")
+    answer: str = Field(..., description="Generated answer")
+    namespaces: List[str] = Field(..., description="Namespaces the answer's context was retrieved from")
+    scope: str = Field(..., description="Sorted namespaces joined by commas")
+    corpus_version: int = Field(..., ge=0, description="Sum of the namespaces' corpus versions at retrieval time")
+    embedding: List[float] = Field(..., description="Question embedding")
+    hits: int = Field(0, ge=0, description="Times the answer was served from the cache")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    last_hit_at: Optional[datetime] = Field(None, description="When the answer was last served from the cache")
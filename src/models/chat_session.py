@@ -10,6 +10,7 @@ from pydantic import BaseModel, Field
 class Message(BaseModel):
     role: str = Field(..., description="User or System")
     content: str = Field(..., description="Content")
+    turn: Optional[int] = Field(None, description="Conversation turn the message belongs to")
     
     class Config:
         json_encoders = {
@@ -22,7 +23,11 @@ class ChatSession(BaseModel):
     session_id: str = Field(..., description="Session identifier")
     topic: str = Field(..., description="Session topic")
     start_time: datetime = Field(default_factory=datetime.utcnow)
-    messages: List[Message] = Field(default_factory=list, description="Messages history")
+    last_active: datetime = Field(default_factory=datetime.utcnow)
+    turn_count: int = Field(default=0, ge=0, description="Number of turns appended so far")
+    messages: List[Message] = Field(default_factory=list, description="Messages history (most recent window when loaded)")
+    summary: str = Field(default="", description="Running summary of the turns before summarized_turns")
+    summarized_turns: int = Field(default=0, ge=0, description="Number of leading turns folded into the summary")
     
     class Config:
         populate_by_name = True
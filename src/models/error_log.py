@@ -1,4 +1,5 @@
 # Standard library imports
+import uuid
 from datetime import datetime
 from enum import Enum
 from typing import Optional, Dict, Any
@@ -44,6 +45,7 @@ class ErrorType(str, Enum):
 class ErrorLog(BaseModel):
 
     id: Optional[str] = Field(None, alias="_id")
+    error_id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="Error identifier")
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     level: ErrorLevel = Field(..., description="Error severity level")
     component: ComponentType = Field(..., description="System component")
@@ -0,0 +1,17 @@
+# Standard library imports
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+# Third-party imports
+from pydantic import BaseModel, Field
+
+
+class TraceRecord(BaseModel):
+    trace_id: str = Field(..., description="Trace identifier")
+    kind: str = Field(..., description="Traced operation (chat_turn, ingestion_job)")
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    duration_ms: float = Field(..., ge=0, description="Wall time of the whole operation")
+    stages: Dict[str, float] = Field(default_factory=dict, description="Stage durations in milliseconds")
+    metrics: Dict[str, Any] = Field(default_factory=dict, description="Hit counts, scores, token usage, cache hits")
+    attributes: Dict[str, Any] = Field(default_factory=dict, description="Session / job identifiers, namespace")
+    error: Optional[str] = Field(None, description="Error message if the operation failed")
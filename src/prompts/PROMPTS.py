@@ -4,6 +4,7 @@ import os
 SYSTEM_PROMPT_FILE = os.path.join(os.path.dirname(__file__), "SYSTEM_PROMPT.txt")
 THONG_TIN_TRUONG_FILE = os.path.join(os.path.dirname(__file__), "THONG_TIN_TRUONG.txt")
 PHAN_HOI_KHI_LOI_FILE = os.path.join(os.path.dirname(__file__), "PHAN_HOI_KHI_LOI.txt")
+TOM_TAT_HOI_THOAI_FILE = os.path.join(os.path.dirname(__file__), "TOM_TAT_HOI_THOAI.txt")
 
 def _load_prompt(file_path: str) -> str:
     with open(file_path, "r", encoding="utf-8") as file:
@@ -12,8 +13,9 @@ def _load_prompt(file_path: str) -> str:
 SYSTEM_PROMPT = _load_prompt(SYSTEM_PROMPT_FILE)
 THONG_TIN_TRUONG = _load_prompt(THONG_TIN_TRUONG_FILE)
 PHAN_HOI_KHI_LOI = _load_prompt(PHAN_HOI_KHI_LOI_FILE)
+TOM_TAT_HOI_THOAI = _load_prompt(TOM_TAT_HOI_THOAI_FILE)
 
-__all__ = ["SYSTEM_PROMPT", "THONG_TIN_TRUONG", "PHAN_HOI_KHI_LOI"]
+__all__ = ["SYSTEM_PROMPT", "THONG_TIN_TRUONG", "PHAN_HOI_KHI_LOI", "TOM_TAT_HOI_THOAI"]
 
 
 
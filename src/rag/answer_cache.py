@@ -0,0 +1,203 @@
+"""
+Semantic answer cache for first-turn questions.
+
+A first turn has no chat history, so its answer depends only on the question and the
+retrieved chunks. Answers are stored with the question embedding, the searched namespaces
+(the scope) and the corpus version of those namespaces; a new first-turn question is
+answered from the cache when its embedding is at least RAG_ANSWER_CACHE_SIMILARITY (cosine)
+close to a cached question of the same scope and version. Ingestion and deletion bump the
+corpus version of a namespace (see bump_corpus_version), so answers over changed chunks
+stop matching at once.
+
+Entries live in MongoDB (shared by every process, TTL-expired) and are matched in memory:
+a scope's entries are loaded once into a normalized matrix and matched with one product.
+"""
+
+# Standard library imports
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+from src.configs import rag_config
+from src.database import answer_cache_collection, corpus_version_collection, embed_text
+from src.models import CachedAnswer
+from src.utils import log
+from src.utils.concurrency import get_background_executor, get_executor, run_once
+from src.utils.timing import StageTimer
+from src.utils.tracing import set_metric
+
+
+def scope_of(namespaces: List[str]) -> str:
+    return ",".join(sorted(set(namespaces)))
+
+
+@dataclass
+class CacheLookup:
+    """Outcome of a lookup; the embedding is reused by retrieval on a miss"""
+    namespaces: List[str]
+    scope: str
+    corpus_version: int
+    embedding: List[float]
+    answer: Optional[str] = None
+    entry_id: Optional[str] = None
+    similarity: float = 0.0
+
+    @property
+    def hit(self) -> bool:
+        return self.answer is not None
+
+
+@dataclass
+class _ScopeEntries:
+    corpus_version: int
+    loaded_at: float
+    entry_ids: List[str] = field(default_factory=list)
+    answers: List[str] = field(default_factory=list)
+    matrix: Optional[np.ndarray] = None
+
+    def add(self, entry_id: str, answer: str, vector: np.ndarray) -> None:
+        self.entry_ids.append(entry_id)
+        self.answers.append(answer)
+        row = vector.reshape(1, -1)
+        self.matrix = row if self.matrix is None else np.vstack([self.matrix, row])
+
+
+def _normalize(vector: Any) -> Optional[np.ndarray]:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm > 0 else None
+
+
+class AnswerCache:
+    def __init__(self, similarity: float, max_entries: int, refresh_seconds: float):
+        self.similarity = similarity
+        self.max_entries = max_entries
+        self.refresh_seconds = refresh_seconds
+        self._scopes: Dict[str, _ScopeEntries] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+
+    def _entries(self, scope: str, corpus_version: int) -> _ScopeEntries:
+        """In-memory entries of a scope at a version, (re)loaded when stale"""
+        now = time.monotonic()
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is not None and entries.corpus_version == corpus_version and now - entries.loaded_at < self.refresh_seconds:
+                return entries
+        loaded = _ScopeEntries(corpus_version=corpus_version, loaded_at=now)
+        vectors = []
+        for entry in answer_cache_collection.get_entries(scope, corpus_version, self.max_entries):
+            vector = _normalize(entry["embedding"])
+            if vector is not None:
+                loaded.entry_ids.append(entry["entry_id"])
+                loaded.answers.append(entry["answer"])
+                vectors.append(vector)
+        if vectors:
+            loaded.matrix = np.vstack(vectors)
+        with self._lock:
+            self._scopes[scope] = loaded
+        return loaded
+
+    def prepare(self, query: str, namespaces: List[str], timer: Optional[StageTimer] = None) -> CacheLookup:
+        """
+        Embed the question and read the corpus version of its namespaces (concurrently)
+        """
+        timer = timer or StageTimer()
+        versions: Future = get_executor().submit(corpus_version_collection.get_versions, namespaces)
+        with timer.stage("embed"):
+            embedding = embed_text(query)
+        # Versions only grow, so their sum changes whenever one of the namespaces does
+        return CacheLookup(namespaces, scope_of(namespaces), sum(versions.result().values()), embedding)
+
+    def match(self, lookup: CacheLookup, timer: Optional[StageTimer] = None) -> CacheLookup:
+        """
+        Fill in the closest cached answer of the lookup's scope and version, if close enough
+        """
+        timer = timer or StageTimer()
+        with timer.stage("answer_cache"):
+            entries = self._entries(lookup.scope, lookup.corpus_version)
+            vector = _normalize(lookup.embedding)
+            if entries.matrix is not None and vector is not None:
+                similarities = entries.matrix @ vector
+                best = int(np.argmax(similarities))
+                lookup.similarity = float(similarities[best])
+                if lookup.similarity >= self.similarity:
+                    lookup.answer = entries.answers[best]
+                    lookup.entry_id = entries.entry_ids[best]
+        with self._lock:
+            if lookup.hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        set_metric("answer_cache_hit", int(lookup.hit))
+        set_metric("answer_cache_similarity", round(lookup.similarity, 4))
+        return lookup
+
+    def record_hit(self, lookup: CacheLookup) -> None:
+        """Count the hit on the entry (off the request path)"""
+        def _record() -> None:
+            try:
+                answer_cache_collection.record_hit(lookup.entry_id)
+            except Exception as e:
+                log.warn(f"Could not record answer cache hit: {str(e)}")
+        get_background_executor().submit(_record)
+
+    def store(self, lookup: CacheLookup, question: str, answer: str) -> None:
+        """Cache the answer generated after a miss (off the request path)"""
+        entry = CachedAnswer(
+            question=question,
+            answer=answer,
+            namespaces=sorted(set(lookup.namespaces)),
+            scope=lookup.scope,
+            corpus_version=lookup.corpus_version,
+            embedding=list(lookup.embedding),
+        )
+        vector = _normalize(lookup.embedding)
+        with self._lock:
+            entries = self._scopes.get(lookup.scope)
+            if vector is not None and entries is not None and entries.corpus_version == lookup.corpus_version and len(entries.answers) < self.max_entries:
+                entries.add(entry.entry_id, answer, vector)
+            self.stored += 1
+
+        def _insert() -> None:
+            try:
+                answer_cache_collection.insert_entry(entry)
+            except Exception as e:
+                log.warn(f"Could not store cached answer: {str(e)}")
+        get_background_executor().submit(_insert)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stored": self.stored,
+                "scopes": len(self._scopes),
+            }
+
+
+@run_once
+def get_answer_cache() -> Optional[AnswerCache]:
+    """
+    Process-wide answer cache (None when disabled)
+    """
+    if not rag_config.ANSWER_CACHE_ENABLED:
+        return None
+    return AnswerCache(
+        similarity=rag_config.ANSWER_CACHE_SIMILARITY,
+        max_entries=rag_config.ANSWER_CACHE_MAX_ENTRIES,
+        refresh_seconds=rag_config.ANSWER_CACHE_REFRESH_SECONDS,
+    )
+
+
+__all__ = ["CacheLookup", "AnswerCache", "get_answer_cache", "scope_of"]
@@ -0,0 +1,354 @@
+"""
+In-memory BM25 index over chunk texts, for hybrid (lexical + vector) retrieval.
+
+Dense embeddings rank exact tokens such as class names (9A1), room numbers, dates and
+people's names poorly; BM25 matches them literally. Text is tokenized into Vietnamese
+syllables with diacritics kept, and every syllable is also indexed in its folded form
+(diacritics removed, đ -> d), so queries typed without diacritics still match while exact
+matches score higher. Lexical and vector rankings are merged with reciprocal-rank fusion.
+
+One index is kept per namespace. It is built from the stored chunks on first use and
+updated incrementally as chunks are upserted or deleted in this process. Writes made by
+another process (e.g. a standalone ingestion worker) bump the namespace's corpus version,
+which is checked every BM25_REFRESH_SECONDS in the background; the index is rebuilt when it
+changed, and at the latest after BM25_MAX_AGE_SECONDS.
+"""
+
+# Standard library imports
+import re
+import math
+import functools
+import time
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+from src.configs import rag_config
+from src.utils import log
+from src.utils.concurrency import get_background_executor
+
+# Dates and decimal numbers (12/9/2024, 12-9, 7.5) are kept as one token, everything else
+# splits into word characters (Vietnamese syllables, numbers, codes like 9a1)
+TOKEN_PATTERN = re.compile(r"\d+(?:[./-]\d+)+|\w+")
+DATE_SEPARATORS = re.compile(r"[.-]")
+
+
+@functools.lru_cache(maxsize=65536)
+def fold(token: str) -> str:
+    """
+    Remove Vietnamese diacritics (tiếng việt -> tieng viet, đ -> d)
+    """
+    decomposed = unicodedata.normalize("NFD", token.replace("đ", "d"))
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased tokens with diacritics kept, each followed by its folded form when it differs
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(unicodedata.normalize("NFC", text.lower())):
+        if token[0].isdigit() and not token.isdigit():
+            token = DATE_SEPARATORS.sub("/", token)
+        tokens.append(token)
+        folded = fold(token)
+        if folded != token:
+            tokens.append(folded)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index (term -> {chunk slot: term frequency}).
+    Chunks can be added, replaced and removed at any time; scoring uses the current
+    corpus statistics, so no rebuild is needed after an update. Each term's postings are
+    materialized as NumPy arrays on first use after a change, so scoring a query is a
+    handful of vectorized operations rather than a Python loop over every posting.
+    """
+
+    K1 = 1.5
+    B = 0.75
+    # Terms found in more than this share of chunks ("của", "và", ...) add almost nothing
+    # to the ranking but dominate the cost of scoring; they are always skipped, so a query sharing
+    # only such words with the corpus has no lexical matches
+    MAX_DF_RATIO = 0.5
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._slots: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._terms: Dict[str, List[str]] = {}
+        self._total_length = 0
+        self.metadata: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _allocate(self, chunk_id: str) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._ids[slot] = chunk_id
+        else:
+            slot = len(self._ids)
+            self._ids.append(chunk_id)
+            if slot >= len(self._lengths):
+                self._lengths = np.concatenate([self._lengths, np.zeros(max(1024, len(self._lengths)), dtype=np.float32)])
+        self._slots[chunk_id] = slot
+        return slot
+
+    def add(self, chunk_id: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        counts = Counter(tokenize(text))
+        with self._lock:
+            self.remove(chunk_id)
+            slot = self._allocate(chunk_id)
+            for term, frequency in counts.items():
+                self._postings.setdefault(term, {})[slot] = frequency
+                self._arrays.pop(term, None)
+            length = sum(counts.values())
+            self._lengths[slot] = length
+            self._terms[chunk_id] = list(counts)
+            self._total_length += length
+            self.metadata[chunk_id] = metadata or {}
+
+    def remove(self, chunk_id: str) -> None:
+        with self._lock:
+            slot = self._slots.pop(chunk_id, None)
+            if slot is None:
+                return
+            for term in self._terms.pop(chunk_id):
+                postings = self._postings[term]
+                del postings[slot]
+                self._arrays.pop(term, None)
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= int(self._lengths[slot])
+            self._lengths[slot] = 0
+            self._ids[slot] = None
+            self._free.append(slot)
+            self.metadata.pop(chunk_id, None)
+
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            arrays = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float32, count=len(postings)),
+            )
+            self._arrays[term] = arrays
+        return arrays
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Return up to top_k (chunk ID, score) pairs, best first
+        """
+        with self._lock:
+            corpus_size = len(self._slots)
+            if not corpus_size:
+                return []
+            terms = [
+                term for term in set(tokenize(query))
+                if term in self._postings and len(self._postings[term]) <= self.MAX_DF_RATIO * corpus_size
+            ]
+            if not terms:
+                return []
+
+            lengths = self._lengths[:len(self._ids)]
+            norms = self.K1 * (1 - self.B + self.B * lengths / (self._total_length / corpus_size))
+            scores = np.zeros(len(lengths), dtype=np.float32)
+            for term in terms:
+                slots, frequencies = self._term_arrays(term)
+                document_frequency = len(slots)
+                idf = math.log(1 + (corpus_size - document_frequency + 0.5) / (document_frequency + 0.5))
+                # A slot appears once per term, so fancy-index accumulation is safe
+                scores[slots] += idf * frequencies * (self.K1 + 1) / (frequencies + norms[slots])
+
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [(self._ids[slot], float(scores[slot])) for slot in candidates]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: Optional[int] = None) -> List[Tuple[str, float]]:
+    """
+    Merge ranked ID lists: each list contributes 1 / (k + rank) to an ID's score
+    """
+    k = rag_config.RRF_K if k is None else k
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+# --- Per-namespace indexes ---
+
+ChunkLoader = Callable[[str], Iterable[Tuple[str, str, Dict[str, Any]]]]
+# Current corpus version of a namespace, bumped by every process that changes its chunks
+VersionReader = Callable[[str], int]
+
+_indexes: Dict[str, BM25Index] = {}
+_built_at: Dict[str, float] = {}
+_checked_at: Dict[str, float] = {}
+_versions: Dict[str, int] = {}
+_rebuilding: set = set()
+_registry_lock = threading.Lock()
+_build_locks: Dict[str, threading.Lock] = {}
+# Index updates made while a build of the namespace is loading, one buffer per running build
+_pending: Dict[str, List[List[Tuple[str, list]]]] = {}
+
+
+def _apply(index: BM25Index, operation: str, items: list) -> None:
+    if operation == "add":
+        for chunk_id, text, metadata in items:
+            index.add(chunk_id, text, metadata)
+    else:
+        for chunk_id in items:
+            index.remove(chunk_id)
+
+
+def _build(namespace: str, loader: ChunkLoader, version_reader: Optional[VersionReader]) -> BM25Index:
+    """
+    Build a namespace's index and swap it in. Updates made while the chunks are loading are
+    buffered and replayed before the swap, so they are not lost with the index they went to.
+    """
+    start_time = time.perf_counter()
+    buffer: List[Tuple[str, list]] = []
+    with _registry_lock:
+        _pending.setdefault(namespace, []).append(buffer)
+    try:
+        # Read before loading: a change made during the load leaves the index behind the
+        # version, so it is rebuilt again rather than taken as current
+        version = version_reader(namespace) if version_reader is not None else 0
+        index = BM25Index()
+        for chunk_id, text, metadata in loader(namespace):
+            index.add(chunk_id, text, metadata)
+        with _registry_lock:
+            for operation, items in buffer:
+                _apply(index, operation, items)
+            _indexes[namespace] = index
+            _built_at[namespace] = _checked_at[namespace] = time.monotonic()
+            _versions[namespace] = version
+    finally:
+        with _registry_lock:
+            buffers = [other for other in _pending[namespace] if other is not buffer]
+            if buffers:
+                _pending[namespace] = buffers
+            else:
+                del _pending[namespace]
+    log.success(
+        f"Built BM25 index for namespace {namespace}: {len(index)} chunks "
+        f"in {time.perf_counter() - start_time:.2f}s"
+    )
+    return index
+
+
+def _refresh(namespace: str, loader: ChunkLoader, version_reader: Optional[VersionReader]) -> None:
+    """
+    Rebuild a namespace's index if it is missing, too old or behind the corpus version
+    """
+    try:
+        with _registry_lock:
+            built = namespace in _indexes
+            expired = built and time.monotonic() - _built_at[namespace] > rag_config.BM25_MAX_AGE_SECONDS
+            version = _versions.get(namespace)
+        if built and not expired and version_reader is not None and version_reader(namespace) == version:
+            with _registry_lock:
+                _checked_at[namespace] = time.monotonic()
+            return
+        _build(namespace, loader, version_reader)
+    except Exception as e:
+        log.error(f"Error rebuilding BM25 index for namespace {namespace}: {str(e)}")
+    finally:
+        with _registry_lock:
+            _rebuilding.discard(namespace)
+
+
+def get_lexical_index(
+    namespace: str,
+    loader: ChunkLoader,
+    wait: bool = True,
+    version_reader: Optional[VersionReader] = None,
+) -> Optional[BM25Index]:
+    """
+    BM25 index of a namespace, built with `loader(namespace)` -> (chunk ID, text, metadata)
+    on first use. In the background, the index is rebuilt once `version_reader(namespace)`
+    moves past the version it was built at (checked every BM25_REFRESH_SECONDS) or once it
+    is older than BM25_MAX_AGE_SECONDS, while the current one keeps serving queries. With
+    wait=False the first build also runs in the background and None is returned until it is ready.
+    """
+    with _registry_lock:
+        index = _indexes.get(namespace)
+        now = time.monotonic()
+        due = index is not None and (
+            now - _built_at[namespace] > rag_config.BM25_MAX_AGE_SECONDS
+            or (version_reader is not None and now - _checked_at[namespace] > rag_config.BM25_REFRESH_SECONDS)
+        )
+        if (due or (index is None and not wait)) and namespace not in _rebuilding:
+            _rebuilding.add(namespace)
+            get_background_executor().submit(_refresh, namespace, loader, version_reader)
+        if index is not None or not wait:
+            return index
+        build_lock = _build_locks.setdefault(namespace, threading.Lock())
+
+    with build_lock:
+        with _registry_lock:
+            if namespace in _indexes:
+                return _indexes[namespace]
+        return _build(namespace, loader, version_reader)
+
+
+def _update(namespace: str, operation: str, items: list) -> None:
+    with _registry_lock:
+        index = _indexes.get(namespace)
+        for buffer in _pending.get(namespace, ()):
+            buffer.append((operation, items))
+    if index is not None:
+        _apply(index, operation, items)
+
+
+def index_chunks(namespace: str, chunks: Iterable[Tuple[str, str, Dict[str, Any]]]) -> None:
+    """
+    Add or replace chunks in the namespace's index (no-op until the index is first built)
+    """
+    _update(namespace, "add", list(chunks))
+
+
+def unindex_chunks(namespace: str, chunk_ids: Iterable[str]) -> None:
+    """
+    Remove chunks from the namespace's index (no-op until the index is first built)
+    """
+    _update(namespace, "remove", list(chunk_ids))
+
+
+def note_corpus_version(namespace: str, version: int) -> None:
+    """
+    Record a version bump made by this process, whose changes were applied to the index as
+    they were written: an index that was current before the bump still is. Any other bump in
+    between leaves the index behind, and it is rebuilt.
+    """
+    with _registry_lock:
+        if _versions.get(namespace) == version - 1:
+            _versions[namespace] = version
+
+
+__all__ = [
+    "BM25Index",
+    "tokenize",
+    "fold",
+    "reciprocal_rank_fusion",
+    "get_lexical_index",
+    "index_chunks",
+    "unindex_chunks",
+    "note_corpus_version",
+]
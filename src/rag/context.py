@@ -0,0 +1,158 @@
+"""
+Context assembly: turn ranked retrieval candidates into the context block sent to the LLM.
+
+Passages are picked greedily by maximal marginal relevance (relevance minus Jaccard
+similarity to the passages already picked) until SIMILARITY_TOP_K passages or the token
+budget is reached. Picked chunks of the same document with consecutive chunk_index are
+merged into one span, with the text they share through chunk overlap kept once.
+"""
+
+# Standard library imports
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+# Local imports
+from src.configs import rag_config
+from src.ingestion.chunking import count_tokens
+from src.rag.bm25 import tokenize
+
+# Shorter common edges between neighbouring chunks are coincidence, not chunk overlap
+MIN_OVERLAP_CHARS = 20
+# Candidates at least this similar to an already picked passage are duplicates
+DUPLICATE_SIMILARITY = 0.9
+PASSAGE_SEPARATOR = "\n\n"
+
+
+@dataclass
+class Passage:
+    """A retrieval candidate; `score` is its relevance (higher is better)"""
+    chunk_id: str
+    text: str
+    score: float
+    document_id: str = ""
+    chunk_index: Optional[int] = None
+    namespace: str = ""
+    # Found by the vector query (as opposed to BM25 alone)
+    vector_match: bool = False
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _strip_overlap(previous: str, following: str) -> str:
+    """
+    Drop the start of `following` that repeats the end of `previous`
+    """
+    probe = following[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return following
+    start = previous.find(probe, max(0, len(previous) - len(following)))
+    while start != -1:
+        # The earliest match is the longest overlap
+        if following.startswith(previous[start:]):
+            return following[len(previous) - start:].lstrip()
+        start = previous.find(probe, start + 1)
+    return following
+
+
+def _select(passages: List[Passage], tokens: List[int], top_k: int, token_budget: int, mmr_lambda: float) -> List[int]:
+    """
+    Greedy MMR selection under the token budget, returning positions in pick order
+    """
+    token_sets = [frozenset(tokenize(passage.text)) for passage in passages]
+    max_score = max(passage.score for passage in passages) or 1.0
+    remaining = list(range(len(passages)))
+    selected: List[int] = []
+    used_tokens = 0
+    while remaining and len(selected) < top_k:
+        best, best_value = None, float("-inf")
+        for position in list(remaining):
+            if used_tokens + tokens[position] > token_budget:
+                continue
+            redundancy = max((_jaccard(token_sets[position], token_sets[other]) for other in selected), default=0.0)
+            if redundancy >= DUPLICATE_SIMILARITY:
+                remaining.remove(position)
+                continue
+            value = mmr_lambda * passages[position].score / max_score - (1 - mmr_lambda) * redundancy
+            if value > best_value:
+                best, best_value = position, value
+        if best is None:
+            break
+        selected.append(best)
+        remaining.remove(best)
+        used_tokens += tokens[best]
+    return selected
+
+
+def _merge_spans(passages: List[Passage], selected: List[int]) -> List[str]:
+    """
+    Join picked chunks that are neighbours in the same document, spans ordered by their best passage
+    """
+    rank = {position: order for order, position in enumerate(selected)}
+    ordered = sorted(
+        selected,
+        key=lambda position: (
+            passages[position].document_id,
+            passages[position].chunk_index if passages[position].chunk_index is not None else -1,
+            rank[position],
+        ),
+    )
+    spans: List[Tuple[int, str]] = []
+    previous: Optional[Passage] = None
+    for position in ordered:
+        passage = passages[position]
+        adjacent = (
+            previous is not None
+            and passage.document_id
+            and passage.document_id == previous.document_id
+            and passage.chunk_index is not None
+            and previous.chunk_index is not None
+            and passage.chunk_index == previous.chunk_index + 1
+        )
+        if adjacent:
+            best_rank, text = spans[-1]
+            remainder = _strip_overlap(previous.text, passage.text)
+            spans[-1] = (min(best_rank, rank[position]), text + PASSAGE_SEPARATOR + remainder if remainder else text)
+        else:
+            spans.append((rank[position], passage.text))
+        previous = passage
+    return [text for _, text in sorted(spans, key=lambda span: span[0])]
+
+
+def assemble_context(
+    passages: List[Passage],
+    top_k: Optional[int] = None,
+    token_budget: Optional[int] = None,
+    mmr_lambda: Optional[float] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the context string from ranked candidates.
+    Returns the context and packing stats; `saved_tokens` compares it with joining the
+    top_k candidates verbatim, as retrieval did before.
+    """
+    top_k = top_k or rag_config.SIMILARITY_TOP_K
+    token_budget = token_budget or rag_config.CONTEXT_TOKEN_BUDGET
+    mmr_lambda = rag_config.MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+    if not passages:
+        return "", {"passages": 0, "spans": 0, "tokens": 0, "naive_tokens": 0, "saved_tokens": 0}
+
+    tokens = [count_tokens(passage.text) for passage in passages]
+    selected = _select(passages, tokens, top_k, token_budget, mmr_lambda)
+    spans = _merge_spans(passages, selected)
+    context = PASSAGE_SEPARATOR.join(spans)
+
+    naive_tokens = count_tokens(PASSAGE_SEPARATOR.join(passage.text for passage in passages[:top_k]))
+    packed_tokens = count_tokens(context) if context else 0
+    return context, {
+        "passages": len(selected),
+        "spans": len(spans),
+        "tokens": packed_tokens,
+        "naive_tokens": naive_tokens,
+        "saved_tokens": naive_tokens - packed_tokens,
+    }
+
+
+__all__ = ["Passage", "assemble_context"]
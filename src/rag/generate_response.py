@@ -1,85 +1,262 @@
-# Third-party imports
-from openai import OpenAI
+# Standard library imports
+from typing import Iterator, Optional, Tuple
 
 # Local imports
-from src.configs import openai_config, deepseek_config
+from src.configs import rag_config
 from src.database import get_context_by_query, chat_session_collection, error_log_collection
-from src.models import ChatSession, ErrorLog, Message
-from src.prompts import SYSTEM_PROMPT,  PHAN_HOI_KHI_LOI
+from src.models import ChatSession, ComponentType, ErrorType, Message
+from src.prompts import PHAN_HOI_KHI_LOI
+from src.rag.answer_cache import CacheLookup, get_answer_cache
+from src.rag.history import build_llm_messages, schedule_summary_update
+from src.rag.llm_router import get_llm_router
+from src.rag.router import resolve_namespaces
+from src.utils import log
+from src.utils.concurrency import get_executor
+from src.utils.timing import StageTimer
+from src.utils.tracing import CHAT_TURN, Trace, activate, finish, log_error, set_metric
 
-deepseek_llm = OpenAI(api_key=deepseek_config.API_KEY, base_url=deepseek_config.BASE_URL)
-openai_llm = OpenAI(api_key=openai_config.API_KEY)
 
-def generate_response(session_id: str, query: str, namespace: str) -> str:
+def _get_or_create_session(session_id: str, namespace: Optional[str]) -> ChatSession:
+    # Only the recent history window is loaded; a new session is created by its first append
+    chat_session = chat_session_collection.get_session(session_id, message_limit=rag_config.HISTORY_MESSAGES)
+    if chat_session is None:
+        chat_session = ChatSession(session_id=session_id, topic=namespace or "")
+    return chat_session
+
+
+def _load_session_timed(session_id: str, namespace: Optional[str], timer: StageTimer) -> ChatSession:
+    with timer.stage("session_read"):
+        return _get_or_create_session(session_id, namespace)
+
+
+def _prepare_lookup(query: str, namespace: Optional[str], timer: StageTimer) -> Optional[CacheLookup]:
+    answer_cache = get_answer_cache()
+    if answer_cache is None:
+        return None
+    try:
+        return answer_cache.prepare(query, resolve_namespaces(query, namespace), timer)
+    except Exception as e:
+        # Retrieval embeds the query itself
+        log.warn(f"Answer cache lookup failed: {str(e)}")
+        return None
+
+
+def _prepare_turn(
+    session_id: str, query: str, namespace: Optional[str], timer: StageTimer
+) -> Tuple[str, ChatSession, Optional[CacheLookup]]:
+    """
+    Fetch the retrieval context and the chat session for a turn.
+    The Mongo session read doesn't depend on the embed/query round trips, so in concurrent
+    mode it runs on the shared thread pool while the query is embedded on the calling thread.
+    A first turn is matched against the answer cache (src/rag/answer_cache.py) before
+    retrieval; the returned lookup is None for later turns, and on a hit the context is
+    empty and the lookup holds the answer.
+    """
+    if rag_config.CONCURRENT_RETRIEVAL:
+        session_future = get_executor().submit(_load_session_timed, session_id, namespace, timer)
+        lookup = _prepare_lookup(query, namespace, timer)
+        chat_session = session_future.result()
+    else:
+        chat_session = _load_session_timed(session_id, namespace, timer)
+        lookup = _prepare_lookup(query, namespace, timer)
+    
+    query_embedding = lookup.embedding if lookup is not None else None
+    if chat_session.messages:
+        # Later turns depend on the history: only the embedding is reused
+        lookup = None
+    elif lookup is not None:
+        try:
+            if get_answer_cache().match(lookup, timer).hit:
+                return "", chat_session, lookup
+        except Exception as e:
+            log.warn(f"Answer cache lookup failed: {str(e)}")
+            lookup = None
+    
+    context = get_context_by_query(
+        query, lookup.namespaces if lookup is not None else namespace, timer=timer, query_embedding=query_embedding
+    )
+    return context, chat_session, lookup
+
+
+def _answer_from_cache(
+    session_id: str, user_message: Message, lookup: CacheLookup, namespace: Optional[str], timer: StageTimer
+) -> str:
+    get_answer_cache().record_hit(lookup)
+    with timer.stage("session_write"):
+        chat_session_collection.append_messages(
+            session_id, [user_message, Message(role="assistant", content=lookup.answer)], topic=namespace or ""
+        )
+    log.info(f"Answered from cache (similarity {lookup.similarity:.3f}), turn timings: {timer.summary()}")
+    return lookup.answer
+
+
+def _store_answer(lookup: Optional[CacheLookup], query: str, answer: str) -> None:
+    """Cache the answer of a first turn that missed the cache"""
+    if lookup is None or not answer:
+        return
+    try:
+        get_answer_cache().store(lookup, query, answer)
+    except Exception as e:
+        log.warn(f"Could not cache answer: {str(e)}")
+
+
+def _record_usage(usage) -> None:
+    if usage is not None:
+        set_metric("prompt_tokens", usage.prompt_tokens)
+        set_metric("completion_tokens", usage.completion_tokens)
+
+
+def generate_response(session_id: str, query: str, namespace: Optional[str] = None, timer: Optional[StageTimer] = None) -> str:
     """
     Generate response using RAG and chat history
     
     Args:
         session_id: Unique session identifier
         query: User query
-        namespace: Pinecone namespace for context search
+        namespace: Pinecone namespace for context search (None: routed by topic, see src/rag/router.py)
+        timer: Collects the stage durations of the turn when given (see benchmarks/pipeline.py)
         
     Returns:
         Generated response string
     """
+    # The turn is traced (stages, retrieval, token usage), see src/utils/tracing.py
+    trace = Trace(CHAT_TURN, timer, session_id=session_id, namespace=namespace, stream=False)
+    token = activate(trace)
     try:
-        # Get relevant context from vector database
-        context = get_context_by_query(query, namespace)
-        
-        # Get or create chat session
-        chat_session = chat_session_collection.get_session(session_id)
-        if chat_session is None:
-            chat_session = chat_session_collection.create_session(session_id, namespace)
+        return _generate_response(session_id, query, namespace, trace.timer)
+    finally:
+        finish(trace, token)
+
+
+def _generate_response(session_id: str, query: str, namespace: Optional[str], timer: StageTimer) -> str:
+    try:
+        # Get relevant context from vector database and the chat session (created if missing)
+        context, chat_session, lookup = _prepare_turn(session_id, query, namespace, timer)
         
         # Add user message to chat history
         user_message = Message(role="user", content=query)
         chat_session.messages.append(user_message)
+        if lookup is not None and lookup.hit:
+            return _answer_from_cache(session_id, user_message, lookup, namespace, timer)
         if not context:
-            chat_session.messages.append(Message(role="assistant", content=PHAN_HOI_KHI_LOI))
-            chat_session_collection.update_session(chat_session)
+            with timer.stage("session_write"):
+                chat_session_collection.append_messages(
+                    session_id, [user_message, Message(role="assistant", content=PHAN_HOI_KHI_LOI)], topic=namespace or ""
+                )
+            log.info(f"Turn timings: {timer.summary()}")
             return PHAN_HOI_KHI_LOI
         
         # Prepare messages for LLM
-        llm_messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "system", "content": f"Context: {context}"},
-        ]
+        llm_messages = build_llm_messages(context, chat_session)
         
-        # Add chat history (keep last 10 messages for context)
-        for message in chat_session.messages[-10:]:
-            llm_messages.append({
-                "role": message.role, 
-                "content": message.content
-            })
-        
-        # Generate response
-        # response = deepseek_llm.chat.completions.create(
-        #     model=deepseek_config.MODEL,
-        #     messages=llm_messages,
-        #     temperature=deepseek_config.TEMPERATURE
-        # )
-        response = openai_llm.chat.completions.create(
-            model=openai_config.LLM_MODEL,
-            messages=llm_messages,
-            temperature=openai_config.TEMPERATURE
-        )
+        # Generate response (OpenAI / DeepSeek, see src/rag/llm_router.py)
+        with timer.stage("llm"):
+            response = get_llm_router().complete(llm_messages)
         
         answer = response.choices[0].message.content
+        _record_usage(response.usage)
         
-        # Add assistant response to chat history
+        # Append the turn (user + assistant messages) to the chat history
         assistant_message = Message(role="assistant", content=answer)
-        chat_session.messages.append(assistant_message)
-        
-        # Update session in database
-        chat_session_collection.update_session(chat_session)
+        with timer.stage("session_write"):
+            chat_session_collection.append_messages(session_id, [user_message, assistant_message], topic=namespace or "")
+        schedule_summary_update(chat_session)
+        _store_answer(lookup, query, answer)
         
+        log.info(f"Turn timings: {timer.summary()}")
         return answer
         
     except Exception as e:
         error_msg = f"Error generating response: {str(e)}"
         print(error_msg)
+        log_error(error_msg, ComponentType.RAG_PIPELINE, ErrorType.QUERY_PROCESSING, topic=namespace)
         # Return fallback response
         return PHAN_HOI_KHI_LOI
 
 
+def generate_response_stream(
+    session_id: str, query: str, namespace: Optional[str] = None, timer: Optional[StageTimer] = None
+) -> Iterator[str]:
+    """
+    Streaming variant of generate_response: yields the answer token by token as the LLM produces it.
+    The (possibly partial) answer is saved to the chat session once the stream ends, also when
+    the stream fails midway or the consumer stops reading early.
+    
+    Args:
+        session_id: Unique session identifier
+        query: User query
+        namespace: Pinecone namespace for context search (None: routed by topic, see src/rag/router.py)
+        timer: Collects the stage durations of the turn when given (see benchmarks/pipeline.py)
+        
+    Yields:
+        Pieces of the generated response
+    """
+    trace = Trace(CHAT_TURN, timer, session_id=session_id, namespace=namespace, stream=True)
+    token = activate(trace)
+    try:
+        yield from _generate_response_stream(session_id, query, namespace, trace.timer)
+    finally:
+        finish(trace, token)
+
 
+def _generate_response_stream(session_id: str, query: str, namespace: Optional[str], timer: StageTimer) -> Iterator[str]:
+    try:
+        context, chat_session, lookup = _prepare_turn(session_id, query, namespace, timer)
+        user_message = Message(role="user", content=query)
+        chat_session.messages.append(user_message)
+        if lookup is not None and lookup.hit:
+            yield _answer_from_cache(session_id, user_message, lookup, namespace, timer)
+            return
+        if not context:
+            chat_session_collection.append_messages(
+                session_id, [user_message, Message(role="assistant", content=PHAN_HOI_KHI_LOI)], topic=namespace or ""
+            )
+            yield PHAN_HOI_KHI_LOI
+            return
+        
+        llm_start = timer.elapsed_ms()
+        # Provider chosen (and hedged) when the first token arrives, see src/rag/llm_router.py
+        stream = get_llm_router().stream(build_llm_messages(context, chat_session))
+    except Exception as e:
+        print(f"Error generating response: {str(e)}")
+        log_error(f"Error generating response: {str(e)}", ComponentType.RAG_PIPELINE, ErrorType.QUERY_PROCESSING, topic=namespace)
+        yield PHAN_HOI_KHI_LOI
+        return
+    
+    parts = []
+    completed = False
+    try:
+        for chunk in stream:
+            _record_usage(getattr(chunk, "usage", None))
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                if not parts:
+                    timer.record("llm_first_token", timer.elapsed_ms() - llm_start)
+                parts.append(token)
+                yield token
+        completed = True
+    except Exception as e:
+        print(f"Error streaming response: {str(e)}")
+        log_error(f"Error streaming response: {str(e)}", ComponentType.LLM_CLIENT, ErrorType.QUERY_PROCESSING, topic=namespace)
+        if not parts:
+            parts.append(PHAN_HOI_KHI_LOI)
+            yield PHAN_HOI_KHI_LOI
+    finally:
+        # Runs on normal completion, on errors and when the consumer closes the generator
+        timer.record("llm", timer.elapsed_ms() - llm_start)
+        try:
+            stream.close()
+            turn_messages = [user_message]
+            if parts:
+                turn_messages.append(Message(role="assistant", content="".join(parts)))
+            with timer.stage("session_write"):
+                chat_session_collection.append_messages(session_id, turn_messages, topic=namespace or "")
+            schedule_summary_update(chat_session)
+            if completed:
+                _store_answer(lookup, query, "".join(parts))
+            log.info(f"Turn timings: {timer.summary()}")
+        except Exception as e:
+            print(f"Error saving streamed response: {str(e)}")
+            log_error(f"Error saving streamed response: {str(e)}", ComponentType.MONGODB_CLIENT, ErrorType.DATABASE_CONNECTION, topic=namespace)
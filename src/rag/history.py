@@ -0,0 +1,129 @@
+"""
+Conversation history compaction.
+
+The prompt carries the last few turns verbatim plus a running summary of everything
+before them, stored on the ChatSession (summary, summarized_turns). The summary is
+advanced off the request path: after a turn is saved, a background task folds the turns
+that fell out of the verbatim window into it once enough of them have accumulated.
+The whole prompt is capped at RAG_MAX_PROMPT_TOKENS by dropping the oldest verbatim messages.
+"""
+
+# Standard library imports
+import threading
+from typing import Dict, List
+
+# Local imports
+from src.configs import rag_config
+from src.database import chat_session_collection
+from src.ingestion.chunking import count_tokens
+from src.models import ChatSession
+from src.prompts import SYSTEM_PROMPT, TOM_TAT_HOI_THOAI
+from src.rag.llm_router import get_llm_router
+from src.utils import log
+from src.utils.concurrency import get_background_executor
+
+# Role/formatting tokens the chat API adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_pending: set = set()
+_pending_lock = threading.Lock()
+
+
+def _message_tokens(message: Dict[str, str]) -> int:
+    # The embedding tokenizer is close enough to the chat model's for budgeting
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def build_llm_messages(context: str, chat_session: ChatSession) -> List[Dict[str, str]]:
+    """
+    Prompt for a turn: system prompt, context, running summary, then as many of the
+    unsummarized messages (newest first, the current question always) as fit in RAG_MAX_PROMPT_TOKENS
+    """
+    head = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "system", "content": f"Context: {context}"},
+    ]
+    if chat_session.summary:
+        head.append({"role": "system", "content": f"Tóm tắt cuộc trò chuyện trước đó:\n{chat_session.summary}"})
+
+    messages = chat_session.messages[-rag_config.HISTORY_MESSAGES:]
+    if rag_config.HISTORY_SUMMARIZATION:
+        # Turns already folded into the summary are not repeated (legacy messages have no turn number)
+        messages = [
+            message for message in messages
+            if message.turn is None or message.turn >= chat_session.summarized_turns
+        ]
+    history = [{"role": message.role, "content": message.content} for message in messages]
+
+    budget = rag_config.MAX_PROMPT_TOKENS - sum(_message_tokens(message) for message in head)
+    kept: List[Dict[str, str]] = []
+    for position, message in enumerate(reversed(history)):
+        tokens = _message_tokens(message)
+        if position and tokens > budget:
+            break
+        kept.insert(0, message)
+        budget -= tokens
+    if len(kept) < len(history):
+        log.info(f"Dropped {len(history) - len(kept)} history messages to stay under {rag_config.MAX_PROMPT_TOKENS} prompt tokens")
+    return head + kept
+
+
+def _update_summary(session_id: str) -> None:
+    """
+    Fold the turns that left the verbatim window into the session's running summary
+    """
+    try:
+        state = chat_session_collection.get_summary_state(session_id)
+        if not state:
+            return
+        summary = state.get("summary") or ""
+        summarized_turns = state.get("summarized_turns") or 0
+        end_turn = state.get("turn_count", 0) - rag_config.HISTORY_RECENT_TURNS
+        if end_turn <= summarized_turns:
+            return
+
+        messages = chat_session_collection.get_messages_by_turns(session_id, summarized_turns, end_turn)
+        transcript = "\n".join(
+            f"{'Người dùng' if message['role'] == 'user' else 'Trợ lý'}: {message['content']}"
+            for message in messages
+        )
+        response = get_llm_router().complete(
+            [
+                {"role": "system", "content": TOM_TAT_HOI_THOAI},
+                {
+                    "role": "user",
+                    "content": f"Bản tóm tắt hiện có:\n{summary or '(trống)'}\n\nCác lượt hội thoại mới:\n{transcript}",
+                },
+            ],
+            temperature=0,
+            max_tokens=rag_config.HISTORY_SUMMARY_MAX_TOKENS,
+        )
+        new_summary = (response.choices[0].message.content or "").strip()
+        if new_summary and chat_session_collection.update_summary(session_id, new_summary, end_turn, summarized_turns):
+            log.info(f"Summarized turns {summarized_turns}-{end_turn - 1} of session {session_id}")
+    except Exception as e:
+        log.error(f"Error summarizing session {session_id}: {str(e)}")
+    finally:
+        with _pending_lock:
+            _pending.discard(session_id)
+
+
+def schedule_summary_update(chat_session: ChatSession) -> None:
+    """
+    Queue a background summary update once HISTORY_SUMMARY_BATCH_TURNS turns have left the
+    verbatim window. `chat_session` is the session as loaded for the turn that was just saved.
+    """
+    if not rag_config.HISTORY_SUMMARIZATION:
+        return
+    turn_count = chat_session.turn_count + 1
+    unsummarized = turn_count - chat_session.summarized_turns
+    if unsummarized < rag_config.HISTORY_RECENT_TURNS + rag_config.HISTORY_SUMMARY_BATCH_TURNS:
+        return
+    with _pending_lock:
+        if chat_session.session_id in _pending:
+            return
+        _pending.add(chat_session.session_id)
+    get_background_executor().submit(_update_summary, chat_session.session_id)
+
+
+__all__ = ["build_llm_messages", "schedule_summary_update"]
@@ -0,0 +1,423 @@
+"""
+Chat completion routing over the configured LLM providers (OpenAI, DeepSeek).
+
+Every provider keeps a rolling window of its time to first token and of request outcomes,
+and a circuit breaker: after BREAKER_FAILURE_THRESHOLD consecutive failures it is skipped
+for BREAKER_COOLDOWN_SECONDS, then a single trial request decides whether it is closed again.
+
+Providers are tried in PRIORITY order, or by measured latency (median time to first token,
+penalized by the error rate) once each has enough samples. A request that fails before its
+first token moves on to the next provider. A stream whose first provider has produced no
+token after HEDGE_AFTER_SECONDS is hedged: the next provider is asked as well, the first to
+produce a token answers and the other request is closed.
+
+Both providers speak the OpenAI API, so the router can be exercised against local fake
+endpoints (benchmarks/fake_llm_server.py, benchmarks/llm_routing.py).
+"""
+
+# Standard library imports
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Third-party imports
+from openai import OpenAI
+
+# Local imports
+from src.configs import deepseek_config, openai_config
+from src.utils import log
+from src.utils.clients import get_deepseek_client, get_openai_client
+from src.utils.concurrency import run_once
+from src.utils.tracing import add_metric, set_metric
+
+# Outcomes / latencies kept per provider, and samples needed before latency decides the order
+STATS_WINDOW = 50
+MIN_LATENCY_SAMPLES = 5
+# Weight of the error rate in the latency ranking: 20% errors count as 1.6x the latency
+ERROR_RATE_PENALTY = 3.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Closed: requests pass. Open (after `failure_threshold` consecutive failures): requests are
+    refused until `cooldown_seconds` have passed. Half open: one trial request passes; its
+    success closes the breaker, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Whether a request may be sent now, without claiming the half-open trial"""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self._opened_at >= self.cooldown_seconds
+            return not (self.state == HALF_OPEN and self._trial_running)
+
+    def acquire(self) -> bool:
+        """Claim the right to send a request (the single trial when half open)"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self._trial_running = False
+            if self.state == HALF_OPEN:
+                if self._trial_running:
+                    return False
+                self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._trial_running = False
+
+    def reset(self) -> None:
+        """Close the breaker whatever its state"""
+        self.record_success()
+
+    def release(self) -> None:
+        """Give back a claimed request that ended without an outcome (e.g. a cancelled hedge)"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self) -> bool:
+        """Returns True when this failure opened the breaker"""
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+
+class ProviderStats:
+    """Rolling windows of first-token latencies (seconds) and request outcomes"""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, ok: Optional[bool], latency: Optional[float] = None) -> None:
+        with self._lock:
+            if ok is not None:
+                self._outcomes.append(ok)
+            if latency is not None:
+                self._latencies.append(latency)
+
+    @property
+    def samples(self) -> int:
+        return len(self._latencies)
+
+    def median_latency(self) -> Optional[float]:
+        with self._lock:
+            return statistics.median(self._latencies) if self._latencies else None
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+
+@dataclass
+class Provider:
+    name: str
+    client: Callable[[], OpenAI]
+    model: str
+    temperature: float
+    priority: int
+    hedge_after: float
+    breaker: CircuitBreaker
+    stats: ProviderStats = field(default_factory=ProviderStats)
+
+    def ranking_latency(self) -> Optional[float]:
+        latency = self.stats.median_latency()
+        if latency is None or self.stats.samples < MIN_LATENCY_SAMPLES:
+            return None
+        return latency * (1 + ERROR_RATE_PENALTY * self.stats.error_rate())
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        self.stats.record(True, latency)
+        self.breaker.record_success()
+
+    def record_failure(self, error: Exception) -> None:
+        self.stats.record(False)
+        add_metric("llm_failures")
+        if self.breaker.record_failure():
+            log.warn(f"LLM provider {self.name} circuit opened for {self.breaker.cooldown_seconds:.0f}s: {str(error)}")
+        else:
+            log.warn(f"LLM provider {self.name} failed: {str(error)}")
+
+    def create(self, messages: List[Dict[str, str]], temperature: Optional[float], **kwargs: Any):
+        return self.client().chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature if temperature is None else temperature,
+            **kwargs,
+        )
+
+
+# Items put on a stream's queue by its attempts
+_CHUNK, _DONE, _ERROR = "chunk", "done", "error"
+
+
+def _has_content(chunk) -> bool:
+    return bool(chunk.choices) and bool(chunk.choices[0].delta.content)
+
+
+class _Attempt(threading.Thread):
+    """
+    One streaming request to one provider. Its chunks are pumped onto the shared queue from a
+    daemon thread, so the router can wait for whichever attempt produces a token first.
+    """
+
+    def __init__(self, provider: Provider, messages: List[Dict[str, str]], temperature: Optional[float], events: queue.Queue):
+        super().__init__(name=f"llm-{provider.name}", daemon=True)
+        self.provider = provider
+        self.messages = messages
+        self.temperature = temperature
+        self.events = events
+        self.started_at = time.perf_counter()
+        self.buffered: List[Any] = []
+        self._stream = None
+        self._cancelled = threading.Event()
+
+    def run(self) -> None:
+        try:
+            self._stream = self.provider.create(
+                self.messages,
+                self.temperature,
+                stream=True,
+                # The last chunk then carries the token usage of the request
+                stream_options={"include_usage": True},
+            )
+            for chunk in self._stream:
+                if self._cancelled.is_set():
+                    break
+                self.events.put((self, _CHUNK, chunk))
+            self.events.put((self, _DONE, None))
+        except Exception as e:
+            self.events.put((self, _ERROR, e))
+        finally:
+            if self._cancelled.is_set():
+                self._close_stream()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        self._close_stream()
+
+    def _close_stream(self) -> None:
+        try:
+            if self._stream is not None:
+                self._stream.close()
+        except Exception:
+            pass
+
+
+class RoutedStream:
+    """
+    Chunk iterator over the chosen provider's stream (the same chunks the OpenAI SDK yields).
+    `close()` stops reading and closes every request still open.
+    """
+
+    def __init__(self, router: "LLMRouter", messages: List[Dict[str, str]], temperature: Optional[float]):
+        self.router = router
+        self.messages = messages
+        self.temperature = temperature
+        self.provider: Optional[str] = None
+        self.hedged = False
+        self._chunks = self._iterate()
+
+    def __iter__(self) -> Iterator[Any]:
+        return self._chunks
+
+    def close(self) -> None:
+        self._chunks.close()
+
+    def _iterate(self) -> Iterator[Any]:
+        candidates = self.router.ordered_providers()
+        events: queue.Queue = queue.Queue()
+        active: List[_Attempt] = []
+        winner: Optional[_Attempt] = None
+        last_error: Optional[Exception] = None
+
+        def start_next() -> bool:
+            while candidates:
+                provider = candidates.pop(0)
+                if provider.breaker.acquire():
+                    attempt = _Attempt(provider, self.messages, self.temperature, events)
+                    active.append(attempt)
+                    attempt.start()
+                    return True
+            return False
+
+        try:
+            if not start_next():
+                raise RuntimeError("No LLM provider available")
+            # Until a provider produces its first token: fail over on errors, hedge on slowness
+            while winner is None:
+                primary = active[0] if active else None
+                timeout = None
+                if primary is not None and len(active) == 1 and candidates and primary.provider.hedge_after > 0:
+                    timeout = max(0.0, primary.started_at + primary.provider.hedge_after - time.perf_counter())
+                try:
+                    attempt, kind, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    if start_next():
+                        self.hedged = True
+                        add_metric("llm_hedged")
+                        log.info(f"No first token from {primary.provider.name} after {primary.provider.hedge_after}s, hedging")
+                    continue
+                if attempt not in active:
+                    continue
+                if kind == _ERROR:
+                    active.remove(attempt)
+                    attempt.provider.record_failure(payload)
+                    last_error = payload
+                    if not active and not start_next():
+                        raise last_error
+                    continue
+                if kind == _CHUNK:
+                    attempt.buffered.append(payload)
+                    if not _has_content(payload):
+                        continue
+                winner = attempt
+
+            # Winner found (first token, or an empty answer): the other requests are closed, their
+            # wait so far still counts as a (lower bound) latency sample
+            now = time.perf_counter()
+            winner.provider.record_success(now - winner.started_at)
+            for attempt in active:
+                if attempt is not winner:
+                    attempt.cancel()
+                    attempt.provider.stats.record(None, now - attempt.started_at)
+                    attempt.provider.breaker.release()
+            active = [winner]
+            self.provider = winner.provider.name
+            set_metric("llm_provider", self.provider)
+            yield from winner.buffered
+            if kind == _DONE:
+                return
+            while True:
+                attempt, kind, payload = events.get()
+                if attempt is not winner:
+                    continue
+                if kind == _CHUNK:
+                    yield payload
+                elif kind == _DONE:
+                    return
+                else:
+                    # Too late to switch providers, the caller has already shown part of the answer
+                    winner.provider.record_failure(payload)
+                    raise payload
+        finally:
+            for attempt in active:
+                attempt.cancel()
+                if attempt is not winner:
+                    attempt.provider.breaker.release()
+
+
+class LLMRouter:
+    """Routes chat completions over the enabled providers"""
+
+    def __init__(self, providers: List[Provider]):
+        if not providers:
+            raise ValueError("At least one LLM provider must be enabled")
+        self.providers = providers
+
+    def ordered_providers(self) -> List[Provider]:
+        """
+        Providers whose breaker lets a request through, fastest first once every one of them has
+        enough latency samples, in configured priority otherwise. When every breaker is open the
+        cooldowns are ignored rather than failing the request outright.
+        """
+        available = [provider for provider in self.providers if provider.breaker.available()]
+        if not available:
+            for provider in self.providers:
+                provider.breaker.reset()
+            available = list(self.providers)
+        latencies = [provider.ranking_latency() for provider in available]
+        if len(available) > 1 and all(latency is not None for latency in latencies):
+            return [provider for _, provider in sorted(zip(latencies, available), key=lambda item: (item[0], item[1].priority))]
+        return sorted(available, key=lambda provider: provider.priority)
+
+    def stream(self, messages: List[Dict[str, str]], temperature: Optional[float] = None) -> RoutedStream:
+        """Streaming chat completion, see RoutedStream"""
+        return RoutedStream(self, messages, temperature)
+
+    def complete(self, messages: List[Dict[str, str]], temperature: Optional[float] = None, **kwargs: Any):
+        """
+        Non-streaming chat completion, failing over to the next provider on errors (not hedged:
+        without a first token there is nothing to compare before the whole answer is done)
+        """
+        last_error: Optional[Exception] = None
+        for provider in self.ordered_providers():
+            if not provider.breaker.acquire():
+                continue
+            try:
+                response = provider.create(messages, temperature, **kwargs)
+            except Exception as e:
+                provider.record_failure(e)
+                last_error = e
+                continue
+            provider.record_success()
+            set_metric("llm_provider", provider.name)
+            return response
+        raise last_error or RuntimeError("No LLM provider available")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Breaker state and rolling statistics per provider"""
+        return {
+            provider.name: {
+                "state": provider.breaker.state,
+                "median_first_token_ms": round(provider.stats.median_latency() * 1000, 1) if provider.stats.samples else None,
+                "error_rate": round(provider.stats.error_rate(), 3),
+                "samples": provider.stats.samples,
+            }
+            for provider in self.providers
+        }
+
+
+def _provider(name: str, config: Any, client: Callable[[], OpenAI], model: str) -> Provider:
+    return Provider(
+        name=name,
+        client=client,
+        model=model,
+        temperature=config.TEMPERATURE,
+        priority=config.PRIORITY,
+        hedge_after=config.HEDGE_AFTER_SECONDS,
+        breaker=CircuitBreaker(config.BREAKER_FAILURE_THRESHOLD, config.BREAKER_COOLDOWN_SECONDS),
+    )
+
+
+@run_once
+def get_llm_router() -> LLMRouter:
+    """
+    Process-wide router over the enabled providers; their statistics live as long as the process
+    """
+    providers: List[Tuple[bool, Provider]] = [
+        (openai_config.ENABLED, _provider("openai", openai_config, get_openai_client, openai_config.LLM_MODEL)),
+        (deepseek_config.ENABLED, _provider("deepseek", deepseek_config, get_deepseek_client, deepseek_config.MODEL)),
+    ]
+    return LLMRouter([provider for enabled, provider in providers if enabled])
+
+
+__all__ = ["CircuitBreaker", "ProviderStats", "Provider", "RoutedStream", "LLMRouter", "get_llm_router"]
@@ -0,0 +1,88 @@
+"""
+Topic router: picks the namespaces a query is searched in.
+
+Routing is a local keyword match on the folded query tokens (no LLM or network call), so
+it adds microseconds to a turn. The default namespace (school information) is always
+searched; the other namespaces are added when the query mentions their topic. The picked
+namespaces are searched concurrently, so routing to more of them costs no extra round trips.
+"""
+
+# Standard library imports
+from typing import Dict, List, Optional, Tuple, Union
+
+# Local imports
+from src.configs import pinecone_config, rag_config
+from src.rag.bm25 import TOKEN_PATTERN, fold
+
+NAME_SPACE = pinecone_config.NAME_SPACE
+
+# Keywords per namespace, written without diacritics (queries are matched in folded form).
+# Multi-syllable keywords match as consecutive tokens.
+ROUTING_KEYWORDS: Dict[str, List[str]] = {
+    NAME_SPACE.THONG_TIN_LOP.value: [
+        "lop", "si so", "chu nhiem", "thoi khoa bieu", "tkb", "lop truong", "khoi",
+    ],
+    NAME_SPACE.THONG_TIN_GIAO_VIEN.value: [
+        "giao vien", "thay giao", "co giao", "thay co", "giang day", "to bo mon", "to truong", "bo mon",
+    ],
+    NAME_SPACE.THONG_TIN_SINH_VIEN.value: [
+        "hoc sinh", "sinh vien", "diem", "hanh kiem", "hoc luc", "khen thuong", "ky luat", "ma hoc sinh",
+    ],
+    NAME_SPACE.THONG_TIN_PHU_HUYNH.value: [
+        "phu huynh", "hop phu huynh", "hoc phi", "ban dai dien", "lien lac", "bo me",
+    ],
+}
+
+
+def _compile(keywords: Dict[str, List[str]]) -> Dict[str, List[Tuple[str, ...]]]:
+    return {
+        namespace: [tuple(fold(word) for word in keyword.split()) for keyword in words]
+        for namespace, words in keywords.items()
+    }
+
+
+_PATTERNS = _compile(ROUTING_KEYWORDS)
+
+
+def _folded_tokens(query: str) -> List[str]:
+    return [fold(token) for token in TOKEN_PATTERN.findall(query.lower())]
+
+
+def _count_matches(tokens: List[str], patterns: List[Tuple[str, ...]]) -> int:
+    matches = 0
+    for pattern in patterns:
+        size = len(pattern)
+        matches += sum(1 for start in range(len(tokens) - size + 1) if tuple(tokens[start:start + size]) == pattern)
+    return matches
+
+
+def route_query(query: str) -> List[str]:
+    """
+    Namespaces to search for `query`: the default namespace first, then every namespace
+    whose keywords occur in the query (most matches first), at most RAG_ROUTER_MAX_NAMESPACES
+    """
+    tokens = _folded_tokens(query)
+    scored = []
+    for namespace, patterns in _PATTERNS.items():
+        if namespace == rag_config.DEFAULT_NAMESPACE:
+            continue
+        matches = _count_matches(tokens, patterns)
+        if matches:
+            scored.append((matches, namespace))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    namespaces = [rag_config.DEFAULT_NAMESPACE] + [namespace for _, namespace in scored]
+    return namespaces[:max(1, rag_config.ROUTER_MAX_NAMESPACES)]
+
+
+def resolve_namespaces(query: str, namespace: Optional[Union[str, List[str]]] = None) -> List[str]:
+    """
+    Namespaces a turn searches: `namespace` as given (one or a list), or routed when None
+    """
+    if namespace is None:
+        return route_query(query) if rag_config.TOPIC_ROUTING else [rag_config.DEFAULT_NAMESPACE]
+    if isinstance(namespace, str):
+        return [namespace]
+    return list(namespace)
+
+
+__all__ = ["ROUTING_KEYWORDS", "route_query", "resolve_namespaces"]
@@ -1,3 +1,3 @@
-from .log import success, warn, error
+from .log import success, info, warn, error
 
-__all__ = ['success', 'warn', 'error']
+__all__ = ['success', 'info', 'warn', 'error']
@@ -0,0 +1,91 @@
+# Standard library imports
+import importlib.util
+from typing import Union
+
+# Third-party imports
+import httpx
+from openai import OpenAI
+
+# Local imports
+from src.configs import app_config, openai_config, deepseek_config
+from src.utils import log
+from src.utils.concurrency import run_once
+
+
+def create_http_client(verify: Union[bool, str] = True) -> httpx.Client:
+    """
+    Keep-alive connection pool with the configured limits (`verify`: a CA bundle path for
+    test servers, see benchmarks/http_pool.py)
+    """
+    http2 = app_config.HTTP2 and importlib.util.find_spec("h2") is not None
+    if app_config.HTTP2 and not http2:
+        log.warn("HTTP2 is enabled but the h2 package is not installed, using HTTP/1.1")
+    return httpx.Client(
+        verify=verify,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=app_config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=app_config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=app_config.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        # The SDK clients pass their own timeouts per request, this one only applies to direct use
+        timeout=httpx.Timeout(openai_config.TIMEOUT, connect=openai_config.CONNECT_TIMEOUT, pool=app_config.HTTP_POOL_TIMEOUT),
+    )
+
+
+@run_once
+def get_http_client() -> httpx.Client:
+    """
+    Process-wide connection pool under every OpenAI-compatible client. Connections are pooled
+    per host, so the OpenAI and DeepSeek clients share the limits but never each other's
+    connections. The SDK clients must not be closed: that closes the pool.
+    """
+    return create_http_client()
+
+
+def request_timeout(read: float, connect: float) -> httpx.Timeout:
+    """Timeout of one API request: `read` also bounds the gap between streamed chunks"""
+    return httpx.Timeout(read, connect=connect, pool=app_config.HTTP_POOL_TIMEOUT)
+
+
+def embedding_timeout() -> httpx.Timeout:
+    """Per-request timeout of embedding calls (shorter than the chat default)"""
+    return request_timeout(openai_config.EMBEDDING_TIMEOUT, openai_config.CONNECT_TIMEOUT)
+
+
+@run_once
+def get_openai_client() -> OpenAI:
+    """
+    Process-wide OpenAI client (embeddings and chat completions)
+    """
+    return OpenAI(
+        api_key=openai_config.API_KEY,
+        base_url=openai_config.BASE_URL,
+        timeout=request_timeout(openai_config.TIMEOUT, openai_config.CONNECT_TIMEOUT),
+        max_retries=openai_config.MAX_RETRIES,
+        http_client=get_http_client(),
+    )
+
+
+@run_once
+def get_deepseek_client() -> OpenAI:
+    """
+    Process-wide client for the OpenAI-compatible DeepSeek API
+    """
+    return OpenAI(
+        api_key=deepseek_config.API_KEY,
+        base_url=deepseek_config.BASE_URL,
+        timeout=request_timeout(deepseek_config.TIMEOUT, deepseek_config.CONNECT_TIMEOUT),
+        max_retries=deepseek_config.MAX_RETRIES,
+        http_client=get_http_client(),
+    )
+
+
+__all__ = [
+    "create_http_client",
+    "get_http_client",
+    "request_timeout",
+    "embedding_timeout",
+    "get_openai_client",
+    "get_deepseek_client",
+]
@@ -0,0 +1,57 @@
+# Standard library imports
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+# Local imports
+from src.configs import rag_config
+
+T = TypeVar("T")
+
+
+def run_once(func: Callable[[], T]) -> Callable[[], T]:
+    """
+    Thread-safe lazy singleton: the wrapped zero-argument factory runs on first call and its
+    result is reused for the rest of the process (across Streamlit reruns and pages).
+    A failed call is not cached, so the next call retries. `reset()` drops the cached value,
+    `override(value)` replaces it (e.g. with a stand-in client in the offline benchmarks).
+    """
+    lock = threading.Lock()
+    state = {}
+
+    @functools.wraps(func)
+    def wrapper() -> T:
+        if "value" not in state:
+            with lock:
+                if "value" not in state:
+                    state["value"] = func()
+        return state["value"]
+
+    wrapper.reset = state.clear
+    wrapper.override = lambda value: state.__setitem__("value", value)
+    return wrapper
+
+
+@run_once
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Small process-wide thread pool for overlapping independent I/O-bound calls
+    (Mongo reads, embedding / vector queries). Created on first use.
+    """
+    return ThreadPoolExecutor(
+        max_workers=rag_config.ORCHESTRATION_WORKERS,
+        thread_name_prefix="rag-worker",
+    )
+
+
+@run_once
+def get_background_executor() -> ThreadPoolExecutor:
+    """
+    Separate pool for background work nothing waits on (history summaries, BM25 rebuilds),
+    so a burst of it never queues ahead of the request-path calls on get_executor()
+    """
+    return ThreadPoolExecutor(
+        max_workers=rag_config.BACKGROUND_WORKERS,
+        thread_name_prefix="rag-background",
+    )
@@ -1,6 +1,9 @@
 def success(message: str) -> None:
     print(f"\033[92m[SUCCESS] {message}\033[0m")
 
+def info(message: str) -> None:
+    print(f"\033[94m[INFO] {message}\033[0m")
+
 def warn(message: str) -> None:
     print(f"\033[93m[WARNING] {message}\033[0m")
 
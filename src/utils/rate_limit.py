@@ -0,0 +1,255 @@
+"""
+Client-side rate limiting of the OpenAI embedding quota.
+
+Every embedding request first acquires its (estimated) tokens from a process-wide
+scheduler. Two token buckets, requests/min and tokens/min, meter the grants at
+EMBEDDING_RATE_HEADROOM of the account's quota, so bulk ingestion runs close to the quota
+without tripping it. Waiting requests are queued per flow: every ingestion job is its own
+flow (see `flow()`) and flows are served round-robin, so a large upload doesn't hold back
+a small one; chat queries (the INTERACTIVE flow) are served first. A 429 from the API
+pauses all grants until its retry-after hint has passed.
+"""
+
+# Standard library imports
+import email.utils
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, Optional
+
+# Local imports
+from src.configs import openai_config
+from src.utils.concurrency import run_once
+
+INTERACTIVE = "interactive"
+# Burst allowance of a bucket, in seconds of its rate. A 60s window then carries at most
+# headroom * quota + the burst + one request: under the quota while requests are small next to it
+BURST_SECONDS = 2.0
+# Pause after a 429 that carries no usable retry-after hint
+DEFAULT_RETRY_AFTER = 2.0
+
+DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+_current_flow: ContextVar[str] = ContextVar("embedding_flow", default=INTERACTIVE)
+
+
+@contextmanager
+def flow(name: str) -> Iterator[None]:
+    """Queue the embedding requests made inside the block under flow `name`"""
+    token = _current_flow.set(name)
+    try:
+        yield
+    finally:
+        _current_flow.reset(token)
+
+
+def current_flow() -> str:
+    return _current_flow.get()
+
+
+class TokenBucket:
+    """
+    Refills at `per_minute` / 60 per second up to `burst_seconds` worth. A request larger than
+    the burst is let through once the bucket is full, leaving it in debt.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = BURST_SECONDS):
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.available = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.available
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.available -= amount
+
+    def give_back(self, amount: float) -> None:
+        self.available = min(self.capacity, self.available + amount)
+
+
+class _Ticket:
+    __slots__ = ("tokens", "granted")
+
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+        self.granted = False
+
+
+class RateLimitScheduler:
+    """
+    Grants requests in fair order as the buckets allow (a limit <= 0 disables its bucket).
+    Callers `acquire` before sending, `settle` with the actual usage afterwards and `pause`
+    on a 429.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, burst_seconds: float = BURST_SECONDS):
+        self._requests = TokenBucket(requests_per_minute, burst_seconds) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute, burst_seconds) if tokens_per_minute > 0 else None
+        self._queues: "OrderedDict[str, Deque[_Ticket]]" = OrderedDict()
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+        self.granted = 0
+        self.rate_limited = 0
+        self.waited_seconds = 0.0
+
+    def acquire(self, tokens: int, flow_name: Optional[str] = None) -> float:
+        """
+        Block until a request of `tokens` may be sent, returning the seconds waited
+        """
+        ticket = _Ticket(tokens)
+        start = time.monotonic()
+        with self._condition:
+            self._queues.setdefault(flow_name or current_flow(), deque()).append(ticket)
+            while True:
+                wait = self._dispatch()
+                if ticket.granted:
+                    break
+                self._condition.wait(timeout=wait)
+            waited = time.monotonic() - start
+            self.waited_seconds += waited
+        return waited
+
+    def _next_flow(self) -> Optional[str]:
+        if INTERACTIVE in self._queues:
+            return INTERACTIVE
+        return next(iter(self._queues), None)
+
+    def _dispatch(self) -> Optional[float]:
+        """
+        Grant head-of-queue tickets in fair order while the buckets allow. Returns the time
+        until the next one could be granted (None when nothing is waiting).
+        """
+        granted = False
+        try:
+            while True:
+                flow_name = self._next_flow()
+                if flow_name is None:
+                    return None
+                queue = self._queues[flow_name]
+                ticket = queue[0]
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if self._requests is not None:
+                    wait = max(wait, self._requests.wait_time(1, now))
+                if self._tokens is not None:
+                    wait = max(wait, self._tokens.wait_time(ticket.tokens, now))
+                if wait > 0:
+                    return wait
+                if self._requests is not None:
+                    self._requests.take(1)
+                if self._tokens is not None:
+                    self._tokens.take(ticket.tokens)
+                ticket.granted = granted = True
+                self.granted += 1
+                queue.popleft()
+                if queue:
+                    # Round-robin: this flow's next request waits for every other flow's turn
+                    self._queues.move_to_end(flow_name)
+                else:
+                    del self._queues[flow_name]
+        finally:
+            if granted:
+                self._condition.notify_all()
+
+    def settle(self, estimated: int, used: int) -> None:
+        """Correct the token bucket once the API has reported the tokens a request really used"""
+        if self._tokens is None or used == estimated:
+            return
+        with self._condition:
+            if used > estimated:
+                self._tokens.take(used - estimated)
+            else:
+                self._tokens.give_back(estimated - used)
+                self._condition.notify_all()
+
+    def pause(self, seconds: float) -> None:
+        """Hold every grant for `seconds` (after a 429)"""
+        with self._condition:
+            self.rate_limited += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "granted": self.granted,
+                "rate_limited": self.rate_limited,
+                "waited_seconds": round(self.waited_seconds, 2),
+                "waiting": sum(len(queue) for queue in self._queues.values()),
+            }
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """'1.5s', '6m0s', '20ms' (x-ratelimit-reset-* headers) -> seconds"""
+    parts = DURATION_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Delay the server asked for in a 429 response: retry-after-ms, retry-after (seconds or an
+    HTTP date), or the x-ratelimit-reset-* headers. None without any hint.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            # Malformed date (ValueError on Python 3.10+, TypeError before): fall through to the other headers
+            date = None
+        if date is not None:
+            return max(0.0, date.timestamp() - time.time())
+    resets = [_parse_duration(headers.get(name) or "") for name in ("x-ratelimit-reset-tokens", "x-ratelimit-reset-requests")]
+    resets = [reset for reset in resets if reset is not None]
+    return max(resets) if resets else None
+
+
+@run_once
+def get_embedding_scheduler() -> Optional[RateLimitScheduler]:
+    """
+    Process-wide scheduler of the embedding requests (None when rate limiting is disabled)
+    """
+    if not openai_config.EMBEDDING_RATE_LIMIT_ENABLED:
+        return None
+    headroom = openai_config.EMBEDDING_RATE_HEADROOM
+    return RateLimitScheduler(
+        requests_per_minute=openai_config.EMBEDDING_RPM_LIMIT * headroom,
+        tokens_per_minute=openai_config.EMBEDDING_TPM_LIMIT * headroom,
+    )
+
+
+__all__ = [
+    "INTERACTIVE",
+    "flow",
+    "current_flow",
+    "TokenBucket",
+    "RateLimitScheduler",
+    "retry_after_seconds",
+    "get_embedding_scheduler",
+]
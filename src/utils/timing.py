@@ -0,0 +1,33 @@
+# Standard library imports
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class StageTimer:
+    """
+    Collects wall-clock durations (milliseconds) of named pipeline stages.
+    Stages may run on different threads; each stage name should be timed once.
+    """
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = (time.perf_counter() - start) * 1000
+
+    def record(self, name: str, duration_ms: float) -> None:
+        self.durations[name] = duration_ms
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def summary(self) -> str:
+        stages = ", ".join(f"{name}={duration:.0f}ms" for name, duration in self.durations.items())
+        return f"{stages} (total={self.elapsed_ms():.0f}ms)"
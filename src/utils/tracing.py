@@ -0,0 +1,287 @@
+"""
+Request tracing: one record per chat turn and per ingestion job.
+
+A Trace collects stage durations (through its StageTimer), metrics (retrieval hits, top
+score, token usage, cache hits) and identifying attributes. The active trace is held in a
+context variable, so code deep in the pipeline records metrics with `add_metric()` /
+`set_metric()` without a trace being passed around; outside a trace these are no-ops.
+Finished traces (and error logs) are queued to a background writer that inserts them into
+MongoDB in batches; the request path never waits on that write. p50/p95 per stage:
+
+    python -m src.utils.tracing --kind chat_turn
+"""
+
+# Standard library imports
+import atexit
+import contextvars
+import queue
+import statistics
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Local imports
+from src.configs import app_config, mongodb_config
+from src.models import ErrorLevel, ErrorLog, ErrorType, TraceRecord
+from src.utils import log
+from src.utils.concurrency import run_once
+from src.utils.timing import StageTimer
+
+CHAT_TURN = "chat_turn"
+INGESTION_JOB = "ingestion_job"
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """
+    Stages and metrics of one traced operation. Stages are timed with `timer` (a StageTimer),
+    or with `enter_stage` for sequential stages that are entered more than once.
+    """
+
+    def __init__(self, kind: str, timer: Optional[StageTimer] = None, **attributes: Any):
+        self.trace_id = str(uuid.uuid4())
+        self.kind = kind
+        self.timer = timer or StageTimer()
+        self.attributes = attributes
+        self.metrics: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self._stage: Optional[Tuple[str, float]] = None
+        self._lock = threading.Lock()
+
+    def add_metric(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.metrics[name] = self.metrics.get(name, 0) + amount
+
+    def set_metric(self, name: str, value: Any) -> None:
+        with self._lock:
+            self.metrics[name] = value
+
+    def enter_stage(self, name: Optional[str]) -> None:
+        """
+        End the current sequential stage (adding its time to the stage's total) and start `name`
+        """
+        now = time.perf_counter()
+        with self._lock:
+            if self._stage is not None:
+                stage, since = self._stage
+                self.timer.durations[stage] = self.timer.durations.get(stage, 0.0) + (now - since) * 1000
+            self._stage = (name, now) if name else None
+
+    def record(self) -> TraceRecord:
+        self.enter_stage(None)
+        return TraceRecord(
+            trace_id=self.trace_id,
+            kind=self.kind,
+            duration_ms=round(self.timer.elapsed_ms(), 2),
+            stages={stage: round(duration, 2) for stage, duration in self.timer.durations.items()},
+            metrics=dict(self.metrics),
+            attributes=self.attributes,
+            error=self.error,
+        )
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def add_metric(name: str, amount: float = 1) -> None:
+    """Add to a counter of the active trace (no-op without one)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_metric(name, amount)
+
+
+def set_metric(name: str, value: Any) -> None:
+    """Set a metric of the active trace (no-op without one)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.set_metric(name, value)
+
+
+def activate(trace: Trace) -> contextvars.Token:
+    return _current_trace.set(trace)
+
+
+def finish(trace: Trace, token: Optional[contextvars.Token] = None) -> None:
+    """
+    Deactivate the trace and queue its record for writing
+    """
+    if token is not None:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # A generator closed from another context (e.g. garbage collected elsewhere)
+            _current_trace.set(None)
+    if app_config.TRACING_ENABLED:
+        get_trace_writer().submit(mongodb_config.TRACE_COLLECTION, trace.record().model_dump())
+
+
+@contextmanager
+def start_trace(kind: str, timer: Optional[StageTimer] = None, **attributes: Any) -> Iterator[Trace]:
+    """
+    Trace the enclosed block; an exception escaping it is recorded as the trace's error
+    """
+    trace = Trace(kind, timer, **attributes)
+    token = activate(trace)
+    try:
+        yield trace
+    except Exception as e:
+        trace.error = str(e)
+        raise
+    finally:
+        finish(trace, token)
+
+
+def log_error(
+    message: str,
+    component: str,
+    error_type: str = ErrorType.UNKNOWN_ERROR,
+    level: str = ErrorLevel.ERROR,
+    topic: Optional[str] = None,
+    **details: Any,
+) -> None:
+    """
+    Queue an ErrorLog entry (linked to the active trace, if any) for writing
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.error = message
+        details.setdefault("trace_id", trace.trace_id)
+    if app_config.TRACING_ENABLED:
+        error_log = ErrorLog(message=message, level=level, component=component, error_type=error_type, topic=topic, details=details)
+        get_trace_writer().submit(mongodb_config.ERROR_LOG_COLLECTION, error_log.model_dump(exclude={"id"}))
+
+
+class TraceWriter(threading.Thread):
+    """
+    Buffers documents in a bounded queue and inserts them in batches from a daemon thread.
+    `submit` never blocks: when the buffer is full the document is dropped and counted.
+    """
+
+    def __init__(self):
+        super().__init__(name="trace-writer", daemon=True)
+        self._queue: "queue.Queue[Tuple[str, Dict[str, Any]]]" = queue.Queue(maxsize=app_config.TRACE_BUFFER_SIZE)
+        self._flush_lock = threading.Lock()
+        self.dropped = 0
+        self.written = 0
+
+    def submit(self, collection_name: str, document: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait((collection_name, document))
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self) -> None:
+        while True:
+            time.sleep(app_config.TRACE_FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self) -> None:
+        """Write everything queued so far"""
+        with self._flush_lock:
+            while not self._queue.empty():
+                batch: Dict[str, List[Dict[str, Any]]] = {}
+                for _ in range(app_config.TRACE_BATCH_SIZE):
+                    try:
+                        collection_name, document = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    batch.setdefault(collection_name, []).append(document)
+                self._write(batch)
+
+    def _write(self, batch: Dict[str, List[Dict[str, Any]]]) -> None:
+        # Imported here: src.database imports the pipeline modules that record into traces
+        from src.database.mongo_client import get_collection
+
+        for collection_name, documents in batch.items():
+            try:
+                get_collection(collection_name).insert_many(documents, ordered=False)
+                self.written += len(documents)
+            except Exception as e:
+                # Tracing must never take the app down, the batch is lost
+                self.dropped += len(documents)
+                log.warn(f"Could not write {len(documents)} records to {collection_name}: {str(e)}")
+
+
+@run_once
+def get_trace_writer() -> TraceWriter:
+    """
+    Background writer, started on first use and flushed once more at interpreter exit
+    """
+    writer = TraceWriter()
+    writer.start()
+    atexit.register(writer.flush)
+    return writer
+
+
+def _percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(share * (len(ordered) - 1)))]
+
+
+def summarize_traces(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    count / p50 / p95 (ms) per stage, plus the whole operation as "total"
+    """
+    samples: Dict[str, List[float]] = {}
+    for record in records:
+        samples.setdefault("total", []).append(record.get("duration_ms", 0.0))
+        for stage, duration in (record.get("stages") or {}).items():
+            samples.setdefault(stage, []).append(duration)
+    return {
+        stage: {"count": len(values), "p50_ms": statistics.median(values), "p95_ms": _percentile(values, 0.95)}
+        for stage, values in samples.items()
+    }
+
+
+def summarize_metrics(records: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Mean of every numeric metric over the records that report it
+    """
+    samples: Dict[str, List[float]] = {}
+    for record in records:
+        for name, value in (record.get("metrics") or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                samples.setdefault(name, []).append(value)
+    return {name: statistics.mean(values) for name, values in samples.items()}
+
+
+__all__ = [
+    "CHAT_TURN",
+    "INGESTION_JOB",
+    "Trace",
+    "current_trace",
+    "add_metric",
+    "set_metric",
+    "activate",
+    "finish",
+    "start_trace",
+    "log_error",
+    "TraceWriter",
+    "get_trace_writer",
+    "summarize_traces",
+    "summarize_metrics",
+]
+
+
+if __name__ == "__main__":
+    # python -m src.utils.tracing : p50 / p95 per stage over the most recent traces
+    import argparse
+
+    from src.database.mongo_client import trace_collection
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--kind", default=CHAT_TURN, choices=[CHAT_TURN, INGESTION_JOB])
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    records = trace_collection.get_recent_traces(args.kind, args.limit)
+    failed = sum(1 for record in records if record.get("error"))
+    print(f"{len(records)} {args.kind} traces ({failed} failed)")
+    for stage, stats in sorted(summarize_traces(records).items(), key=lambda item: -item[1]["p50_ms"]):
+        print(f"  {stage:<36} p50 {stats['p50_ms']:9.1f} ms  p95 {stats['p95_ms']:9.1f} ms  ({stats['count']})")
+    for name, mean in sorted(summarize_metrics(records).items()):
+        print(f"  {name:<36} mean {mean:10.2f}")